@@ -26,6 +26,20 @@ def create_app():
         # Register blueprints
         from app.routes import main
         app.register_blueprint(main.bp)
+
+        # Background solves for the /jobs API: SOLVER_WORKERS at a time, at most SOLVER_QUEUE_SIZE waiting
+        from app.jobs import JobManager
+        app.extensions['job_manager'] = JobManager(
+            max_workers=int(os.environ.get('SOLVER_WORKERS', 2)),
+            max_queued=int(os.environ.get('SOLVER_QUEUE_SIZE', 8))
+        )
+
+        # Optionally keep the sheet data warm in the background (SHEETS_PREFETCH_INTERVAL seconds)
+        prefetch_interval = float(os.environ.get('SHEETS_PREFETCH_INTERVAL', 0))
+        if prefetch_interval > 0:
+            from app.google_sheets.prefetcher import SheetPrefetcher
+            app.extensions['sheet_prefetcher'] = SheetPrefetcher(interval=prefetch_interval).start()
+            logger.info(f"Prefetching sheet data every {prefetch_interval:g}s")
         
         logger.info("App initialization complete")
         return app
@@ -0,0 +1,154 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+# Where worksheet records come from. get_google_sheet_data reads through the
+# active data source, selected with the SHEETS_SOURCE environment variable:
+#
+#   live    (default) read from Google Sheets
+#   record  read from Google Sheets and save a snapshot of every tab read
+#   replay  serve the saved snapshots, without credentials or network access
+#
+# Snapshots are JSON files under SHEETS_SNAPSHOT_DIR (sheet_snapshots/ in the
+# project root by default), one per spreadsheet tab.
+
+SOURCE_MODES = ('live', 'record', 'replay')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SNAPSHOT_DIR = os.path.join(PROJECT_ROOT, 'sheet_snapshots')
+
+Records = List[Dict[str, object]]
+
+
+class SheetDataSource:
+    """Provides the records of a worksheet, as gspread's get_all_records returns them"""
+
+    def get_records(self, sheet_name: str, tab_name: str) -> Records:
+        raise NotImplementedError
+
+    def get_many(self, sheet_name: str, tab_names: List[str]) -> Dict[str, Records]:
+        """Records of several tabs of the same spreadsheet, by tab name"""
+        return {tab_name: self.get_records(sheet_name, tab_name) for tab_name in tab_names}
+
+    def get_revision(self, sheet_name: str) -> Optional[str]:
+        """A value that changes whenever the spreadsheet does, or None if unknown"""
+        return None
+
+
+class GoogleSheetSource(SheetDataSource):
+    """Reads worksheets from Google Sheets"""
+
+    def get_records(self, sheet_name: str, tab_name: str) -> Records:
+        # Imported here since init_sheet_access reads through this module
+        from app.google_sheets.init_sheet_access import fetch_sheet_records
+        return fetch_sheet_records(sheet_name, tab_name)
+
+    def get_many(self, sheet_name: str, tab_names: List[str]) -> Dict[str, Records]:
+        # All the tabs in one batched request
+        from app.google_sheets.init_sheet_access import fetch_sheet_tabs
+        return fetch_sheet_tabs(sheet_name, tab_names)
+
+    def get_revision(self, sheet_name: str) -> Optional[str]:
+        from app.google_sheets.init_sheet_access import fetch_sheet_revision
+        return fetch_sheet_revision(sheet_name)
+
+
+class RecordingSource(SheetDataSource):
+    """Reads through another source and saves a snapshot of every worksheet it returns"""
+
+    def __init__(self, source: SheetDataSource, snapshot_dir: str):
+        self.source = source
+        self.snapshot_dir = snapshot_dir
+
+    def get_records(self, sheet_name: str, tab_name: str) -> Records:
+        records = self.source.get_records(sheet_name, tab_name)
+        self._save(sheet_name, tab_name, records)
+        return records
+
+    def get_many(self, sheet_name: str, tab_names: List[str]) -> Dict[str, Records]:
+        records = self.source.get_many(sheet_name, tab_names)
+        for tab_name in tab_names:
+            self._save(sheet_name, tab_name, records[tab_name])
+        return records
+
+    def _save(self, sheet_name: str, tab_name: str, records: Records) -> None:
+        path = snapshot_path(self.snapshot_dir, sheet_name, tab_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so a failed write never leaves a partial snapshot
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'sheet': sheet_name,
+                'tab': tab_name,
+                'recorded_at': datetime.now(timezone.utc).isoformat(),
+                'records': records,
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, path)
+
+    def get_revision(self, sheet_name: str) -> Optional[str]:
+        return self.source.get_revision(sheet_name)
+
+
+class ReplaySource(SheetDataSource):
+    """Serves worksheets from saved snapshots"""
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = snapshot_dir
+
+    def get_records(self, sheet_name: str, tab_name: str) -> Records:
+        path = snapshot_path(self.snapshot_dir, sheet_name, tab_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"No snapshot of '{tab_name}' in '{sheet_name}' at {path}; "
+                f"record one with SHEETS_SOURCE=record"
+            )
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['records']
+
+    def get_revision(self, sheet_name: str) -> Optional[str]:
+        """The latest modification time of the spreadsheet's snapshots"""
+        sheet_dir = sheet_snapshot_dir(self.snapshot_dir, sheet_name)
+        if not os.path.isdir(sheet_dir):
+            return None
+        with os.scandir(sheet_dir) as entries:
+            mtimes = [entry.stat().st_mtime_ns for entry in entries if entry.name.endswith('.json')]
+        return str(max(mtimes)) if mtimes else None
+
+
+def sheet_snapshot_dir(snapshot_dir: str, sheet_name: str) -> str:
+    return os.path.join(snapshot_dir, quote(sheet_name, safe=' -_'))
+
+def snapshot_path(snapshot_dir: str, sheet_name: str, tab_name: str) -> str:
+    """The snapshot file of a tab. Names are escaped, since tab names can contain '/'"""
+    return os.path.join(sheet_snapshot_dir(snapshot_dir, sheet_name), quote(tab_name, safe=' -_') + '.json')
+
+def create_data_source(mode: str = 'live', snapshot_dir: Optional[str] = None) -> SheetDataSource:
+    if mode not in SOURCE_MODES:
+        raise ValueError(f"Unknown sheets source: {mode} (expected one of {', '.join(SOURCE_MODES)})")
+    snapshot_dir = snapshot_dir or DEFAULT_SNAPSHOT_DIR
+    if mode == 'record':
+        return RecordingSource(GoogleSheetSource(), snapshot_dir)
+    if mode == 'replay':
+        return ReplaySource(snapshot_dir)
+    return GoogleSheetSource()
+
+
+_data_source: Optional[SheetDataSource] = None
+# Sources created from the environment, reused so that they can key caches
+_env_sources: Dict[Tuple[str, Optional[str]], SheetDataSource] = {}
+
+def set_data_source(source: Optional[SheetDataSource]) -> None:
+    """Use this source for all sheet reads; None goes back to the SHEETS_SOURCE setting"""
+    global _data_source
+    _data_source = source
+
+def get_data_source() -> SheetDataSource:
+    if _data_source is not None:
+        return _data_source
+    settings = (os.environ.get('SHEETS_SOURCE', 'live').strip().lower() or 'live',
+                os.environ.get('SHEETS_SNAPSHOT_DIR'))
+    if settings not in _env_sources:
+        _env_sources[settings] = create_data_source(*settings)
+    return _env_sources[settings]
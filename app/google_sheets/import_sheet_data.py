@@ -1,97 +1,92 @@
-import pandas as pd
-from app.google_sheets.init_sheet_access import get_google_sheet_data
-from app.scheduler.constants import DAYS, SHIFTS
+from app.google_sheets.init_sheet_access import get_google_sheet_data, get_google_sheet_records
+from app.google_sheets.sheet_cache import SHEET_CACHE, SheetInputs
+from app.google_sheets.sheet_parser import parse_people_rows, parse_shift_need_rows
 from app.scheduler.person import Person
-from app.scheduler.shift import Shift, VALID_DAYS, VALID_SHIFT_TIMES
+from app.scheduler.preferences import PreferenceModel
+from app.scheduler.shift import Shift
 from app.scheduler.shift_group import ShiftGroup
-from typing import List
+from time import perf_counter_ns
+from typing import List, Optional, TYPE_CHECKING
 
-def parse_people_data(df: pd.DataFrame, shift_group: ShiftGroup, max_weekend: int = 1) -> List[Person]:
-    """Parse people data from sheet and return list of Person objects.
+if TYPE_CHECKING:
+    from app.scheduler.metrics import SolveStats
+
+def parse_people_data(data, shift_group: ShiftGroup, max_weekend: int = 1) -> List[Person]:
+    """Parse people data from sheet (records, rows or a DataFrame) and return list of Person objects.
        If max_weekend is provided, it overrides each Person's maximum weekend shifts.
     """
-    # Fix the boolean columns
-    boolean_columns = ["Double Shifts?", "3 Shift Days?", "Night + Noon"]
-    for col in boolean_columns:
-        df[col] = df[col].astype(str).str.strip().str.upper() == "TRUE"
-
-    # Create uppercase version of column names for case-insensitive matching
-    column_map = {col.upper(): col for col in df.columns}
-
-    people = []
-    for _, row in df.iterrows():
-        name = row["Name"]
-        blocked_shifts = {}
-        
-        # Get availability from column names
-        for day in VALID_DAYS:
-            for time in VALID_SHIFT_TIMES:
-                column_key = f"{day} {time}".upper()
-                if column_key in column_map:
-                    original_col = column_map[column_key]
-                    value = str(row[original_col]).strip().upper()
-                    if value == "FALSE":
-                        blocked_shifts[(day, time)] = True
+    return [Person(**row) for row in parse_people_rows(data, max_weekend=max_weekend)]
 
-        # Create Person object
-        person = Person(
-            name=row["Name"],
-            blocked_shifts = blocked_shifts,
-            double_shift=row["Double Shifts?"],
-            max_shifts=int(row["Max Shifts"]),
-            max_nights=int(row["Max Nights"]),
-            are_three_shifts_possible=row["3 Shift Days?"],
-            night_and_noon_possible=row["Night + Noon"],
-            shift_counts=0,
-            night_counts=0,
-            max_weekend_shifts=max_weekend
-        )
-        people.append(person)
-    
-    return people
-
-def parse_shift_needs(df: pd.DataFrame, shift_group: ShiftGroup) -> List[Shift]:
-    """Parse shift requirements and return list of (day, time, needed) tuples"""
-    shifts_data = []
-    
-    for _, row in df.iterrows():
-        day = row[df.columns[0]]  # First column is the day
-        for shift_time in SHIFTS:
-            if pd.notnull(row[shift_time]) and row[shift_time] > 0:
-                shifts_data.append((day, shift_time, int(row[shift_time])))
-    
-    shifts = []
-    for day, time, needed in shifts_data:
-        shift = Shift(day, time, group=shift_group, needed=needed)
-        shifts.append(shift)
-    
-    return shifts
+def parse_shift_needs(data, shift_group: ShiftGroup) -> List[Shift]:
+    """Parse shift requirements (records, rows or a DataFrame) and return the list of Shift objects"""
+    return [Shift(day, time, group=shift_group, needed=needed) for day, time, needed in parse_shift_need_rows(data)]
 
 def get_fresh_data(
     shift_needs_sheet_name: str = "Needed Shifts",
     people_sheet_name: str = "Real Data - 15/01",
-    max_weekend: int = 1
+    max_weekend: int = 1,
+    stats: Optional['SolveStats'] = None,
+    use_cache: bool = True
 ) -> ShiftGroup:
     """
     Gets fresh data from Google Sheets and processes it into a ShiftGroup.
     If max_weekend is provided, it is used as the default for all Person objects.
+    If stats is provided, the time spent loading and parsing is added to its phases.
+
+    The parsed sheets are kept in SHEET_CACHE, so an unchanged spreadsheet is neither
+    downloaded nor parsed again (use_cache=False always reads it). Every call still
+    returns a new ShiftGroup, since solving changes it.
     """
-    # Get raw data from sheets
-    shift_needs_raw = get_google_sheet_data("Shifts", shift_needs_sheet_name)
-    people_raw = get_google_sheet_data("Shifts", people_sheet_name)
+    phase_start = perf_counter_ns()
+    if use_cache:
+        cache_key = SHEET_CACHE.make_key("Shifts", shift_needs_sheet_name, people_sheet_name, max_weekend)
+        inputs, revision = SHEET_CACHE.lookup(cache_key)
+    else:
+        cache_key = inputs = revision = None
+    if inputs is None:
+
+        # Get raw data from sheets, both tabs in one request
+        tabs = get_google_sheet_records("Shifts", [shift_needs_sheet_name, people_sheet_name])
+        shift_needs_raw, people_raw = tabs[shift_needs_sheet_name], tabs[people_sheet_name]
+        if stats is not None:
+            phase_start = stats.end_phase('load', phase_start)
+
+        inputs = SheetInputs(
+            shift_needs=parse_shift_need_rows(shift_needs_raw),
+            people=parse_people_rows(people_raw, max_weekend=max_weekend)
+        )
+        if use_cache:
+            SHEET_CACHE.put(cache_key, inputs, revision)
+    elif stats is not None:
+        phase_start = stats.end_phase('load', phase_start)
+
+    shift_group = build_shift_group(inputs)
+    if stats is not None:
+        stats.end_phase('parse', phase_start)
     
-    # Create new ShiftGroup
+    return shift_group
+
+def build_shift_group(inputs: SheetInputs) -> ShiftGroup:
+    """A new ShiftGroup, with compiled constraints, from parsed sheet data"""
     shift_group = ShiftGroup()
     
-    # Parse and add shifts
-    shift_group.shifts = parse_shift_needs(shift_needs_raw, shift_group)
+    # Add the shifts and people
+    shift_group.shifts = [Shift(day, time, group=shift_group, needed=needed) for day, time, needed in inputs.shift_needs]
+    shift_group.people = [Person(**row) for row in inputs.people]
 
-    
-    # Parse and add people
-    people = parse_people_data(people_raw, shift_group, max_weekend=max_weekend)
-    shift_group.people = people
-    
+    # Precompute everyone's candidate slots and conflict graph before any solve
+    shift_group.compile_constraints()
     return shift_group
 
+def get_preferences(shift_group: ShiftGroup, preferences_sheet_name: str = "Preferences") -> PreferenceModel:
+    """
+    Gets the team preferences from a Google Sheets tab (see PreferenceModel.from_records)
+    and validates them against the people of shift_group.
+    """
+    preferences_raw = get_google_sheet_records("Shifts", [preferences_sheet_name])[preferences_sheet_name]
+    preference_model = PreferenceModel.from_records(preferences_raw)
+    preference_model.validate(shift_group.people)
+    return preference_model
+
 # print(shift_requirements)
 # print(structured_data)
\ No newline at end of file
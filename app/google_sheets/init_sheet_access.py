@@ -1,38 +1,126 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import pandas as pd
 import os
 import json
+import threading
+from typing import Dict, List, TYPE_CHECKING
+from app.google_sheets.data_sources import get_data_source
+
+# gspread and oauth2client take a while to import, so they are only imported
+# once Google Sheets is actually read (never when replaying snapshots)
+if TYPE_CHECKING:
+    import gspread
 
 def get_google_sheet_data(sheet_name, tab_name):
+    """Worksheet records as a DataFrame, from the active data source (see data_sources). Needs pandas"""
+    import pandas as pd
+    return pd.DataFrame(get_data_source().get_records(sheet_name, tab_name))
+
+def get_google_sheet_records(sheet_name, tab_names):
+    """Records of several tabs of a spreadsheet by tab name, read together"""
+    return get_data_source().get_many(sheet_name, tab_names)
+
+def get_credentials():
+    from oauth2client.service_account import ServiceAccountCredentials
+
     # Define the scope and authenticate
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    
+
+    # First, try to get credentials from environment variable
+    creds_json = os.environ.get('GOOGLE_SHEETS_CREDENTIALS')
+    if creds_json:
+        # Parse the JSON string from environment variable
+        creds_dict = json.loads(creds_json)
+        return ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+
+    # Fallback to file for local development
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(current_dir))
+    credentials_path = os.path.join(project_root, 'google sheets access key.json')
+    return ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
+
+
+class SheetsClient:
+    """
+    One authorised gspread client per process, with the spreadsheets it opened.
+
+    The client is authorised again when its access token has expired, or when a
+    request is rejected as unauthorised, so long running processes keep working.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._client = None
+        self._spreadsheets: Dict[str, 'gspread.Spreadsheet'] = {}
+
+    def _connect(self) -> None:
+        import gspread
+        if self._credentials is None:
+            self._credentials = get_credentials()
+        self._client = gspread.authorize(self._credentials)
+        self._spreadsheets.clear()  # Handles belong to the previous client
+
+    def _token_expired(self) -> bool:
+        # oauth2client and google-auth credentials name this differently
+        credentials = self._credentials
+        return bool(getattr(credentials, 'access_token_expired', False) or getattr(credentials, 'expired', False))
+
+    def open(self, sheet_name: str, reconnect: bool = False) -> 'gspread.Spreadsheet':
+        with self._lock:
+            if reconnect or self._client is None or self._token_expired():
+                self._connect()
+            if sheet_name not in self._spreadsheets:
+                self._spreadsheets[sheet_name] = self._client.open(sheet_name)
+            return self._spreadsheets[sheet_name]
+
+    def _call(self, sheet_name: str, request):
+        """Run request(spreadsheet), authorising again once if the token was rejected"""
+        import gspread
+        try:
+            return request(self.open(sheet_name))
+        except gspread.exceptions.APIError as e:
+            if getattr(e.response, 'status_code', None) != 401:
+                raise
+            return request(self.open(sheet_name, reconnect=True))
+
+    def fetch_tabs(self, sheet_name: str, tab_names: List[str]) -> Dict[str, List[Dict]]:
+        """Records of each tab, as get_all_records returns them, with a single values request"""
+        ranges = ["'" + tab_name.replace("'", "''") + "'" for tab_name in tab_names]
+        response = self._call(sheet_name, lambda spreadsheet: spreadsheet.values_batch_get(ranges))
+        return {
+            tab_name: rows_to_records(value_range.get('values', []))
+            for tab_name, value_range in zip(tab_names, response['valueRanges'])
+        }
+
+    def fetch_revision(self, sheet_name: str) -> str:
+        """The spreadsheet's last modified time, from its Drive metadata (no worksheet data is read)"""
+        return self._call(sheet_name, lambda spreadsheet: spreadsheet.get_lastUpdateTime())
+
+
+def rows_to_records(rows: List[List]) -> List[Dict]:
+    """Turn rows (header first) into records the way get_all_records does"""
+    from gspread.utils import fill_gaps, numericise_all
+    if not rows:
+        return []
+    rows = fill_gaps(rows)  # The values API drops trailing empty cells
+    header, values = rows[0], rows[1:]
+    return [dict(zip(header, numericise_all(row))) for row in values]
+
+
+_sheets_client = SheetsClient()
+
+def fetch_sheet_tabs(sheet_name, tab_names):
+    try:
+        return _sheets_client.fetch_tabs(sheet_name, tab_names)
+    except Exception as e:
+        print(f"Error accessing Google Sheets: {str(e)}")
+        raise
+
+def fetch_sheet_records(sheet_name, tab_name):
+    return fetch_sheet_tabs(sheet_name, [tab_name])[tab_name]
+
+def fetch_sheet_revision(sheet_name):
     try:
-        # First, try to get credentials from environment variable
-        creds_json = os.environ.get('GOOGLE_SHEETS_CREDENTIALS')
-        if creds_json:
-            # Parse the JSON string from environment variable
-            creds_dict = json.loads(creds_json)
-            credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        else:
-            # Fallback to file for local development
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(os.path.dirname(current_dir))
-            credentials_path = os.path.join(project_root, 'google sheets access key.json')
-            credentials = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
-    
-        # Authorize the client
-        client = gspread.authorize(credentials)
-
-        # Open the sheet by name and access a specific tab
-        sheet = client.open(sheet_name)
-        worksheet = sheet.worksheet(tab_name)
-
-        # Get all data from the worksheet
-        data = worksheet.get_all_records()
-        return pd.DataFrame(data)
-        
+        return _sheets_client.fetch_revision(sheet_name)
     except Exception as e:
         print(f"Error accessing Google Sheets: {str(e)}")
         raise
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, TYPE_CHECKING
+from app.google_sheets.data_sources import get_data_source
+from app.google_sheets.sheet_cache import SHEET_CACHE, SheetInputs
+from app.google_sheets.sheet_parser import parse_people_rows, parse_shift_need_rows
+
+if TYPE_CHECKING:
+    from app.scheduler.shift_group import ShiftGroup
+
+logger = logging.getLogger(__name__)
+
+
+class SheetPrefetcher:
+    """
+    Keeps the sheet data warm in a background thread, so requests never wait for Google Sheets.
+
+    Every interval seconds the thread checks the spreadsheet's revision and, when it
+    changed, reads both tabs (in one batched request), parses them and stores them in
+    SHEET_CACHE. It also keeps one compiled ShiftGroup ready per max_weekend value, which
+    get_shift_group hands out; a new one is built in the background for the next request.
+
+    Requests for a refresh while one is running are coalesced into a single follow-up,
+    and nothing a request calls waits for the thread or the network.
+    """
+
+    def __init__(self,
+                 interval: float = 60.0,
+                 sheet_name: str = "Shifts",
+                 shift_needs_tab: str = "Needed Shifts",
+                 people_tab: str = "Real Data - 15/01",
+                 max_weekends: Iterable[int] = (1,)):
+        self.interval = interval
+        self.sheet_name = sheet_name
+        self.shift_needs_tab = shift_needs_tab
+        self.people_tab = people_tab
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refresh_requested = False
+        self._max_weekends = set(max_weekends)
+        self._inputs: Dict[int, SheetInputs] = {}
+        self._spares: Dict[int, 'ShiftGroup'] = {}
+        self._revision: Optional[str] = None
+
+        self.refreshes = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> 'SheetPrefetcher':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sheet-prefetcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def refresh_now(self) -> None:
+        """Ask for a refresh without waiting for it"""
+        with self._lock:
+            self._refresh_requested = True
+        self._wake.set()
+
+    def get_shift_group(self, max_weekend: int = 1) -> Optional['ShiftGroup']:
+        """
+        A new compiled ShiftGroup of the latest data, or None if it is not loaded yet.
+        A max_weekend seen for the first time is loaded from then on.
+        """
+        with self._lock:
+            spare = self._spares.pop(max_weekend, None)
+            inputs = self._inputs.get(max_weekend)
+            if max_weekend not in self._max_weekends:
+                self._max_weekends.add(max_weekend)
+                self._refresh_requested = True
+        self._wake.set()  # Build the next spare (or load the new max_weekend)
+
+        if spare is not None:
+            return spare
+        if inputs is not None:
+            # Taken faster than the thread replaced it: building from parsed data needs no network
+            from app.google_sheets.import_sheet_data import build_shift_group
+            return build_shift_group(inputs)
+        return None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'revision': self._revision,
+                'loaded': sorted(self._inputs),
+                'ready': sorted(self._spares),
+                'refreshes': self.refreshes,
+                'errors': self.errors,
+                'last_error': self.last_error,
+            }
+
+    def _run(self) -> None:
+        poll = True
+        next_poll = 0.0
+        while not self._stop.is_set():
+            if poll:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+                    logger.warning(f"Sheet prefetch failed: {e}")
+                next_poll = time.monotonic() + self.interval
+            self._build_spares()
+
+            woken = self._wake.wait(max(0.0, next_poll - time.monotonic()))
+            self._wake.clear()
+            with self._lock:
+                poll = self._refresh_requested or not woken
+                self._refresh_requested = False
+
+    def refresh(self) -> bool:
+        """Load the sheets if the revision changed (or is unknown); returns whether they were read"""
+        source = get_data_source()
+        revision = source.get_revision(self.sheet_name)
+        with self._lock:
+            max_weekends = sorted(self._max_weekends)
+            unchanged = (revision is not None and revision == self._revision
+                         and all(max_weekend in self._inputs for max_weekend in max_weekends))
+            inputs = dict(self._inputs)
+
+        if not unchanged:
+            records = source.get_many(self.sheet_name, [self.shift_needs_tab, self.people_tab])
+            shift_needs = parse_shift_need_rows(records[self.shift_needs_tab])
+            inputs = {
+                max_weekend: SheetInputs(shift_needs, parse_people_rows(records[self.people_tab], max_weekend))
+                for max_weekend in max_weekends
+            }
+            with self._lock:
+                self._inputs = inputs
+                self._revision = revision
+                self._spares.clear()  # Built from the previous data
+                self.refreshes += 1
+
+        # Keep get_fresh_data's cache fresh too, so it does not check the revision itself
+        for max_weekend, max_weekend_inputs in inputs.items():
+            key = SHEET_CACHE.make_key(self.sheet_name, self.shift_needs_tab, self.people_tab, max_weekend)
+            SHEET_CACHE.put(key, max_weekend_inputs, revision)
+        return not unchanged
+
+    def _build_spares(self) -> None:
+        from app.google_sheets.import_sheet_data import build_shift_group
+        with self._lock:
+            missing = {max_weekend: inputs for max_weekend, inputs in self._inputs.items()
+                       if max_weekend not in self._spares}
+        for max_weekend, inputs in missing.items():
+            shift_group = build_shift_group(inputs)
+            with self._lock:
+                # Only keep it if the data was not replaced in the meantime
+                if self._inputs.get(max_weekend) is inputs:
+                    self._spares[max_weekend] = shift_group
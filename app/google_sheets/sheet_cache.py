@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.google_sheets.data_sources import SheetDataSource, get_data_source
+
+# Process wide cache of parsed sheet data for get_fresh_data.
+#
+# An entry is trusted for ttl seconds. After that, the spreadsheet's revision
+# (its last modified time) is compared with the one the entry was read at: an
+# unchanged spreadsheet keeps the entry for another ttl, anything else (including
+# a source that cannot tell its revision) drops it so the sheets are read again.
+
+
+class SheetInputs(NamedTuple):
+    """What get_fresh_data parses from the sheets, as plain data"""
+    shift_needs: List[Tuple[str, str, int]]  # (day, time, needed)
+    people: List[Dict]  # Person constructor arguments
+
+
+class CacheKey(NamedTuple):
+    source: SheetDataSource
+    sheet_name: str
+    shift_needs_tab: str
+    people_tab: str
+    max_weekend: int
+
+
+class _Entry:
+    __slots__ = ('inputs', 'revision', 'checked_at')
+
+    def __init__(self, inputs: SheetInputs, revision: Optional[str], checked_at: float):
+        self.inputs = inputs
+        self.revision = revision
+        self.checked_at = checked_at
+
+
+class SheetDataCache:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[CacheKey, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(sheet_name: str, shift_needs_tab: str, people_tab: str, max_weekend: int) -> CacheKey:
+        """Key of the data read from the active data source"""
+        return CacheKey(get_data_source(), sheet_name, shift_needs_tab, people_tab, max_weekend)
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[SheetInputs], Optional[str]]:
+        """
+        (cached inputs, None), or on a miss (None, the current revision), which the
+        caller reads before the data and passes to put, so it is only fetched once
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.checked_at < self.ttl:
+                self.hits += 1
+                return entry.inputs, None
+
+        # The revision check is a network call, so it is made outside the lock
+        revision = key.source.get_revision(key.sheet_name)
+        with self._lock:
+            if entry is not None and revision is not None and revision == entry.revision:
+                entry.checked_at = time.monotonic()
+                self.revalidations += 1
+                return entry.inputs, None
+            if entry is not None and self._entries.get(key) is entry:
+                del self._entries[key]
+            self.misses += 1
+            return None, revision
+
+    def put(self, key: CacheKey, inputs: SheetInputs, revision: Optional[str]) -> None:
+        """Cache inputs read at the given revision (read it before the data, so a change during the read is not missed)"""
+        with self._lock:
+            self._entries[key] = _Entry(inputs, revision, time.monotonic())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'revalidations': self.revalidations,
+                'misses': self.misses,
+            }
+
+
+# SHEETS_CACHE_TTL is in seconds; 0 checks the revision on every read
+SHEET_CACHE = SheetDataCache(ttl=float(os.environ.get('SHEETS_CACHE_TTL', 300)))
@@ -0,0 +1,110 @@
+from typing import Dict, List, Sequence, Tuple
+from app.scheduler.shift import SLOT_IDS, VALID_DAYS, VALID_SHIFT_TIMES
+
+# Parsers for the people and shift needs sheets that work on the data as the
+# Sheets API returns it, without pandas. The input can be records (one dict per
+# row, as get_all_records returns them), rows (a list of lists, header first) or
+# anything with a to_dict('records') method such as a DataFrame.
+#
+# The header is resolved to column positions once per sheet, so each row is a
+# single pass over its cells.
+
+BOOLEAN_COLUMNS = {
+    'double_shift': "Double Shifts?",
+    'are_three_shifts_possible': "3 Shift Days?",
+    'night_and_noon_possible': "Night + Noon",
+}
+NUMBER_COLUMNS = {
+    'max_shifts': "Max Shifts",
+    'max_nights': "Max Nights",
+}
+
+
+def to_table(data) -> Tuple[List[str], List[Sequence]]:
+    """The header and the rows of sheet data given as records, rows or a DataFrame"""
+    if hasattr(data, 'to_dict'):
+        data = data.to_dict('records')
+    data = list(data)
+    if not data:
+        return [], []
+    if isinstance(data[0], dict):
+        header = list(data[0])
+        return header, [[record.get(column, "") for column in header] for record in data]
+    # The values API drops trailing empty cells, so rows can be shorter than the header
+    header = [str(column) for column in data[0]]
+    width = len(header)
+    return header, [list(row) + [""] * (width - len(row)) if len(row) < width else row for row in data[1:]]
+
+def _is_true(value) -> bool:
+    return value is True or str(value).strip().upper() == "TRUE"
+
+def _is_false(value) -> bool:
+    return value is False or str(value).strip().upper() == "FALSE"
+
+def _to_number(value) -> int:
+    """Cell value as an int; empty cells (and NaN from a DataFrame) count as 0"""
+    if value is None or value == "" or value != value:
+        return 0
+    return int(float(value))
+
+def _column(positions: Dict[str, int], name: str, sheet: str) -> int:
+    if name not in positions:
+        raise ValueError(f"Missing column in {sheet} sheet: {name}")
+    return positions[name]
+
+
+def parse_people_rows(data, max_weekend: int = 1) -> List[Dict]:
+    """
+    Parse the people sheet into the Person constructor arguments of each row.
+    A shift is blocked when its "<Day> <Time>" column (matched case-insensitively) is FALSE.
+    """
+    header, rows = to_table(data)
+    if not header:
+        return []
+    positions = {column: i for i, column in enumerate(header)}
+    name_col = _column(positions, "Name", "people")
+    boolean_cols = [(key, _column(positions, column, "people")) for key, column in BOOLEAN_COLUMNS.items()]
+    number_cols = [(key, _column(positions, column, "people")) for key, column in NUMBER_COLUMNS.items()]
+
+    # Availability columns and the slot bit each one stands for
+    upper_positions = {column.strip().upper(): i for i, column in enumerate(header)}
+    slot_cols = [
+        (upper_positions[f"{day} {time}".upper()], 1 << SLOT_IDS[(day, time)])
+        for day in VALID_DAYS for time in VALID_SHIFT_TIMES
+        if f"{day} {time}".upper() in upper_positions
+    ]
+
+    people = []
+    for row in rows:
+        blocked_mask = 0
+        for col, bit in slot_cols:
+            if _is_false(row[col]):
+                blocked_mask |= bit
+
+        person = {'name': row[name_col], 'blocked_shifts': blocked_mask}
+        for key, col in boolean_cols:
+            person[key] = _is_true(row[col])
+        for key, col in number_cols:
+            person[key] = _to_number(row[col])
+        person.update(shift_counts=0, night_counts=0, max_weekend_shifts=max_weekend)
+        people.append(person)
+
+    return people
+
+def parse_shift_need_rows(data) -> List[Tuple[str, str, int]]:
+    """Parse the shift needs sheet (day in the first column, a column per shift time) into (day, time, needed) tuples"""
+    header, rows = to_table(data)
+    if not header:
+        return []
+    positions = {column: i for i, column in enumerate(header)}
+    time_cols = [(time, _column(positions, time, "shift needs")) for time in VALID_SHIFT_TIMES]
+
+    shifts_data = []
+    for row in rows:
+        day = row[0]
+        for shift_time, col in time_cols:
+            needed = _to_number(row[col])
+            if needed > 0:
+                shifts_data.append((day, shift_time, needed))
+
+    return shifts_data
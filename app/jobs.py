@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from app.scheduler.metrics import SolveStats
+from app.scheduler.progress import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+# Job states; the last three are final
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while all workers are busy and the queue is full"""
+
+
+class Job:
+    """
+    A solve running in the background. The job function reports its progress
+    through set_stage, stats and progress, and stops early when cancel_event is set.
+    The solver also sets cancel_event when it times out, so only cancelled tells
+    whether the job was cancelled.
+    Readers of progress get a 'stage' event per stage and a final 'done' event.
+    """
+
+    def __init__(self, func: Callable[['Job'], Dict]):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.stats = SolveStats()
+        self.progress = ProgressReporter()
+        self.cancel_event = threading.Event()
+        self.cancelled = False
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+        self.progress.publish('stage', {'stage': stage})
+
+    def get_progress(self) -> Dict:
+        # The counters are written by the solving thread; reading them here is only a snapshot
+        end = self.finished or time.time()
+        return {
+            'stage': self.stage,
+            'nodes': self.stats.nodes,
+            'combos_tried': self.stats.combos_tried,
+            'elapsed_seconds': round(end - self.started, 3) if self.started else 0.0,
+        }
+
+    def to_dict(self) -> Dict:
+        job = {'job_id': self.id, 'status': self.status, 'progress': self.get_progress()}
+        if self.result is not None:
+            job['result'] = self.result
+        if self.error is not None:
+            job['error'] = self.error
+        return job
+
+
+class JobManager:
+    """
+    Runs jobs on a fixed number of worker threads with a bounded queue.
+    Finished jobs are kept for keep_seconds so their result can be fetched.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 8, keep_seconds: float = 600):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='solver-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[[Job], Dict]) -> Job:
+        """Queue func(job), which returns the job's result; raises QueueFullError if there is no room"""
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if not job.is_finished)
+            if pending >= self.max_workers + self.max_queued:
+                raise QueueFullError(f"{pending} jobs are already queued or running")
+            job = Job(func)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job; a queued job never starts and a running one stops at its next search node"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.is_finished:
+                job.cancelled = True
+                job.cancel_event.set()
+                if job.status == QUEUED:
+                    job.status = CANCELLED
+                    job.finished = time.time()
+                    self._notify_finished(job)
+        return job
+
+    def shutdown(self, cancel: bool = True) -> None:
+        if cancel:
+            with self._lock:
+                for job in self._jobs.values():
+                    job.cancelled = True
+                    job.cancel_event.set()
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.status != QUEUED:  # Cancelled while queued
+                return
+            job.status = RUNNING
+            job.started = time.time()
+        try:
+            result = job.func(job)
+            status, error = (CANCELLED if job.cancelled else DONE), None
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            result, status, error = None, FAILED, str(e)
+        with self._lock:
+            job.result, job.error = result, error
+            job.status = status
+            job.finished = time.time()
+            self._notify_finished(job)
+
+    @staticmethod
+    def _notify_finished(job: Job) -> None:
+        job.progress.publish('done', job.to_dict())
+        job.progress.close()
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than keep_seconds (called with the lock held)"""
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.is_finished and job.finished < cutoff]:
+            del self._jobs[job_id]
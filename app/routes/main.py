@@ -1,40 +1,186 @@
-from flask import Blueprint, render_template, jsonify, request
-from app.google_sheets.import_sheet_data import get_fresh_data
-from app.scheduler.shifts_algo import run_shift_algorithm
+import json
+from flask import Blueprint, Response, current_app, render_template, jsonify, request, stream_with_context, url_for
+from app.jobs import QueueFullError
+from app.scheduler.metrics import REGISTRY, SolveStats, format_profile
 from app.scheduler.constants import DAYS, SHIFTS
 
 bp = Blueprint('main', __name__)
 TIMEOUT_SECONDS = 15
+SSE_KEEPALIVE_SECONDS = 10
 
 @bp.route('/')
 def index():
     return render_template('index.html', DAYS=DAYS, SHIFTS=SHIFTS)
 
+def solve_schedule(data, stats, prefetcher=None, cancel_event=None, set_stage=None, progress=None):
+    """Load the data, solve and build the response of a schedule request (data is its JSON)"""
+    # The solver and the Sheets client are loaded on first use, so workers start quickly
+    from app.google_sheets.import_sheet_data import get_fresh_data, get_preferences
+    from app.scheduler.shifts_algo import run_shift_algorithm
+    from app.scheduler.preferences import PreferenceModel
+    from app.scheduler.result_cache import CACHEABLE_OUTCOMES, RESULT_CACHE, problem_key
+    from app.scheduler.single_flight import SINGLE_FLIGHT
+
+    max_weekend = int(data.get('max_weekend', 1))  # Default to 1 if not provided
+
+    # "profile": true returns a phase time breakdown, "profile": "cprofile" also the top cProfile entries
+    profile = data.get('profile', False)
+
+    if set_stage:
+        set_stage('loading')
+    # Start from the prefetched data when it is warm, otherwise get fresh data
+    shift_group = prefetcher.get_shift_group(max_weekend) if prefetcher is not None else None
+    if shift_group is None:
+        shift_group = get_fresh_data(max_weekend=max_weekend, stats=stats)
+
+    # Optional team preferences, either inline or from a sheet tab
+    try:
+        if data.get('preferences') is not None:
+            preference_model = PreferenceModel.from_dict(data['preferences'])
+            preference_model.validate(shift_group.people)
+        elif data.get('preferences_sheet'):
+            preference_model = get_preferences(shift_group, data['preferences_sheet'])
+        else:
+            preference_model = None
+    except (ValueError, KeyError) as e:
+        return {'success': False, 'reason': f"Invalid preferences: {e}"}
+
+    # The same problem solved before is answered from the cache (unless a profile of the solve is wanted)
+    cache_key = problem_key(shift_group, preference_model)
+
+    def get_cached():
+        cached = RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            cached['cached'] = True
+        return cached
+
+    if not profile:
+        cached = get_cached()
+        if cached is not None:
+            return cached
+
+    def solve():
+        if set_stage:
+            set_stage('solving')
+        # Run the algorithm with fresh data
+        success, assignments, reason, shift_counts, people = run_shift_algorithm(
+            shift_group=shift_group,
+            timeout=TIMEOUT_SECONDS,
+            preference_model=preference_model,
+            stats=stats,
+            profile=profile == 'cprofile',
+            cancel_event=cancel_event,
+            progress=progress
+        )
+        
+        if success:
+            result = {
+                'success': True,
+                'assignments': assignments,
+                'shifts_per_person': shift_counts  # shift_counts is already in the right format
+            }
+        else:
+            result = {
+                'success': False,
+                'reason': reason
+            }
+        if stats.outcome in CACHEABLE_OUTCOMES:
+            RESULT_CACHE.put(cache_key, result)
+        # A cancelled solve says nothing about the problem: the requests waiting on it solve it themselves
+        return result, stats.outcome != 'cancelled'
+
+    if profile:
+        # The profile has to be of this request's own solve
+        result, _ = solve()
+        result['profile'] = {'phases': stats.get_phase_breakdown()}
+        if stats.profile is not None:
+            result['profile']['cprofile'] = format_profile(stats.profile)
+        return result
+
+    # Concurrent requests for the same problem share one solve
+    result, coalesced = SINGLE_FLIGHT.run(
+        cache_key, solve, recheck=get_cached, cancel_event=cancel_event,
+        on_wait=(lambda: set_stage('waiting')) if set_stage else None
+    )
+    if result is None:
+        return {'success': False, 'reason': "Algorithm cancelled"}
+    return dict(result, coalesced=True) if coalesced else result
+
 @bp.route('/generate_schedule', methods=['POST'])
 def generate_schedule():
-    # Get max_weekend from the request JSON data
+    result = solve_schedule(request.get_json(), SolveStats(),
+                            prefetcher=current_app.extensions.get('sheet_prefetcher'))
+    return jsonify(result) 
+
+@bp.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a schedule request (same JSON as /generate_schedule); poll GET /jobs/<id> for the result"""
     data = request.get_json()
-    max_weekend = int(data.get('max_weekend', 1))  # Default to 1 if not provided
-    
-    # Get fresh data using the centralized function with max_weekend parameter
-    shift_group = get_fresh_data(max_weekend=max_weekend)
-    
-    # Run the algorithm with fresh data
-    success, assignments, reason, shift_counts, people = run_shift_algorithm(
-        shift_group=shift_group,
-        timeout=TIMEOUT_SECONDS
-    )
-    
-    if success:
-        result = {
-            'success': True,
-            'assignments': assignments,
-            'shifts_per_person': shift_counts  # shift_counts is already in the right format
-        }
-    else:
-        result = {
-            'success': False,
-            'reason': reason
-        }
-    
-    return jsonify(result) 
\ No newline at end of file
+    prefetcher = current_app.extensions.get('sheet_prefetcher')
+
+    def run(job):
+        return solve_schedule(data, job.stats, prefetcher=prefetcher, cancel_event=job.cancel_event,
+                              set_stage=job.set_stage, progress=job.progress)
+
+    try:
+        job = current_app.extensions['job_manager'].submit(run)
+    except QueueFullError as e:
+        response = jsonify({'success': False, 'reason': f"Too many schedules are being generated: {e}"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = url_for('main.get_job', job_id=job.id)
+    return response, 202
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = current_app.extensions['job_manager'].get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'reason': "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@bp.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Server-Sent Events of a job: 'stage' and throttled 'progress' events while it runs,
+    then a 'done' event with the same JSON as GET /jobs/<id>. Resumes after Last-Event-ID.
+    """
+    job = current_app.extensions['job_manager'].get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'reason': "Unknown job"}), 404
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_id = 0
+
+    def stream():
+        after = last_id
+        while True:
+            events = job.progress.read(after, timeout=SSE_KEEPALIVE_SECONDS)
+            for sequence, kind, data in events:
+                yield f"id: {sequence}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+                after = sequence
+                if kind == 'done':
+                    return
+            if not events:
+                if job.progress.closed:  # Already sent before the client reconnected
+                    return
+                yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let proxies pass the events through as they come
+    return response
+
+@bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = current_app.extensions['job_manager'].cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'reason': "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@bp.route('/metrics')
+def metrics():
+    """Solver metrics in the Prometheus text format"""
+    return Response(REGISTRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
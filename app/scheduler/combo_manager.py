@@ -1,6 +1,61 @@
-from typing import List, Tuple, Set
+from collections import OrderedDict
+from itertools import chain, combinations
+from math import comb
+from time import perf_counter_ns
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple, Set, TYPE_CHECKING
+import numpy as np
 from app.scheduler.person import Person
 from app.scheduler.shift import Shift
+from app.scheduler.compatibility import CONFLICT_TABLES
+from app.scheduler.preferences import CompiledPreferences, PreferenceModel
+
+if TYPE_CHECKING:
+    from app.scheduler.metrics import SolveStats
+
+
+class ComboOrderCache:
+    """
+    LRU cache of sorted combination orders, bounded by the memory of the stored arrays.
+    Each entry is a (combos x size) array of indices into the eligible people, in order.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, np.ndarray]' = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        ordered = self._entries.get(key)
+        if ordered is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return ordered
+
+    def put(self, key: Hashable, ordered: np.ndarray) -> None:
+        if ordered.nbytes > self.max_bytes:
+            return
+        self._entries[key] = ordered
+        self._bytes += ordered.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
 
 
 class ComboManager:
@@ -16,16 +71,47 @@ class ComboManager:
         # {'pair': {"Shani Keynan", "Nir Hacohen"}, 'weight': 2},
     ]
 
-    def __init__(self):
+    def __init__(self, preference_model: Optional[PreferenceModel] = None):
         self.preferences = {
             'constraint_score': True,  # Enabled by default
             'preferred_people': True,  # Enabling target names preference
             'double_shifts': True
         }
         
-        # Use the class-defined target pairs
-        self.target_names = self.TARGET_PAIRS
+        # Team preferences, defaulting to the class-defined target pairs
+        self.preference_model = preference_model or PreferenceModel.from_target_pairs(self.TARGET_PAIRS)
+        self.target_names = self.preference_model.get_target_pairs()
         self.current_shift = None  # Add this to store current shift
+
+        # Sorted orders of previously seen (shift, eligible people, scores) states.
+        # One ComboManager is meant to be used for a whole solve, so these carry over between nodes.
+        self.order_cache = ComboOrderCache()
+        self._compiled: Optional[CompiledPreferences] = None
+
+        # When set, the time spent generating and sorting combinations is added to its phases
+        self.stats: Optional['SolveStats'] = None
+
+    def compile_preferences(self, people: List[Person]) -> CompiledPreferences:
+        """
+        Compile the preference model into index tables for the solve's people.
+        Raises ValueError for unknown names if the model is strict.
+        """
+        self._compiled = self.preference_model.compile(people)
+        self.order_cache = ComboOrderCache()
+        return self._compiled
+
+    def _person_indices(self, people: List[Person], shift_group=None) -> List[int]:
+        """Indices of people in the compiled preference tables, compiling them in if needed"""
+        compiled = self._compiled
+        if compiled is None and shift_group is not None:
+            compiled = self._compiled = self.preference_model.compile(shift_group.people, check_names=False)
+        if compiled is None or any(id(person) not in compiled.index for person in people):
+            # People we haven't seen are appended, so existing indices (and cached orders) stay valid
+            known = compiled.people if compiled is not None else []
+            index = compiled.index if compiled is not None else {}
+            new_people = list({id(p): p for p in people if id(p) not in index}.values())
+            compiled = self._compiled = self.preference_model.compile(known + new_people, check_names=False)
+        return [compiled.index[id(person)] for person in people]
         
     def sort_combinations(self, 
                          combinations: List[List[Person]], 
@@ -49,63 +135,167 @@ class ComboManager:
         if not combinations:
             raise ValueError("Cannot sort empty combinations list - this indicates a problem in the algorithm")
             
-        # Store current shift for use in _calculate_constraint_score
+        # The shift the combinations were last sorted for
         self.current_shift = current_shift
-            
-        def get_score_key(combo):
-            """Generate a scoring tuple for sorting"""
-            combo = list(combo) if isinstance(combo, tuple) else combo
-            
-            # Calculate target names score (0 or 1)
-            target_names_score = self._calculate_target_names_score(combo) if self.preferences['preferred_people'] else 0
-            
-            # Calculate constraint score
-            constraint_score = self._calculate_constraint_score(combo, current_shift.shift_type)
-            
-            # Calculate double shifts score
-            double_shifts_score = self._count_double_shifts(combo, current_shift, shift_group) if self.preferences['double_shifts'] and current_shift and shift_group else 0
-            
-            # Sorting priority:
-            # 1. Target pairs (negative to make True come first)
-            # 2. Double shifts (negative to make more double shifts come first)
-            # 3. Constraint score (positive because lower/more constrained is already better)
-            return (-target_names_score, -double_shifts_score, constraint_score)
-            
-        # Sort combinations using the score tuple as key
-        return sorted(combinations, key=get_score_key)
-    
-    def _calculate_constraint_score(self, combo: List[Person], shift_type: str) -> float:
-        """Calculate the total constraint score for a combination."""
-        if not self.preferences['constraint_score'] or not self.current_shift:
-            return 0.0
-        
-        score_type = shift_type
 
-        for person in combo:
-            try:
-                return sum(p.constraint_scores[score_type] for p in combo)
-            except KeyError:
-                raise KeyError(f"Missing {score_type} constraint score for person {person.name}")
+        # Index every person once, then sort the combos as rows of person indices
+        index_of = {}
+        people = []
+        for combo in combinations:
+            for person in combo:
+                if id(person) not in index_of:
+                    index_of[id(person)] = len(people)
+                    people.append(person)
+        combo_indices = np.array(
+            [[index_of[id(person)] for person in combo] for combo in combinations], dtype=np.intp
+        ).reshape(len(combinations), -1)
 
-    def _calculate_target_names_score(self, combo: List[Person]) -> float:
+        order = self.sort_combination_indices(people, combo_indices, current_shift, shift_group)
+        return [combinations[i] for i in order]
+
+    def iter_sorted_combinations(self,
+                                 people: List[Person],
+                                 size: int,
+                                 current_shift: Shift,
+                                 shift_group=None) -> Iterator[List[Person]]:
+        """
+        Generate all combinations of `size` people and yield them in sorted order.
+        Combinations are built and scored as index arrays; a list of Person objects
+        is only created for a combination when it is actually consumed.
+        """
+        if comb(len(people), size) == 0:
+            raise ValueError("Cannot sort empty combinations list - this indicates a problem in the algorithm")
+
+        self.current_shift = current_shift
+        stats = self.stats
+        phase_start = perf_counter_ns() if stats is not None else 0
+        person_indices = self._person_indices(people, shift_group)
+        constraint_scores, double_shifts = self._person_score_vectors(people, current_shift, shift_group)
+
+        # The order only depends on who is eligible and on their scores for this shift
+        people_mask = self._people_mask(person_indices)
+        key = (
+            current_shift.slot, size, people_mask,
+            constraint_scores.tobytes(), double_shifts.tobytes(), tuple(self.preferences.values())
+        )
+        ordered = self.order_cache.get(key) if people_mask is not None else None
+        if ordered is None:
+            if stats is not None:
+                generation_start = perf_counter_ns()
+                lookup_ns = generation_start - phase_start
+            combo_indices = self._combination_indices(len(people), size)
+            if stats is not None:
+                # Moved back by the lookup time, so one combo_sort call covers the lookup and the sort
+                phase_start = stats.end_phase('combo_generation', generation_start) - lookup_ns
+            order = self._sort_indices(person_indices, combo_indices, constraint_scores,
+                                       double_shifts, current_shift)
+            ordered = combo_indices[order]
+            if people_mask is not None:
+                self.order_cache.put(key, ordered)
+        if stats is not None:
+            stats.end_phase('combo_sort', phase_start)
+
+        for row in ordered.tolist():
+            yield [people[j] for j in row]
+
+    def _combination_indices(self, count: int, size: int) -> np.ndarray:
+        """All combinations of `size` out of range(count) as a (combos x size) index array"""
+        total = comb(count, size)
+        return np.fromiter(
+            chain.from_iterable(combinations(range(count), size)),
+            dtype=np.intp, count=total * size
+        ).reshape(total, size)
+
+    def _people_mask(self, person_indices: List[int]) -> Optional[int]:
+        """
+        Bitmask of people by their compiled index (the group's order). Cached orders are
+        positions in the people list, so None is returned, and nothing is cached, unless
+        people come in index order.
+        """
+        mask = 0
+        previous = -1
+        for index in person_indices:
+            if index <= previous:
+                return None
+            mask |= 1 << index
+            previous = index
+        return mask
+
+    def sort_combination_indices(self,
+                                 people: List[Person],
+                                 combo_indices: np.ndarray,
+                                 current_shift: Shift = None,
+                                 shift_group=None) -> np.ndarray:
         """
-        Check if the combination contains any of the target name pairs.
-        Returns a negative weight value for found pairs (lower score = higher priority).
-        Returns 0 if no target pairs are found.
+        Return the sorted order of combinations given as a (combos x size) array of
+        indices into people.
+
+        Sorting priority (ties keep their original order):
+        1. Target pairs (highest total pair weight first)
+        2. Double shifts (more double shifts first)
+        3. Constraint score (lower/more constrained first)
         """
-        names_in_combo = {p.name for p in combo}
-        sum = 0.0
+        person_indices = self._person_indices(people, shift_group)
+        constraint_scores, double_shifts = self._person_score_vectors(people, current_shift, shift_group)
+        return self._sort_indices(person_indices, combo_indices, constraint_scores, double_shifts, current_shift)
+
+    def _sort_indices(self,
+                      person_indices: List[int],
+                      combo_indices: np.ndarray,
+                      constraint_scores: np.ndarray,
+                      double_shifts: np.ndarray,
+                      current_shift: Shift = None) -> np.ndarray:
+        size = combo_indices.shape[1]
+        target_names_score = np.zeros(len(combo_indices))
         if self.preferences['preferred_people']:
-            for target in self.target_names:
-                if len(names_in_combo & target['pair']) == 2:
-                    sum += target['weight']
-        return sum
-
-    def _count_double_shifts(self, combo: List[Person], shift: Shift, shift_group) -> int:
-        """Count how many people in the combo can do double shifts."""
-        if not self.preferences['double_shifts']:
-            return 0
-        if not shift_group:
-            return 0
-        return sum(1 for person in combo 
-                  if person.double_shift and shift_group.is_consecutive_shift(person, shift))
+            # Pair affinities plus each person's preference for this shift, gathered from the compiled tables
+            compiled = self._compiled
+            pair_weights = compiled.pair_weights[np.ix_(person_indices, person_indices)]
+            for a in range(size):
+                for b in range(a + 1, size):
+                    target_names_score += pair_weights[combo_indices[:, a], combo_indices[:, b]]
+            if current_shift is not None:
+                shift_weights = compiled.shift_weights[person_indices, current_shift.slot]
+                if shift_weights.any():
+                    target_names_score += shift_weights[combo_indices].sum(axis=1)
+        double_shifts_score = double_shifts[combo_indices].sum(axis=1)
+        constraint_score = constraint_scores[combo_indices].sum(axis=1)
+
+        # np.lexsort is stable and uses the last key as the primary one
+        return np.lexsort((constraint_score, -double_shifts_score, -target_names_score))
+
+    def _person_score_vectors(self, people: List[Person], current_shift: Shift, shift_group) -> Tuple[np.ndarray, np.ndarray]:
+        """Per person constraint score and double shift indicator for the current shift"""
+        if self.preferences['constraint_score'] and current_shift:
+            score_type = current_shift.shift_type
+            try:
+                constraint_scores = np.array([p.constraint_scores[score_type] for p in people], dtype=float)
+            except KeyError:
+                person = next(p for p in people if score_type not in p.constraint_scores)
+                raise KeyError(f"Missing {score_type} constraint score for person {person.name}")
+        else:
+            constraint_scores = np.zeros(len(people))
+
+        # Fairness: penalise people by the shifts of this type they already have
+        fairness_weight = self._compiled.fairness_weights[current_shift.shift_type] if current_shift else 0.0
+        if fairness_weight:
+            constraint_scores = constraint_scores + fairness_weight * np.array(
+                [_assigned_count_by_type(p, current_shift.shift_type) for p in people], dtype=float
+            )
+
+        double_shifts = np.zeros(len(people), dtype=np.intp)
+        if self.preferences['double_shifts'] and current_shift and shift_group:
+            adjacent_mask = CONFLICT_TABLES['consecutive'][current_shift.slot]
+            for i, person in enumerate(people):
+                if person.double_shift and person.assigned_mask & adjacent_mask:
+                    double_shifts[i] = 1
+        return constraint_scores, double_shifts
+
+
+def _assigned_count_by_type(person: Person, shift_type: str) -> int:
+    """Shifts of a type a person is already assigned to (the counterpart of get_capacity_by_type)"""
+    if shift_type == 'regular':
+        return person.shift_counts - person.night_counts
+    if shift_type == 'night':
+        return person.night_counts
+    return person.weekend_shifts
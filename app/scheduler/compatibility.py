@@ -0,0 +1,102 @@
+from functools import lru_cache
+from typing import Callable, Iterator, Tuple, TYPE_CHECKING
+from app.scheduler.shift import (
+    SLOT_KEYS, SLOT_IDS, VALID_DAYS, VALID_SHIFT_TIMES, WEEKEND_SLOT_MASK, slot_mask
+)
+
+if TYPE_CHECKING:
+    from app.scheduler.person import Person
+
+# Facts that never change during a solve, precomputed per person before the search:
+# the slots a person can ever be assigned to, and which slots exclude each other.
+
+ALL_SLOTS_MASK = (1 << len(SLOT_KEYS)) - 1
+NIGHT_SLOT_MASK = slot_mask(key for key in SLOT_KEYS if key[1] == "Night")
+
+
+def _next_day_pairs(first_time: str, second_time: str) -> Iterator[Tuple[int, int]]:
+    """Slot pairs of first_time on a day and second_time on the following day"""
+    for day, next_day in zip(VALID_DAYS, VALID_DAYS[1:]):
+        yield SLOT_IDS[(day, first_time)], SLOT_IDS[(next_day, second_time)]
+
+def _same_day_pairs(time_pairs) -> Iterator[Tuple[int, int]]:
+    """Slot pairs of the given shift times on the same day"""
+    for day in VALID_DAYS:
+        for first_time, second_time in time_pairs:
+            yield SLOT_IDS[(day, first_time)], SLOT_IDS[(day, second_time)]
+
+def _conflict_table(pairs) -> Tuple[int, ...]:
+    """Symmetric conflict graph as one bitmask of conflicting slots per slot"""
+    table = [0] * len(SLOT_KEYS)
+    for first, second in pairs:
+        table[first] |= 1 << second
+        table[second] |= 1 << first
+    return tuple(table)
+
+# Conflict kinds in the order their reasons are reported
+CONFLICT_TABLES = {
+    'morning_after_night': _conflict_table(_next_day_pairs("Night", "Morning")),
+    'night_noon': _conflict_table(_next_day_pairs("Night", "Noon")),
+    'consecutive': _conflict_table(_same_day_pairs(list(zip(VALID_SHIFT_TIMES, VALID_SHIFT_TIMES[1:])))),
+    'night_after_evening': _conflict_table(_same_day_pairs([("Evening", "Night")])),
+}
+
+CONFLICT_REASONS = {
+    'morning_after_night': "Morning after night conflict",
+    'night_noon': "Night and noon conflict",
+    'consecutive': "Consecutive shift not allowed",
+    'night_after_evening': "Night after evening conflict",
+}
+
+
+@lru_cache(maxsize=None)
+def combined_conflict_masks(kinds: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Union of the conflict graphs of the given kinds (there are only a few distinct profiles)"""
+    return tuple(
+        _or_all(CONFLICT_TABLES[kind][slot] for kind in kinds)
+        for slot in range(len(SLOT_KEYS))
+    )
+
+def _or_all(masks) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+def get_conflict_kinds(person: 'Person', is_enforced: Callable[[str], bool]) -> Tuple[str, ...]:
+    """The conflict kinds that apply to a person given their flags and the enabled constraints"""
+    kinds = ['morning_after_night']
+    if is_enforced('enforce_night_noon') and not person.night_and_noon_possible:
+        kinds.append('night_noon')
+    if is_enforced('enforce_consecutive') and not person.double_shift:
+        kinds.append('consecutive')
+    kinds.append('night_after_evening')
+    return tuple(kinds)
+
+def get_candidate_mask(person: 'Person', is_enforced: Callable[[str], bool]) -> int:
+    """Slots a person can ever be assigned to: not blocked and not excluded by a zero limit"""
+    if person.max_shifts <= 0:
+        return 0
+    mask = ALL_SLOTS_MASK & ~person.blocked_mask
+    if person.max_nights <= 0:
+        mask &= ~NIGHT_SLOT_MASK
+    if is_enforced('enforce_weekend_limit') and person.max_weekend_shifts <= 0:
+        mask &= ~WEEKEND_SLOT_MASK
+    return mask
+
+def candidate_reason(person: 'Person', slot: int) -> str:
+    """Explain why a slot is not among a person's candidate slots"""
+    if person.blocked_mask >> slot & 1:
+        return "Shift is blocked"
+    if person.max_shifts <= 0:
+        return "Maximum shifts reached"
+    if NIGHT_SLOT_MASK >> slot & 1 and person.max_nights <= 0:
+        return "Maximum night shifts reached"
+    return "Weekend shift limit reached"
+
+def conflict_reason(kinds: Tuple[str, ...], assigned_mask: int, slot: int) -> str:
+    """Explain which kind of conflict an assigned slot has with the given slot"""
+    for kind in kinds:
+        if assigned_mask & CONFLICT_TABLES[kind][slot]:
+            return CONFLICT_REASONS[kind]
+    return ""
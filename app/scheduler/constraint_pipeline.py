@@ -0,0 +1,205 @@
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from app.scheduler.flag_manager import FlagManager
+from app.scheduler.compatibility import (
+    candidate_reason, combined_conflict_masks, conflict_reason, get_candidate_mask, get_conflict_kinds
+)
+
+if TYPE_CHECKING:
+    from app.scheduler.person import Person
+    from app.scheduler.shift import Shift
+    from app.scheduler.shift_group import ShiftGroup
+
+# A check returns None when the assignment is allowed, or the reason it is not
+RuleCheck = Callable[['Person', 'Shift'], Optional[str]]
+
+
+class ConstraintRule:
+    """A single eligibility check with call, reject and sampled cost counters"""
+    __slots__ = ('name', 'check', 'calls', 'rejects', 'pending_rejects', 'timed_calls', 'timed_ns')
+
+    def __init__(self, name: str, check: RuleCheck):
+        self.name = name
+        self.check = check
+        self.calls = 0
+        self.rejects = 0
+        self.pending_rejects = 0  # Rejects not yet folded into calls/rejects
+        self.timed_calls = 0
+        self.timed_ns = 0
+
+    @property
+    def reject_rate(self) -> float:
+        """Share of evaluations rejected, smoothed so unseen rules are not ranked on noise"""
+        return (self.rejects + 1) / (self.calls + 2)
+
+    @property
+    def average_cost_ns(self) -> float:
+        return self.timed_ns / self.timed_calls if self.timed_calls else 0.0
+
+    def __repr__(self):
+        return f"ConstraintRule(name={self.name}, calls={self.calls}, rejects={self.rejects})"
+
+
+class ConstraintPipeline:
+    """
+    The enabled eligibility constraints compiled into an ordered list of rules.
+
+    Rules are compiled once from a FlagManager; disabled constraints are left out
+    entirely. Everything that cannot change during a solve is compiled per person
+    into a candidate slot mask and a slot conflict graph (see compatibility), so the
+    search itself only checks those masks and the dynamic counters.
+
+    Every rule counts how often it rejects, and one evaluation in TIMING_SAMPLE_RATE
+    is timed rule by rule. Call counts are derived rather than counted: between two
+    reorders a rule runs once for every evaluation that got past all the rules before
+    it. Every REORDER_INTERVAL evaluations the rules are re-sorted by expected cost
+    per rejection, so cheap and selective checks run first.
+    Whether an evaluation allows the assignment never depends on the order; which
+    reason a rejection reports, and what the evaluation costs, do.
+    """
+    REORDER_INTERVAL = 1024
+    TIMING_SAMPLE_RATE = 16
+
+    def __init__(self, group: 'ShiftGroup', flag_manager: Optional[FlagManager] = None):
+        self.group = group
+        self.flag_manager = flag_manager
+        self.rules: List[ConstraintRule] = self._compile()
+        self._evaluations = 0
+        self._flushed_evaluations = 0
+        self._set_order()
+
+    def _is_enforced(self, constraint_name: str) -> bool:
+        """Without a FlagManager every constraint is enforced"""
+        return self.flag_manager is None or self.flag_manager.is_enforced(constraint_name)
+
+    def _compile(self) -> List[ConstraintRule]:
+        group = self.group
+        rules = []
+
+        if self._is_enforced('enforce_weekend_limit'):
+            rules.append(ConstraintRule('weekend_limit', _check_weekend_limit))
+        rules.append(ConstraintRule('candidate_slots', _check_candidate_slots))
+        rules.append(ConstraintRule('max_shifts', _check_max_shifts))
+        rules.append(ConstraintRule('max_nights', _check_max_nights))
+        rules.append(ConstraintRule('conflicts', _check_conflicts))
+
+        if self._is_enforced('enforce_three_shifts'):
+            def check_three_shifts(person, shift):
+                if group.is_third_shift(person, shift):
+                    if not person.are_three_shifts_possible:
+                        return "Third shift not allowed"
+                    if shift.is_evening or group.is_person_assigned(person, shift.shift_day, "Evening"):
+                        return "Third shift not allowed when evening shift is assigned"
+            rules.append(ConstraintRule('three_shifts', check_three_shifts))
+
+        return rules
+
+    def compile_person(self, person: 'Person') -> None:
+        """Precompute a person's candidate slots and slot conflict graph for this pipeline"""
+        person.candidate_mask = get_candidate_mask(person, self._is_enforced)
+        person.conflict_kinds = get_conflict_kinds(person, self._is_enforced)
+        person.conflict_masks = combined_conflict_masks(person.conflict_kinds)
+        person.shift_limit = person.max_shifts
+        person.night_limit = person.max_nights
+        person.weekend_limit = person.max_weekend_shifts
+        person.compiled_for = self
+
+    def compile_people(self, people: List['Person']) -> None:
+        """Compile the static data of all people up front, before the search starts"""
+        for person in people:
+            self.compile_person(person)
+
+    def _set_order(self) -> None:
+        """Snapshot the rule order into the plain lists used by the hot loop"""
+        self._checks = [rule.check for rule in self.rules]
+        self._rule_by_check = {rule.check: rule for rule in self.rules}
+
+    def check(self, person: 'Person', shift: 'Shift') -> Tuple[bool, str]:
+        """
+        Run the compiled rules for a person and shift.
+        Returns (is_allowed, reason_if_not_allowed)
+        """
+        if person.compiled_for is not self:
+            self.compile_person(person)
+
+        evaluations = self._evaluations + 1
+        if evaluations % self.TIMING_SAMPLE_RATE == 0:
+            return self._check_timed(person, shift)
+        self._evaluations = evaluations
+
+        for check in self._checks:
+            reason = check(person, shift)
+            if reason:
+                self._rule_by_check[check].pending_rejects += 1
+                return False, reason
+        return True, ""
+
+    def _check_timed(self, person: 'Person', shift: 'Shift') -> Tuple[bool, str]:
+        """Same as check, timing every rule it runs; reorders the rules periodically"""
+        # Reorder before this evaluation is counted: the flush must only cover evaluations
+        # whose rejects are already in pending_rejects
+        if (self._evaluations + 1) % self.REORDER_INTERVAL == 0:
+            self.reorder()
+        self._evaluations += 1
+
+        for rule in self.rules:
+            start = perf_counter_ns()
+            reason = rule.check(person, shift)
+            rule.timed_ns += perf_counter_ns() - start
+            rule.timed_calls += 1
+            if reason:
+                rule.pending_rejects += 1
+                return False, reason
+        return True, ""
+
+    def _flush_counters(self) -> None:
+        """Fold the evaluations since the last flush into each rule's call and reject counts"""
+        reached = self._evaluations - self._flushed_evaluations
+        for rule in self.rules:
+            rule.calls += reached
+            reached -= rule.pending_rejects
+            rule.rejects += rule.pending_rejects
+            rule.pending_rejects = 0
+        self._flushed_evaluations = self._evaluations
+
+    def reorder(self) -> None:
+        """Sort rules by expected cost per rejection (cheapest, most selective first)"""
+        self._flush_counters()
+        self.rules.sort(key=lambda rule: rule.average_cost_ns / rule.reject_rate)
+        self._set_order()
+
+    def get_stats(self) -> List[Dict[str, float]]:
+        """Per rule counters in the current evaluation order"""
+        self._flush_counters()
+        return [
+            {
+                'name': rule.name,
+                'calls': rule.calls,
+                'rejects': rule.rejects,
+                'average_cost_ns': rule.average_cost_ns
+            }
+            for rule in self.rules
+        ]
+
+
+# The capacity checks run for every eligibility test, so they read the limits compiled
+# into plain slots by compile_person rather than through Person's properties
+def _check_weekend_limit(person: 'Person', shift: 'Shift') -> Optional[str]:
+    if shift.is_weekend_shift and person.weekend_shifts >= person.weekend_limit:
+        return "Weekend shift limit reached"
+
+def _check_candidate_slots(person: 'Person', shift: 'Shift') -> Optional[str]:
+    if not person.candidate_mask >> shift.slot & 1:
+        return candidate_reason(person, shift.slot)
+
+def _check_max_shifts(person: 'Person', shift: 'Shift') -> Optional[str]:
+    if person.shift_counts >= person.shift_limit:
+        return "Maximum shifts reached"
+
+def _check_max_nights(person: 'Person', shift: 'Shift') -> Optional[str]:
+    if shift.is_night and person.night_counts >= person.night_limit:
+        return "Maximum night shifts reached"
+
+def _check_conflicts(person: 'Person', shift: 'Shift') -> Optional[str]:
+    if person.assigned_mask & person.conflict_masks[shift.slot]:
+        return conflict_reason(person.conflict_kinds, person.assigned_mask, shift.slot)
@@ -0,0 +1,156 @@
+from typing import Dict, List, Tuple, TYPE_CHECKING
+from app.scheduler.shift import VALID_SHIFT_TYPES
+
+if TYPE_CHECKING:
+    from app.scheduler.person import Person
+    from app.scheduler.shift import Shift
+    from app.scheduler.shift_group import ShiftGroup
+
+
+class EligibilityTracker:
+    """
+    Keeps each person's count of eligible unstaffed shifts up to date incrementally.
+
+    Counts are cached per person and only recomputed for people marked dirty
+    (their own assignments changed). When a shift becomes staffed or unstaffed,
+    the counts of every clean person are adjusted with a single eligibility check
+    instead of a rescan of the whole group.
+
+    On top of the per-person counts the tracker keeps running per shift type totals
+    of demand (people needed on unstaffed shifts) and supply (eligible remaining
+    capacity of the group's people), so validation and ranking read them in
+    O(number of shift types).
+
+    Changing a person's limits directly (e.g. max_weekend_shifts) is not tracked;
+    call mark_dirty for that person afterwards.
+    """
+
+    def __init__(self, group: 'ShiftGroup'):
+        self.group = group
+        # Per person: (counts per constraint score type, counts per shift type)
+        self._counts: Dict[int, Tuple[Dict[str, int], Dict[str, int]]] = {}
+        self._people: Dict[int, 'Person'] = {}
+
+        # Demand: unstaffed shifts and people needed on them, per shift type
+        self._demand_valid = False
+        self._unstaffed: Dict[str, int] = {}
+        self._needed: Dict[str, int] = {}
+
+        # Supply: eligible capacity per shift type, summed over the group's people
+        self._supply_valid = False
+        self._capacity: Dict[str, int] = {}
+        self._contributions: Dict[int, Dict[str, int]] = {}
+        self._pending: Dict[int, 'Person'] = {}
+
+    def get_eligible_counts(self, person: 'Person') -> Dict[str, int]:
+        """Return the number of eligible unstaffed shifts per constraint score type"""
+        return self._get_counts(person)[0]
+
+    def get_needed_by_type(self) -> Dict[str, int]:
+        """Return the number of people still needed per remaining shift type"""
+        self._refresh_demand()
+        return {t: self._needed[t] for t in VALID_SHIFT_TYPES if self._unstaffed[t] > 0}
+
+    def get_eligible_capacity(self, shift_type: str) -> int:
+        """Return the group's eligible remaining capacity for a shift type"""
+        self._refresh_supply()
+        return self._capacity[shift_type]
+
+    def mark_dirty(self, person: 'Person') -> None:
+        """Drop the cached counts of a person whose eligibility changed"""
+        key = id(person)
+        self._counts.pop(key, None)
+        self._people.pop(key, None)
+        contribution = self._contributions.pop(key, None)
+        if contribution is not None:
+            for shift_type, value in contribution.items():
+                self._capacity[shift_type] -= value
+            self._pending[key] = person
+
+    def mark_all_dirty(self) -> None:
+        """Drop all cached counts and totals (the group's shifts changed)"""
+        self._counts.clear()
+        self._people.clear()
+        self._demand_valid = False
+        self._supply_valid = False
+
+    def mark_demand_dirty(self) -> None:
+        """Rebuild the demand totals on next use (a shift's needed count changed)"""
+        self._demand_valid = False
+
+    def mark_supply_dirty(self) -> None:
+        """Rebuild the supply totals on next use (the group's people changed)"""
+        self._supply_valid = False
+
+    def shift_staffing_changed(self, shift: 'Shift') -> None:
+        """Adjust counts and totals after a shift was staffed or unstaffed"""
+        delta = -1 if shift.is_staffed else 1
+        shift_type = shift.shift_type
+
+        if self._demand_valid:
+            self._unstaffed[shift_type] += delta
+            self._needed[shift_type] += delta * shift.needed
+
+        for key, (score_counts, type_counts) in list(self._counts.items()):
+            person = self._people[key]
+            if not person.is_eligible_for_shift(shift):
+                continue
+            for score_type in shift.constraint_score_types:
+                score_counts[score_type] += delta
+            type_counts[shift_type] += delta
+
+            contribution = self._contributions.get(key)
+            if self._supply_valid and contribution is not None:
+                change = delta * person.get_capacity_by_type(shift_type)
+                contribution[shift_type] += change
+                self._capacity[shift_type] += change
+
+    def _get_counts(self, person: 'Person') -> Tuple[Dict[str, int], Dict[str, int]]:
+        counts = self._counts.get(id(person))
+        if counts is None:
+            counts = self._count_eligible_shifts(person)
+            self._counts[id(person)] = counts
+            self._people[id(person)] = person
+        return counts
+
+    def _count_eligible_shifts(self, person: 'Person') -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Count eligible unstaffed shifts by score type and by shift type in a single pass"""
+        score_counts = dict.fromkeys(VALID_SHIFT_TYPES, 0)
+        type_counts = dict.fromkeys(VALID_SHIFT_TYPES, 0)
+        for shift in self.group.shifts:
+            if not shift.is_staffed and person.is_eligible_for_shift(shift):
+                for score_type in shift.constraint_score_types:
+                    score_counts[score_type] += 1
+                type_counts[shift.shift_type] += 1
+        return score_counts, type_counts
+
+    def _contribution(self, person: 'Person') -> Dict[str, int]:
+        """Eligible capacity a person adds to each shift type's supply"""
+        type_counts = self._get_counts(person)[1]
+        return {t: person.get_capacity_by_type(t) * type_counts[t] for t in VALID_SHIFT_TYPES}
+
+    def _refresh_demand(self) -> None:
+        if self._demand_valid:
+            return
+        self._unstaffed = dict.fromkeys(VALID_SHIFT_TYPES, 0)
+        self._needed = dict.fromkeys(VALID_SHIFT_TYPES, 0)
+        for shift in self.group.shifts:
+            if not shift.is_staffed:
+                self._unstaffed[shift.shift_type] += 1
+                self._needed[shift.shift_type] += shift.needed
+        self._demand_valid = True
+
+    def _refresh_supply(self) -> None:
+        if not self._supply_valid:
+            self._capacity = dict.fromkeys(VALID_SHIFT_TYPES, 0)
+            self._contributions.clear()
+            self._pending = {id(person): person for person in self.group.people}
+            self._supply_valid = True
+
+        pending: List['Person'] = list(self._pending.values())
+        self._pending.clear()
+        for person in pending:
+            contribution = self._contribution(person)
+            self._contributions[id(person)] = contribution
+            for shift_type, value in contribution.items():
+                self._capacity[shift_type] += value
@@ -0,0 +1,308 @@
+"""
+Compact binary archives of scheduling problems, for archiving each week's input
+and replaying many of them in regression runs.
+
+    python -m app.scheduler.instance_format convert OUT.shia week1.json week2.json
+    python -m app.scheduler.instance_format convert OUT.shia --sheet "Week 3" [--people-tab TAB]
+    python -m app.scheduler.instance_format info OUT.shia
+
+File layout (little-endian, no padding):
+
+    archive header   magic b'SHIA', format version, reserved, instance count
+    offsets          uint64 file offset of each instance
+    instances        one after the other:
+        header       slots, people, extra names, pairs, shift preferences,
+                     has preferences, strict, label bytes, name bytes
+        label        UTF-8
+        names        UTF-8, newline separated: the people, then other names the preferences use
+        needs        uint8 needed people per slot (app.scheduler.shift.SLOT_IDS)
+        people       PERSON_DTYPE per person
+        pairs        PAIR_DTYPE per pair affinity (indices into names)
+        shift prefs  SHIFT_PREF_DTYPE per shift preference
+        fairness     float64 per shift type (VALID_SHIFT_TYPES order)
+
+The fixed-size sections are read as NumPy views of the memory-mapped file.
+"""
+import argparse
+import json
+import mmap
+import struct
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from app.scheduler.person import Person
+from app.scheduler.preferences import PreferenceModel, parse_shift_name
+from app.scheduler.shift import Shift, SLOT_IDS, SLOT_KEYS, VALID_SHIFT_TYPES
+from app.scheduler.shift_group import ShiftGroup
+
+MAGIC = b'SHIA'
+FORMAT_VERSION = 1
+ARCHIVE_HEADER = struct.Struct('<4sHHI')
+INSTANCE_HEADER = struct.Struct('<HHHHHBBHI')
+
+PERSON_DTYPE = np.dtype([
+    ('blocked', '<u8'), ('max_shifts', 'u1'), ('max_nights', 'u1'), ('max_weekend_shifts', 'u1'), ('flags', 'u1'),
+])
+PAIR_DTYPE = np.dtype([('first', '<u2'), ('second', '<u2'), ('weight', '<f8')])
+SHIFT_PREF_DTYPE = np.dtype([('person', '<u2'), ('slot', 'u1'), ('weight', '<f8')])
+FAIRNESS_DTYPE = np.dtype('<f8')
+
+# Bits of PERSON_DTYPE flags
+DOUBLE_SHIFT, THREE_SHIFTS, NIGHT_AND_NOON = 1, 2, 4
+
+
+class Instance(NamedTuple):
+    """One problem of an archive. The arrays are views of the archive's memory map"""
+    label: str
+    names: List[str]
+    needs: np.ndarray
+    people: np.ndarray
+    pairs: np.ndarray
+    shift_preferences: np.ndarray
+    fairness: np.ndarray
+    has_preferences: bool
+    strict: bool
+
+
+def encode_instance(shift_group: ShiftGroup, preference_model: Optional[PreferenceModel] = None,
+                    label: str = "") -> bytes:
+    """Encode a problem (before any shift is assigned) as one archive instance"""
+    people = shift_group.people
+    names = [person.name for person in people]
+    if len(set(names)) != len(names):
+        raise ValueError("Person names must be unique to be archived")
+    index = {name: i for i, name in enumerate(names)}
+    if preference_model is not None:
+        for name in sorted(preference_model.get_names() - set(index)):
+            index[name] = len(names)
+            names.append(name)
+    if any("\n" in name for name in names):
+        raise ValueError("Names can not contain line breaks")
+
+    needs = np.zeros(len(SLOT_KEYS), dtype=np.uint8)
+    for shift in shift_group.shifts:
+        needs[shift.slot] = _check_byte(shift.needed, f"needed people of {shift}")
+
+    people_table = np.zeros(len(people), dtype=PERSON_DTYPE)
+    for i, person in enumerate(people):
+        people_table[i] = (
+            person.blocked_mask,
+            _check_byte(person.max_shifts, f"max_shifts of {person.name}"),
+            _check_byte(person.max_nights, f"max_nights of {person.name}"),
+            _check_byte(person.max_weekend_shifts, f"max_weekend_shifts of {person.name}"),
+            (DOUBLE_SHIFT if person.double_shift else 0)
+            | (THREE_SHIFTS if person.are_three_shifts_possible else 0)
+            | (NIGHT_AND_NOON if person.night_and_noon_possible else 0),
+        )
+
+    model = preference_model or PreferenceModel()
+    pairs = np.array([(index[first], index[second], weight) for first, second, weight in model.pair_affinities],
+                     dtype=PAIR_DTYPE)
+    shift_preferences = np.array([(index[name], SLOT_IDS[key], weight) for name, key, weight in model.shift_preferences],
+                                 dtype=SHIFT_PREF_DTYPE)
+    fairness = np.array([model.fairness_weights[shift_type] for shift_type in VALID_SHIFT_TYPES], dtype=FAIRNESS_DTYPE)
+
+    label_bytes = label.encode('utf-8')
+    name_bytes = "\n".join(names).encode('utf-8')
+    header = INSTANCE_HEADER.pack(
+        len(SLOT_KEYS), len(people), len(names) - len(people), len(pairs), len(shift_preferences),
+        preference_model is not None, model.strict, len(label_bytes), len(name_bytes)
+    )
+    return b''.join([header, label_bytes, name_bytes, needs.tobytes(), people_table.tobytes(),
+                     pairs.tobytes(), shift_preferences.tobytes(), fairness.tobytes()])
+
+def write_archive(path: str, instances: Iterable[Tuple[str, ShiftGroup, Optional[PreferenceModel]]]) -> int:
+    """Write (label, shift_group, preference_model) problems to an archive; returns how many"""
+    encoded = [encode_instance(shift_group, preference_model, label) for label, shift_group, preference_model in instances]
+    offset = ARCHIVE_HEADER.size + 8 * len(encoded)
+    offsets = []
+    for data in encoded:
+        offsets.append(offset)
+        offset += len(data)
+
+    with open(path, 'wb') as f:
+        f.write(ARCHIVE_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(encoded)))
+        f.write(np.array(offsets, dtype='<u8').tobytes())
+        for data in encoded:
+            f.write(data)
+    return len(encoded)
+
+def _check_byte(value: int, description: str) -> int:
+    if not 0 <= value <= 255:
+        raise ValueError(f"{description} must be between 0 and 255 to be archived, got {value}")
+    return value
+
+
+class InstanceArchive:
+    """
+    A memory-mapped archive. Instances are decoded on access, as views of the map;
+    load() builds a ShiftGroup (and PreferenceModel) ready for run_shift_algorithm.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < ARCHIVE_HEADER.size:
+            raise ValueError(f"Not an instance archive: {path}")
+        magic, version, _, count = ARCHIVE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not an instance archive: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported instance archive version {version} in {path}")
+        self._offsets = np.frombuffer(self._map, dtype='<u8', count=count, offset=ARCHIVE_HEADER.size)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, i: int) -> Instance:
+        offset = int(self._offsets[i])
+        (slots, people, extra_names, pairs, shift_preferences,
+         has_preferences, strict, label_size, names_size) = INSTANCE_HEADER.unpack_from(self._map, offset)
+        if slots != len(SLOT_KEYS):
+            raise ValueError(f"Instance {i} has a calendar of {slots} slots, expected {len(SLOT_KEYS)}")
+        offset += INSTANCE_HEADER.size
+
+        label = self._map[offset:offset + label_size].decode('utf-8')
+        offset += label_size
+        names = self._map[offset:offset + names_size].decode('utf-8').split("\n") if names_size else []
+        offset += names_size
+
+        arrays = []
+        for dtype, count in [(np.uint8, slots), (PERSON_DTYPE, people), (PAIR_DTYPE, pairs),
+                             (SHIFT_PREF_DTYPE, shift_preferences), (FAIRNESS_DTYPE, len(VALID_SHIFT_TYPES))]:
+            arrays.append(np.frombuffer(self._map, dtype=dtype, count=count, offset=offset))
+            offset += np.dtype(dtype).itemsize * count
+        return Instance(label, names, *arrays, bool(has_preferences), bool(strict))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def load(self, i: int) -> Tuple[ShiftGroup, Optional[PreferenceModel]]:
+        return build_instance(self[i])
+
+    def close(self) -> None:
+        self._offsets = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Instances still in use keep the map open until they are released
+
+    def __enter__(self) -> 'InstanceArchive':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def build_instance(instance: Instance) -> Tuple[ShiftGroup, Optional[PreferenceModel]]:
+    """A solver-ready ShiftGroup, with compiled constraints, and the preferences of an instance"""
+    shift_group = ShiftGroup()
+    needs = instance.needs
+    for slot in np.flatnonzero(needs).tolist():
+        Shift._create_unchecked(shift_group, slot, int(needs[slot]))
+
+    # Whole columns are converted at once rather than field by field
+    people = instance.people
+    flags = people['flags']
+    columns = zip(
+        instance.names, people['blocked'].tolist(),
+        (flags & DOUBLE_SHIFT).astype(bool).tolist(), people['max_shifts'].tolist(),
+        people['max_nights'].tolist(), (flags & THREE_SHIFTS).astype(bool).tolist(),
+        (flags & NIGHT_AND_NOON).astype(bool).tolist(), people['max_weekend_shifts'].tolist(),
+    )
+    shift_group.people = [Person(*fields) for fields in columns]
+    shift_group.compile_constraints()
+
+    preference_model = None
+    if instance.has_preferences:
+        names = instance.names
+        preference_model = PreferenceModel(
+            [(names[first], names[second], weight) for first, second, weight in instance.pairs.tolist()],
+            [(names[person], SLOT_KEYS[slot], weight) for person, slot, weight in instance.shift_preferences.tolist()],
+            dict(zip(VALID_SHIFT_TYPES, instance.fairness.tolist())),
+            strict=instance.strict,
+        )
+    return shift_group, preference_model
+
+
+# JSON form of a problem, for writing instances by hand and for converting
+def instance_to_dict(shift_group: ShiftGroup, preference_model: Optional[PreferenceModel] = None,
+                     label: str = "") -> Dict:
+    data = {
+        'label': label,
+        'shifts': [{'day': shift.shift_day, 'time': shift.shift_time, 'needed': shift.needed}
+                   for shift in shift_group.shifts if shift.needed > 0],
+        'people': [{
+            'name': person.name,
+            'blocked_shifts': [f"{day} {time}" for day, time in person.blocked_shifts],
+            'double_shift': person.double_shift,
+            'max_shifts': person.max_shifts,
+            'max_nights': person.max_nights,
+            'are_three_shifts_possible': person.are_three_shifts_possible,
+            'night_and_noon_possible': person.night_and_noon_possible,
+            'max_weekend_shifts': person.max_weekend_shifts,
+        } for person in shift_group.people],
+    }
+    if preference_model is not None:
+        data['preferences'] = preference_model.to_dict()
+    return data
+
+def instance_from_dict(data: Dict) -> Tuple[str, ShiftGroup, Optional[PreferenceModel]]:
+    shift_group = ShiftGroup()
+    for shift in data['shifts']:
+        Shift(shift['day'], shift['time'], group=shift_group, needed=int(shift['needed']))
+    for person in data['people']:
+        shift_group.add_person(Person(
+            person['name'],
+            {parse_shift_name(shift_name): True for shift_name in person.get('blocked_shifts', [])},
+            double_shift=bool(person['double_shift']),
+            max_shifts=int(person['max_shifts']),
+            max_nights=int(person['max_nights']),
+            are_three_shifts_possible=bool(person['are_three_shifts_possible']),
+            night_and_noon_possible=bool(person['night_and_noon_possible']),
+            max_weekend_shifts=int(person.get('max_weekend_shifts', 1)),
+        ))
+    preferences = data.get('preferences')
+    preference_model = PreferenceModel.from_dict(preferences) if preferences is not None else None
+    return data.get('label', ""), shift_group, preference_model
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert and inspect scheduling instance archives")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser('convert', help="Write an archive from JSON instances and/or the sheets")
+    convert.add_argument('output')
+    convert.add_argument('inputs', nargs='*', help="JSON instance files (see instance_to_dict)")
+    convert.add_argument('--sheet', metavar='LABEL', help="Also add the current sheets' data under this label")
+    convert.add_argument('--needs-tab', default="Needed Shifts")
+    convert.add_argument('--people-tab', default="Real Data - 15/01")
+    convert.add_argument('--preferences-tab', help="Preferences tab to include with the sheet instance")
+    convert.add_argument('--max-weekend', type=int, default=1)
+
+    info = commands.add_parser('info', help="List the instances of an archive")
+    info.add_argument('archive')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        instances = []
+        for path in args.inputs:
+            with open(path) as f:
+                instances.append(instance_from_dict(json.load(f)))
+        if args.sheet:
+            from app.google_sheets.import_sheet_data import get_fresh_data, get_preferences
+            shift_group = get_fresh_data(args.needs_tab, args.people_tab, max_weekend=args.max_weekend)
+            preference_model = get_preferences(shift_group, args.preferences_tab) if args.preferences_tab else None
+            instances.append((args.sheet, shift_group, preference_model))
+        count = write_archive(args.output, instances)
+        print(f"Wrote {count} instances to {args.output}")
+    else:
+        with InstanceArchive(args.archive) as archive:
+            for i, instance in enumerate(archive):
+                print(f"{i}: {instance.label or '-'}  people={len(instance.people)}  "
+                      f"shifts={int(np.count_nonzero(instance.needs))}  needed={int(instance.needs.sum())}  "
+                      f"preferences={'yes' if instance.has_preferences else 'no'}")
+
+
+if __name__ == '__main__':
+    main()
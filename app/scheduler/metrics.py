@@ -0,0 +1,163 @@
+import io
+import pstats
+import threading
+from bisect import bisect_left
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Tuple
+
+# Solver metrics in the Prometheus text exposition format.
+#
+# The search only touches a SolveStats object that belongs to a single solve,
+# so counting is plain integer arithmetic with no locks. Once a solve ends its
+# stats are merged into the process wide REGISTRY under a lock, which is what
+# the /metrics endpoint renders.
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0)
+OUTCOMES = ('success', 'infeasible', 'timeout', 'cancelled', 'error')
+PRUNE_REASONS = ('not_enough_eligible', 'validation_failed', 'cancelled')
+
+
+class SolveStats:
+    """
+    Counters of a single solve, owned by the thread running it.
+
+    Phase times are perf_counter_ns accumulators. The search phase covers the whole
+    recursion, so it includes the per-node phases (rank_shifts, eligibility, validate,
+    combo_generation, combo_sort) that run inside it.
+    """
+    __slots__ = ('nodes', 'backtracks_by_depth', 'prunes', 'combos_generated', 'combos_tried',
+                 'phase_ns', 'phase_calls', 'profile', 'outcome')
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks_by_depth: Dict[int, int] = {}
+        self.prunes: Dict[str, int] = dict.fromkeys(PRUNE_REASONS, 0)
+        self.combos_generated = 0
+        self.combos_tried = 0
+        self.phase_ns: Dict[str, int] = {}
+        self.phase_calls: Dict[str, int] = {}
+        self.profile = None  # pstats.Stats of the solve, when it was run under cProfile
+        self.outcome: Optional[str] = None  # One of OUTCOMES once the solve ended
+
+    def add_backtrack(self, depth: int) -> None:
+        self.backtracks_by_depth[depth] = self.backtracks_by_depth.get(depth, 0) + 1
+
+    def end_phase(self, phase: str, start_ns: int) -> int:
+        """Add the time since start_ns (from perf_counter_ns) to a phase; returns the current time"""
+        now = perf_counter_ns()
+        self.phase_ns[phase] = self.phase_ns.get(phase, 0) + now - start_ns
+        self.phase_calls[phase] = self.phase_calls.get(phase, 0) + 1
+        return now
+
+    def get_phase_breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Milliseconds and number of timed calls per phase"""
+        return {
+            phase: {'ms': round(ns / 1e6, 3), 'calls': self.phase_calls[phase]}
+            for phase, ns in self.phase_ns.items()
+        }
+
+
+class Histogram:
+    """Cumulative-bucket histogram as Prometheus expects it"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float('inf') else _format_value(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    """Process wide solver metrics, updated once per solve"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.solves: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+        self.nodes = 0
+        self.backtracks_by_depth: Dict[int, int] = {}
+        self.prunes: Dict[str, int] = dict.fromkeys(PRUNE_REASONS, 0)
+        self.combos_generated = 0
+        self.combos_tried = 0
+        self.phase_seconds: Dict[str, float] = {}
+        self.durations: Dict[str, Histogram] = {outcome: Histogram() for outcome in OUTCOMES}
+
+    def record_solve(self, stats: SolveStats, outcome: str, duration: float) -> None:
+        """Merge the stats of a finished solve"""
+        if outcome not in self.solves:
+            raise ValueError(f"Unknown solve outcome: {outcome}")
+        with self._lock:
+            self.solves[outcome] += 1
+            self.durations[outcome].observe(duration)
+            self.nodes += stats.nodes
+            for depth, count in stats.backtracks_by_depth.items():
+                self.backtracks_by_depth[depth] = self.backtracks_by_depth.get(depth, 0) + count
+            for reason, count in stats.prunes.items():
+                self.prunes[reason] = self.prunes.get(reason, 0) + count
+            self.combos_generated += stats.combos_generated
+            self.combos_tried += stats.combos_tried
+            for phase, ns in stats.phase_ns.items():
+                self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + ns / 1e9
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            lines: List[str] = []
+            _add_metric(lines, 'shifts_solver_solves_total', 'counter', "Solves by outcome",
+                        [({'outcome': outcome}, count) for outcome, count in self.solves.items()])
+            _add_metric(lines, 'shifts_solver_nodes_total', 'counter', "Search nodes explored",
+                        [({}, self.nodes)])
+            _add_metric(lines, 'shifts_solver_backtracks_total', 'counter', "Assignments undone, by search depth",
+                        [({'depth': depth}, count) for depth, count in sorted(self.backtracks_by_depth.items())])
+            _add_metric(lines, 'shifts_solver_prunes_total', 'counter', "Search branches pruned, by reason",
+                        [({'reason': reason}, count) for reason, count in self.prunes.items()])
+            _add_metric(lines, 'shifts_solver_combos_generated_total', 'counter',
+                        "Combinations of eligible people generated", [({}, self.combos_generated)])
+            _add_metric(lines, 'shifts_solver_combos_tried_total', 'counter',
+                        "Combinations of eligible people tried", [({}, self.combos_tried)])
+            _add_metric(lines, 'shifts_solver_phase_seconds_total', 'counter', "Time spent per solver phase",
+                        [({'phase': phase}, seconds) for phase, seconds in sorted(self.phase_seconds.items())])
+
+            lines.append("# HELP shifts_solver_solve_duration_seconds Solve duration by outcome")
+            lines.append("# TYPE shifts_solver_solve_duration_seconds histogram")
+            for outcome, histogram in self.durations.items():
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'shifts_solver_solve_duration_seconds_bucket{{outcome="{outcome}",le="{bound}"}} {count}')
+                lines.append(f'shifts_solver_solve_duration_seconds_sum{{outcome="{outcome}"}} {_format_value(histogram.sum)}')
+                lines.append(f'shifts_solver_solve_duration_seconds_count{{outcome="{outcome}"}} {histogram.count}')
+            return "\n".join(lines) + "\n"
+
+
+def _add_metric(lines: List[str], name: str, metric_type: str, help_text: str, samples) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}")
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_profile(profile: pstats.Stats, limit: int = 40, sort: str = 'cumulative') -> str:
+    """The top entries of a solve's cProfile data as pstats prints them"""
+    stream = io.StringIO()
+    profile.stream = stream
+    profile.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+# Metrics of all solves in this process
+REGISTRY = MetricsRegistry()
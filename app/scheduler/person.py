@@ -1,30 +1,89 @@
-from dataclasses import dataclass, field
-from typing import List, Tuple, Dict, TYPE_CHECKING, Optional
+from typing import List, Tuple, Dict, TYPE_CHECKING, Optional, Union
 from app.scheduler.utils import get_adjacent_days, get_adjacent_shifts, is_weekend_shift, debug_log
 from app.scheduler.shift import Shift
-from app.scheduler.shift import VALID_SHIFT_TYPES
+from app.scheduler.shift import VALID_SHIFT_TYPES, SLOT_KEYS, SLOT_IDS
 if TYPE_CHECKING:
     from app.scheduler.shift_group import ShiftGroup
 
-@dataclass
 class Person:
-    """Represents a person who can be assigned to shifts"""
-    name: str
-    blocked_shifts: Dict[Tuple[str, str], bool]
-    double_shift: bool
-    max_shifts: int
-    max_nights: int
-    are_three_shifts_possible: bool
-    night_and_noon_possible: bool
-    max_weekend_shifts: int = 1
-    shift_counts: int = 0
-    night_counts: int = 0
-    weekend_shifts: int = 0
-    group: Optional['ShiftGroup'] = None
+    """Represents a person who can be assigned to shifts
 
-    
-    # Add new fields for different constraint scores
-    constraint_scores: Dict[str, float] = field(default_factory=dict)
+    Blocked and assigned shifts are kept as integer bitmasks over shift slot ids
+    (see app.scheduler.shift.SLOT_IDS). A person is expected to belong to a single
+    ShiftGroup, since the assigned mask does not distinguish between groups.
+
+    The static compatibility data (candidate_mask, conflict_kinds, conflict_masks) and
+    the shift limits the capacity checks read (shift_limit, night_limit, weekend_limit)
+    are compiled by a ConstraintPipeline and remembered in compiled_for. The attributes
+    it is derived from (STATIC_FIELDS) are properties whose setters reset compiled_for,
+    so it is recompiled on next use; the per-assignment counters are plain slots.
+    """
+    __slots__ = (
+        'name', '_blocked_mask', '_double_shift', '_max_shifts', '_max_nights',
+        'are_three_shifts_possible', '_night_and_noon_possible', '_max_weekend_shifts',
+        'shift_counts', 'night_counts', 'weekend_shifts', 'group',
+        'constraint_scores', 'assigned_mask',
+        'candidate_mask', 'conflict_kinds', 'conflict_masks',
+        'shift_limit', 'night_limit', 'weekend_limit', 'compiled_for'
+    )
+    STATIC_FIELDS = (
+        'blocked_mask', 'double_shift', 'max_shifts', 'max_nights',
+        'night_and_noon_possible', 'max_weekend_shifts'
+    )
+
+    def __init__(self,
+                 name: str,
+                 blocked_shifts: Union[Dict[Tuple[str, str], bool], int],
+                 double_shift: bool,
+                 max_shifts: int,
+                 max_nights: int,
+                 are_three_shifts_possible: bool,
+                 night_and_noon_possible: bool,
+                 max_weekend_shifts: int = 1,
+                 shift_counts: int = 0,
+                 night_counts: int = 0,
+                 weekend_shifts: int = 0,
+                 group: Optional['ShiftGroup'] = None,
+                 constraint_scores: Optional[Dict[str, float]] = None):
+        self.compiled_for = None
+        self.name = name
+        self.blocked_shifts = blocked_shifts
+        self.double_shift = double_shift
+        self.max_shifts = max_shifts
+        self.max_nights = max_nights
+        self.are_three_shifts_possible = are_three_shifts_possible
+        self.night_and_noon_possible = night_and_noon_possible
+        self.max_weekend_shifts = max_weekend_shifts
+        self.shift_counts = shift_counts
+        self.night_counts = night_counts
+        self.weekend_shifts = weekend_shifts
+        self.group = group
+
+        # Constraint scores for the different types of shifts
+        self.constraint_scores = constraint_scores if constraint_scores is not None else {}
+
+        # Bitmask of the slots this person is currently assigned to
+        self.assigned_mask = 0
+
+    @property
+    def blocked_shifts(self) -> Dict[Tuple[str, str], bool]:
+        """Blocked shifts as a {(day, time): True} dict, built from the bitmask"""
+        return {SLOT_KEYS[slot]: True for slot in range(len(SLOT_KEYS)) if self.blocked_mask >> slot & 1}
+
+    @blocked_shifts.setter
+    def blocked_shifts(self, blocked_shifts: Union[Dict[Tuple[str, str], bool], int]) -> None:
+        """Accepts either a {(day, time): is_blocked} dict or a ready-made slot bitmask"""
+        if isinstance(blocked_shifts, int):
+            self.blocked_mask = blocked_shifts
+            return
+
+        mask = 0
+        for key, is_blocked in blocked_shifts.items():
+            if key not in SLOT_IDS:
+                raise ValueError(f"Invalid blocked shift {key} for person {self.name}")
+            if is_blocked:
+                mask |= 1 << SLOT_IDS[key]
+        self.blocked_mask = mask
 
     def assign_to_shift(self, shift: Shift) -> None:
         """Assign person to a shift"""
@@ -46,11 +105,11 @@ class Person:
 
     def is_shift_assigned(self, shift: Shift) -> bool:
         """Check if person is assigned to a shift"""
-        return self in shift.assigned_people
+        return bool(self.assigned_mask >> shift.slot & 1)
     
     def is_shift_blocked(self, shift: Shift) -> bool:
         """Check if shift is in person's unavailable shifts"""
-        return self.blocked_shifts.get(shift.key, False)
+        return bool(self.blocked_mask >> shift.slot & 1)
     
 
     def is_max_shifts_reached(self) -> bool:
@@ -62,46 +121,10 @@ class Person:
         return self.night_counts >= self.max_nights
     
     def is_eligible_for_shift(self, shift: Shift) -> bool:
-        """Determine if person is eligible for a given shift based on all constraints"""
-        # base_msg = f"Checking {self.name} availability for {shift.shift_day} {shift.shift_time}: "
-
-        # Basic constraints
-        if shift.is_weekend_shift and self.weekend_shifts >= self.max_weekend_shifts:
-            # debug_log(base_msg + "Not available - Weekend shift limit reached")
-            return False
-        
-        if self.is_shift_blocked(shift):
-            # debug_log(base_msg + "Not available - Shift is blocked")
-            return False
-        
-        # Check if the person reached his max shifts
-        if self.is_max_shifts_reached():
-            # debug_log(base_msg + "Not available - Maximum shifts reached")
-            return False
-            
-        # Check if the person reached their max nights
-        if shift.is_night and self.is_max_nights_reached():
-            # debug_log(base_msg + "Not available - Maximum night shifts reached")
-            return False
-
-        # Group constraints
-        if not shift.group:
-            return True
-
-        is_allowed, reason = shift.group.check_all_constraints(
-            person=self,
-            shift=shift,
-            allow_consecutive=self.double_shift,
-            allow_three_shifts=self.are_three_shifts_possible,
-            allow_night_noon=self.night_and_noon_possible
-        )
-
-        if not is_allowed:
-            # debug_log(base_msg + f"Not available - {reason}")
-            return False
-
-        # debug_log(base_msg + "Available - All constraints passed")
-        return True
+        """Determine if person is eligible for a given shift based on all constraints
+        The checks are the enabled rules compiled into the shift group's constraint pipeline"""
+        is_allowed, reason = shift.group.constraints.check(self, shift)
+        return is_allowed
     
     def calculate_constraint_score(self, shift_group: 'ShiftGroup') -> Dict[str, float]:
         """
@@ -114,31 +137,14 @@ class Person:
         remaining_nights = self.get_capacity_by_type('night')
         remaining_weekends = self.get_capacity_by_type('weekend')
         
-        # Get unstaffed shifts
-        unstaffed_shifts = [s for s in shift_group.shifts if not s.is_staffed]
-        
-
-        # Count eligible shifts by type
-        eligible_regular = sum(
-            1 for shift in unstaffed_shifts
-            if self.is_eligible_for_shift(shift) and not (shift.is_night or shift.is_weekend_shift)
-        )
-        
-        eligible_nights = sum(
-            1 for shift in unstaffed_shifts
-            if self.is_eligible_for_shift(shift) and shift.is_night
-        )
-        
-        eligible_weekends = sum(
-            1 for shift in unstaffed_shifts
-            if self.is_eligible_for_shift(shift) and shift.is_weekend_shift
-        )
+        # Eligible unstaffed shifts by type, maintained incrementally by the group
+        eligible = shift_group.eligibility.get_eligible_counts(self)
         
         # Calculate scores (lower score = more constrained)
         self.constraint_scores = {
-            'regular': (eligible_regular / remaining_regular) if remaining_regular > 0 else float('inf'),
-            'night': (eligible_nights / remaining_nights) if remaining_nights > 0 else float('inf'),
-            'weekend': (eligible_weekends / remaining_weekends) if remaining_weekends > 0 else float('inf')
+            'regular': (eligible['regular'] / remaining_regular) if remaining_regular > 0 else float('inf'),
+            'night': (eligible['night'] / remaining_nights) if remaining_nights > 0 else float('inf'),
+            'weekend': (eligible['weekend'] / remaining_weekends) if remaining_weekends > 0 else float('inf')
         }
         
         # Validate that all required scores exist
@@ -174,3 +180,17 @@ class Person:
         # Check for invalid score types
         if not all(key in VALID_SHIFT_TYPES for key in scores.keys()):
             raise ValueError(f"Invalid constraint score keys for person {self.name}: {scores.keys()}")
+
+
+def _static_field(name: str) -> property:
+    """Property over the _<name> slot whose setter resets compiled_for"""
+    slot = Person.__dict__[f'_{name}']
+
+    def set_field(person: Person, value) -> None:
+        slot.__set__(person, value)
+        person.compiled_for = None
+
+    return property(slot.__get__, set_field, doc=f"{name} (setting it invalidates the compiled data)")
+
+for _name in Person.STATIC_FIELDS:
+    setattr(Person, _name, _static_field(_name))
@@ -0,0 +1,195 @@
+import json
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+from app.scheduler.shift import SLOT_IDS, SLOT_KEYS, VALID_SHIFT_TYPES
+
+if TYPE_CHECKING:
+    from app.scheduler.person import Person
+
+# Shifts are named like the availability columns of the people sheet, e.g. "Friday Night"
+SHIFT_NAMES = {f"{day} {time}".upper(): (day, time) for day, time in SLOT_KEYS}
+
+
+class CompiledPreferences:
+    """
+    A PreferenceModel compiled for a fixed list of people into index-based tables.
+    Person i is people[i]; index maps id(person) to i.
+    """
+    __slots__ = ('people', 'index', 'pair_weights', 'shift_weights', 'fairness_weights')
+
+    def __init__(self, people: List['Person'], pair_weights: np.ndarray,
+                 shift_weights: np.ndarray, fairness_weights: Dict[str, float]):
+        self.people = people
+        self.index = {id(person): i for i, person in enumerate(people)}
+        self.pair_weights = pair_weights          # people x people, symmetric
+        self.shift_weights = shift_weights        # people x slots
+        self.fairness_weights = fairness_weights  # shift type -> weight per assigned shift of that type
+
+
+class PreferenceModel:
+    """
+    Team preferences used to order combinations of people for a shift.
+
+    - pair_affinities: (name, name, weight) - positive weights prefer the pair together
+    - shift_preferences: (name, (day, time), weight) - positive weights prefer the person on the shift
+    - fairness_weights: shift type -> penalty per shift of that type a person already has,
+      which spreads e.g. nights more evenly (0 by default)
+
+    Pair and shift weights add up to the first sorting criterion, fairness penalties are
+    added to the constraint score. A strict model raises ValueError when compiled for
+    people that don't include every name it mentions.
+    """
+
+    def __init__(self,
+                 pair_affinities: Optional[List[Tuple[str, str, float]]] = None,
+                 shift_preferences: Optional[List[Tuple[str, Tuple[str, str], float]]] = None,
+                 fairness_weights: Optional[Dict[str, float]] = None,
+                 strict: bool = True):
+        self.pair_affinities: List[Tuple[str, str, float]] = []
+        self.shift_preferences: List[Tuple[str, Tuple[str, str], float]] = []
+        self.fairness_weights = dict.fromkeys(VALID_SHIFT_TYPES, 0.0)
+        self.strict = strict
+
+        for first, second, weight in pair_affinities or []:
+            if first == second:
+                raise ValueError(f"Pair affinity needs two different people, got {first} twice")
+            weight = _validate_weight(weight, f"pair {first} / {second}")
+            self.pair_affinities.append((first, second, weight))
+        for name, shift_key, weight in shift_preferences or []:
+            if shift_key not in SLOT_IDS:
+                raise ValueError(f"Invalid shift {shift_key} in preferences of {name}")
+            weight = _validate_weight(weight, f"shift preference {name} / {shift_key}")
+            self.shift_preferences.append((name, shift_key, weight))
+        for shift_type, weight in (fairness_weights or {}).items():
+            if shift_type not in self.fairness_weights:
+                raise ValueError(f"Invalid fairness shift type: {shift_type}")
+            self.fairness_weights[shift_type] = _validate_weight(weight, f"fairness weight {shift_type}")
+
+    @classmethod
+    def from_target_pairs(cls, target_pairs: List[Dict]) -> 'PreferenceModel':
+        """Model of the legacy ComboManager.TARGET_PAIRS. Not strict, since those names are hard-coded"""
+        affinities = [(*sorted(target['pair']), target['weight']) for target in target_pairs]
+        return cls(pair_affinities=affinities, strict=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PreferenceModel':
+        """
+        Build a model from a dict such as:
+        {
+            "pair_affinities": [{"pair": ["Avishay", "Shani Keynan"], "weight": 10}],
+            "shift_preferences": [{"person": "Itay", "shift": "Friday Night", "weight": -5}],
+            "fairness_weights": {"night": 0.5}
+        }
+        """
+        unknown_keys = set(data) - {'pair_affinities', 'shift_preferences', 'fairness_weights'}
+        if unknown_keys:
+            raise ValueError(f"Unknown preference sections: {unknown_keys}")
+
+        affinities = []
+        for entry in data.get('pair_affinities', []):
+            pair = list(entry['pair'])
+            if len(pair) != 2:
+                raise ValueError(f"Pair affinity must name exactly two people: {pair}")
+            affinities.append((pair[0], pair[1], entry['weight']))
+
+        shift_preferences = [
+            (entry['person'], parse_shift_name(entry['shift']), entry['weight'])
+            for entry in data.get('shift_preferences', [])
+        ]
+        return cls(affinities, shift_preferences, data.get('fairness_weights'))
+
+    @classmethod
+    def from_json(cls, path: str) -> 'PreferenceModel':
+        """Load a model from a JSON file in the from_dict format"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'PreferenceModel':
+        """
+        Build a model from the rows of a preferences sheet tab, with the columns
+        Type ("Pair", "Shift" or "Fairness"), Person, Other and Weight:
+        - Pair: Other is the second person
+        - Shift: Other is a shift like "Friday Night"
+        - Fairness: Other is a shift type ("regular", "night" or "weekend"), Person is empty
+        """
+        affinities, shift_preferences, fairness_weights = [], [], {}
+        for row in records:
+            row_type = str(row.get("Type", "")).strip().upper()
+            person = str(row.get("Person", "")).strip()
+            other = str(row.get("Other", "")).strip()
+            weight = row.get("Weight")
+            if row_type == "PAIR":
+                affinities.append((person, other, weight))
+            elif row_type == "SHIFT":
+                shift_preferences.append((person, parse_shift_name(other), weight))
+            elif row_type == "FAIRNESS":
+                fairness_weights[other.lower()] = weight
+            elif row_type:
+                raise ValueError(f"Invalid preference type: {row.get('Type')}")
+        return cls(affinities, shift_preferences, fairness_weights)
+
+    def to_dict(self) -> Dict:
+        """The model in the from_dict format"""
+        return {
+            'pair_affinities': [{'pair': [first, second], 'weight': weight} for first, second, weight in self.pair_affinities],
+            'shift_preferences': [{'person': name, 'shift': f"{day} {time}", 'weight': weight}
+                                  for name, (day, time), weight in self.shift_preferences],
+            'fairness_weights': dict(self.fairness_weights),
+        }
+
+    def get_target_pairs(self) -> List[Dict]:
+        """Pair affinities in the ComboManager.TARGET_PAIRS format"""
+        return [{'pair': {first, second}, 'weight': weight} for first, second, weight in self.pair_affinities]
+
+    def get_names(self) -> set:
+        """All person names the model refers to"""
+        names = {name for first, second, _ in self.pair_affinities for name in (first, second)}
+        names.update(name for name, _, _ in self.shift_preferences)
+        return names
+
+    def validate(self, people: List['Person']) -> None:
+        """Raise ValueError if the model refers to people that are not in the list"""
+        unknown = self.get_names() - {person.name for person in people}
+        if unknown:
+            raise ValueError(f"Unknown people in preferences: {sorted(unknown)}")
+
+    def compile(self, people: List['Person'], check_names: Optional[bool] = None) -> CompiledPreferences:
+        """
+        Compile the model into index-based tables for people (once per solve).
+        Names are validated if check_names is True, or if it is None and the model is strict.
+        """
+        if check_names if check_names is not None else self.strict:
+            self.validate(people)
+
+        positions: Dict[str, List[int]] = {}
+        for i, person in enumerate(people):
+            positions.setdefault(person.name, []).append(i)
+
+        pair_weights = np.zeros((len(people), len(people)))
+        for first, second, weight in self.pair_affinities:
+            for i in positions.get(first, []):
+                for j in positions.get(second, []):
+                    pair_weights[i, j] += weight
+                    pair_weights[j, i] += weight
+
+        shift_weights = np.zeros((len(people), len(SLOT_KEYS)))
+        for name, shift_key, weight in self.shift_preferences:
+            for i in positions.get(name, []):
+                shift_weights[i, SLOT_IDS[shift_key]] += weight
+
+        return CompiledPreferences(list(people), pair_weights, shift_weights, dict(self.fairness_weights))
+
+
+def parse_shift_name(shift_name: str) -> Tuple[str, str]:
+    """Parse a shift name like "Friday Night" (case-insensitive) into a (day, time) key"""
+    key = SHIFT_NAMES.get(str(shift_name).strip().upper())
+    if key is None:
+        raise ValueError(f"Invalid shift name: {shift_name}")
+    return key
+
+def _validate_weight(weight, description: str) -> float:
+    try:
+        return float(weight)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid weight {weight!r} for {description}")
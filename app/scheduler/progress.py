@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.scheduler.metrics import SolveStats
+    from app.scheduler.shift_group import ShiftGroup
+
+# Progress of a running solve, for streaming to a client (GET /jobs/<id>/events).
+#
+# backtrack_assign calls on_node for every search node. That only compares the
+# depth and the clock; a progress event is built at most once per interval, and
+# the partial assignment is copied only when the search gets deeper than ever
+# before, which happens at most once per shift.
+#
+# Events go to a bounded buffer that the solving thread never waits on: the
+# oldest events are dropped when it is full, and any number of readers can
+# follow it with read(after).
+
+PROGRESS_INTERVAL = 0.25
+BUFFER_SIZE = 64
+
+
+class ProgressReporter:
+    def __init__(self, interval: float = PROGRESS_INTERVAL, buffer_size: int = BUFFER_SIZE):
+        self.interval = interval
+        self._events: Deque[Tuple[int, str, Dict]] = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._closed = False
+
+        self._start = time.monotonic()
+        self._next_sample = 0.0
+        self._last_sample = (self._start, 0)
+        self._best_depth = -1
+        self._best_assignment: Optional[Dict[str, Dict[str, List[str]]]] = None
+        self._best_sent = True
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def publish(self, kind: str, data: Dict) -> None:
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, kind, data))
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """No more events will follow; wakes up the readers"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def read(self, after: int = 0, timeout: Optional[float] = None) -> List[Tuple[int, str, Dict]]:
+        """Events with a sequence number above after, waiting up to timeout for one (unless closed)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > after or self._closed, timeout)
+            return [event for event in self._events if event[0] > after]
+
+    def on_node(self, depth: int, shift_group: 'ShiftGroup', stats: 'SolveStats') -> None:
+        """Called by the search at every node"""
+        if depth > self._best_depth:
+            self._best_depth = depth
+            self._best_assignment = partial_assignment(shift_group)
+            self._best_sent = False
+
+        now = time.monotonic()
+        if now < self._next_sample:
+            return
+        self._next_sample = now + self.interval
+        self.publish('progress', self._sample(now, depth, shift_group, stats))
+
+    def _sample(self, now: float, depth: int, shift_group: 'ShiftGroup', stats: 'SolveStats') -> Dict:
+        last_time, last_nodes = self._last_sample
+        self._last_sample = (now, stats.nodes)
+        sample = {
+            'depth': depth,
+            'max_depth': self._best_depth,
+            'shifts_staffed': sum(1 for shift in shift_group.shifts if shift.is_staffed),
+            'shifts_total': len(shift_group.shifts),
+            'nodes': stats.nodes,
+            'nodes_per_second': round((stats.nodes - last_nodes) / (now - last_time), 1) if now > last_time else 0.0,
+            'elapsed_seconds': round(now - self._start, 3),
+        }
+        # The best partial assignment is only sent again when it changed
+        if not self._best_sent:
+            sample['best_assignment'] = self._best_assignment
+            self._best_sent = True
+        return sample
+
+
+def partial_assignment(shift_group: 'ShiftGroup') -> Dict[str, Dict[str, List[str]]]:
+    """Names assigned to each staffed shift, by day and time"""
+    assignment: Dict[str, Dict[str, List[str]]] = {}
+    for shift in shift_group.shifts:
+        if shift.is_staffed:
+            assignment.setdefault(shift.shift_day, {})[shift.shift_time] = [p.name for p in shift.assigned_people]
+    return assignment
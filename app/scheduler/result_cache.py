@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, Optional
+from app.scheduler.flag_manager import FlagManager
+from app.scheduler.instance_format import instance_to_dict
+from app.scheduler.preferences import PreferenceModel
+from app.scheduler.shift_group import ShiftGroup
+
+logger = logging.getLogger(__name__)
+
+# Solve results keyed by a hash of the problem, so an identical request is
+# answered without solving it again.
+#
+# The key is the SHA-256 of the problem in canonical JSON: the shift needs, the
+# people (in order, since the order can change which solution is found), the
+# preferences, the enabled constraints and any solver options. Only results the
+# solver would give again are cached: solutions and proven infeasibility, never
+# timeouts, cancellations or errors.
+#
+# Results are kept in a per-process LRU and, if a path is given, in an SQLite
+# file that all the workers on the machine share.
+
+# Part of every key; bump it when a solver change can give different results
+CACHE_VERSION = 1
+CACHEABLE_OUTCOMES = ('success', 'infeasible')
+
+
+def problem_key(shift_group: ShiftGroup, preference_model: Optional[PreferenceModel] = None,
+                flag_manager: Optional[FlagManager] = None, options: Optional[Dict] = None) -> str:
+    """Hash of everything a solve's result depends on; options holds any other setting that changes it"""
+    problem = instance_to_dict(shift_group, preference_model)
+    del problem['label']
+    problem['flags'] = None if flag_manager is None else {
+        'constraints': flag_manager.constraints, 'preferences': flag_manager.preferences}
+    problem['options'] = options or {}
+    problem['version'] = CACHE_VERSION
+    canonical = json.dumps(problem, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 128, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()  # Results as JSON, so callers get their own copy
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._init_disk()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(encoded)
+
+        encoded = self._disk_get(key) if self.path else None
+        with self._lock:
+            if encoded is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, encoded)
+        return json.loads(encoded)
+
+    def put(self, key: str, result: Dict) -> None:
+        encoded = json.dumps(result)
+        with self._lock:
+            self._remember(key, encoded)
+        if self.path:
+            self._disk_put(key, encoded)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            try:
+                with closing(self._connect()) as connection, connection:
+                    connection.execute("DELETE FROM results")
+            except sqlite3.Error as e:
+                logger.warning(f"Could not clear the result cache at {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+            }
+
+    def _remember(self, key: str, encoded: str) -> None:
+        """Add to the LRU (called with the lock held)"""
+        self._entries[key] = encoded
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # The disk tier is best effort: if the file cannot be used, results are only kept in memory
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _init_disk(self) -> None:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute("PRAGMA journal_mode=WAL")  # Readers in other workers do not block writers
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache at {self.path} is not usable, keeping results in memory: {e}")
+            self.path = None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        try:
+            with closing(self._connect()) as connection:
+                row = connection.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache read failed: {e}")
+            return None
+
+    def _disk_put(self, key: str, encoded: str) -> None:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute("INSERT OR REPLACE INTO results (key, result, created) VALUES (?, ?, ?)",
+                                   (key, encoded, time.time()))
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache write failed: {e}")
+
+
+# RESULT_CACHE_SIZE results per process; RESULT_CACHE_PATH adds an SQLite file shared by the workers
+RESULT_CACHE = ResultCache(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 128)),
+    path=os.environ.get('RESULT_CACHE_PATH') or None
+)
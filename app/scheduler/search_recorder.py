@@ -0,0 +1,111 @@
+import struct
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+# Compact binary log of what backtrack_assign did, for offline analysis with
+# app.scheduler.search_replay.
+#
+# File layout: a header (magic, format version, record size) followed by
+# fixed-size little-endian records of (kind, slot, depth, a, b):
+#
+#   NODE     a = eligible people, b = combinations of eligible people
+#   COMBO    b = position of the combination in the sorted order
+#   OUTCOME  a = outcome code (see OUTCOMES)
+#   END      a = 1 if recording stopped at max_events, b = records written
+#
+# Slots are shift slot ids (app.scheduler.shift.SLOT_IDS), NO_SLOT when there is no shift.
+
+MAGIC = b'SHTR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHH')
+RECORD = struct.Struct('<BBHHI')
+
+NODE, COMBO, OUTCOME, END = 1, 2, 3, 4
+NO_SLOT = 255
+
+# Outcome codes
+SOLVED, NOT_ENOUGH_ELIGIBLE, VALIDATION_FAILED, CHILD_FAILED, EXHAUSTED, CANCELLED = range(6)
+OUTCOMES = {
+    SOLVED: 'solved',
+    NOT_ENOUGH_ELIGIBLE: 'not_enough_eligible',
+    VALIDATION_FAILED: 'validation_failed',
+    CHILD_FAILED: 'child_failed',
+    EXHAUSTED: 'exhausted',
+    CANCELLED: 'cancelled',
+}
+
+
+class SearchEvent(NamedTuple):
+    kind: int
+    slot: int
+    depth: int
+    a: int
+    b: int
+
+
+class SearchRecorder:
+    """
+    Streams search events to a binary file. Records are packed into an in-memory
+    buffer that is written out in large chunks, and recording stops (marking the
+    file as truncated) after max_events, so the overhead per event stays small and bounded.
+    """
+    FLUSH_BYTES = 64 * 1024
+
+    def __init__(self, path: str, max_events: int = 10_000_000):
+        self.path = path
+        self.max_events = max_events
+        self.events = 0
+        self.truncated = False
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+        self._buffer = bytearray()
+
+    def _record(self, kind: int, slot: int, depth: int, a: int, b: int) -> None:
+        if self.events >= self.max_events:
+            self.truncated = True
+            return
+        self.events += 1
+        self._buffer += RECORD.pack(kind, slot, min(depth, 0xFFFF), min(a, 0xFFFF), min(b, 0xFFFFFFFF))
+        if len(self._buffer) >= self.FLUSH_BYTES:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def node(self, depth: int, slot: int, eligible: int, combos: int) -> None:
+        self._record(NODE, slot, depth, eligible, combos)
+
+    def combo(self, depth: int, slot: int, index: int) -> None:
+        self._record(COMBO, slot, depth, 0, index)
+
+    def outcome(self, depth: int, slot: int, code: int) -> None:
+        self._record(OUTCOME, slot, depth, code, 0)
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._buffer += RECORD.pack(END, NO_SLOT, 0, int(self.truncated), self.events)
+        self._file.write(self._buffer)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> 'SearchRecorder':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_events(path: str) -> Iterator[SearchEvent]:
+    """Read the events of a recorded search (including the final END record)"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"Not a search recording: {path}")
+        magic, version, record_size = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"Not a search recording: {path}")
+        if version != FORMAT_VERSION or record_size != RECORD.size:
+            raise ValueError(f"Unsupported search recording version {version} in {path}")
+
+        data = f.read()
+    usable = len(data) - len(data) % RECORD.size
+    for fields in RECORD.iter_unpack(data[:usable]):
+        yield SearchEvent(*fields)
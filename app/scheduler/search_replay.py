@@ -0,0 +1,135 @@
+"""
+Rebuild and analyse a search recorded with SearchRecorder.
+
+    python -m app.scheduler.search_replay search.bin [--top 10]
+"""
+import argparse
+from typing import Dict, Iterable, List, Optional
+from app.scheduler.shift import SLOT_KEYS
+from app.scheduler.search_recorder import (
+    NODE, COMBO, OUTCOME, END, NO_SLOT, OUTCOMES,
+    NOT_ENOUGH_ELIGIBLE, VALIDATION_FAILED, CHILD_FAILED, EXHAUSTED,
+    SearchEvent, read_events
+)
+
+
+class TreeNode:
+    """A node of the search tree: one attempt to staff a shift"""
+    __slots__ = ('slot', 'depth', 'eligible', 'combos', 'combos_tried', 'children', 'outcomes', 'parent')
+
+    def __init__(self, slot: int, depth: int, eligible: int, combos: int, parent: Optional['TreeNode']):
+        self.slot = slot
+        self.depth = depth
+        self.eligible = eligible
+        self.combos = combos
+        self.combos_tried = 0
+        self.children: List['TreeNode'] = []
+        self.outcomes: Dict[int, int] = {}
+        self.parent = parent
+
+
+class SearchTree:
+    """The rebuilt tree plus the outcomes recorded outside of any node"""
+
+    def __init__(self):
+        self.roots: List[TreeNode] = []
+        self.nodes: List[TreeNode] = []
+        self.leaf_outcomes: Dict[int, int] = {}
+        self.truncated = False
+
+
+def build_tree(events: Iterable[SearchEvent]) -> SearchTree:
+    """Rebuild the search tree from the recorded events"""
+    tree = SearchTree()
+    path: List[TreeNode] = []  # Open nodes from the root to the current one
+
+    def node_at(depth: int) -> Optional[TreeNode]:
+        while path and path[-1].depth > depth:
+            path.pop()
+        return path[-1] if path and path[-1].depth == depth else None
+
+    for event in events:
+        if event.kind == NODE:
+            while path and path[-1].depth >= event.depth:
+                path.pop()
+            parent = path[-1] if path else None
+            node = TreeNode(event.slot, event.depth, event.a, event.b, parent)
+            (parent.children if parent else tree.roots).append(node)
+            tree.nodes.append(node)
+            path.append(node)
+        elif event.kind == COMBO:
+            node = node_at(event.depth)
+            if node is not None:
+                node.combos_tried += 1
+        elif event.kind == OUTCOME:
+            node = node_at(event.depth) if event.slot != NO_SLOT else None
+            outcomes = node.outcomes if node is not None else tree.leaf_outcomes
+            outcomes[event.a] = outcomes.get(event.a, 0) + 1
+        elif event.kind == END:
+            tree.truncated = bool(event.a)
+    return tree
+
+def branching_by_depth(tree: SearchTree) -> List[Dict[str, float]]:
+    """Per depth: nodes, combinations tried and child nodes per node (the effective branching factor)"""
+    by_depth: Dict[int, List[int]] = {}
+    for node in tree.nodes:
+        totals = by_depth.setdefault(node.depth, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += node.combos_tried
+        totals[2] += len(node.children)
+    return [
+        {
+            'depth': depth,
+            'nodes': nodes,
+            'combos_per_node': combos / nodes,
+            'branching_factor': children / nodes,
+        }
+        for depth, (nodes, combos, children) in sorted(by_depth.items())
+    ]
+
+def backtracking_by_shift(tree: SearchTree) -> List[Dict[str, int]]:
+    """Per shift: nodes and how often assignments there were undone, most backtracking first"""
+    by_slot: Dict[int, Dict[str, int]] = {}
+    for node in tree.nodes:
+        totals = by_slot.setdefault(node.slot, dict.fromkeys(
+            ['nodes', 'combos_tried', 'backtracks', 'exhausted', 'not_enough_eligible'], 0))
+        totals['nodes'] += 1
+        totals['combos_tried'] += node.combos_tried
+        totals['backtracks'] += node.outcomes.get(CHILD_FAILED, 0) + node.outcomes.get(VALIDATION_FAILED, 0)
+        totals['exhausted'] += node.outcomes.get(EXHAUSTED, 0)
+        totals['not_enough_eligible'] += node.outcomes.get(NOT_ENOUGH_ELIGIBLE, 0)
+
+    rows = [{'shift': _shift_name(slot), **totals} for slot, totals in by_slot.items()]
+    return sorted(rows, key=lambda row: (-row['backtracks'], -row['nodes']))
+
+def format_report(tree: SearchTree, top: int = 10) -> str:
+    lines = [f"Nodes: {len(tree.nodes)}" + (" (recording truncated)" if tree.truncated else "")]
+    if tree.leaf_outcomes:
+        lines.append("Leaf outcomes: " + ", ".join(
+            f"{OUTCOMES.get(code, code)}={count}" for code, count in sorted(tree.leaf_outcomes.items())))
+
+    lines.append("\nDepth  Nodes  Combos/node  Branching")
+    for row in branching_by_depth(tree):
+        lines.append(f"{row['depth']:>5}  {row['nodes']:>5}  {row['combos_per_node']:>11.2f}  {row['branching_factor']:>9.2f}")
+
+    lines.append(f"\nTop {top} shifts by backtracking")
+    lines.append("Shift                   Nodes  Tried  Backtracks  Exhausted  Not enough")
+    for row in backtracking_by_shift(tree)[:top]:
+        lines.append(f"{row['shift']:<22}  {row['nodes']:>5}  {row['combos_tried']:>5}  {row['backtracks']:>10}  "
+                     f"{row['exhausted']:>9}  {row['not_enough_eligible']:>10}")
+    return "\n".join(lines)
+
+def _shift_name(slot: int) -> str:
+    return " ".join(SLOT_KEYS[slot]) if slot < len(SLOT_KEYS) else "-"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Analyse a recorded scheduler search")
+    parser.add_argument('path', help="File written by SearchRecorder")
+    parser.add_argument('--top', type=int, default=10, help="Number of shifts to list")
+    args = parser.parse_args(argv)
+    print(format_report(build_tree(read_events(args.path)), top=args.top))
+
+
+if __name__ == '__main__':
+    main()
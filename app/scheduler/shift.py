@@ -14,18 +14,42 @@ VALID_DAYS = get_args(DayType)
 VALID_SHIFT_TIMES = get_args(ShiftTimeType)
 VALID_SHIFT_TYPES = get_args(ShiftType)
 
+# Every (day, time) pair gets an integer slot id in chronological order:
+# slot = day index * number of shift times + shift time index
+SLOT_KEYS = tuple((day, time) for day in VALID_DAYS for time in VALID_SHIFT_TIMES)
+SLOT_IDS = {key: slot for slot, key in enumerate(SLOT_KEYS)}
+SLOTS_PER_DAY = len(VALID_SHIFT_TIMES)
+
+def slot_mask(keys) -> int:
+    """Build a bitmask over slot ids from (day, time) pairs"""
+    mask = 0
+    for key in keys:
+        mask |= 1 << SLOT_IDS[key]
+    return mask
+
+# Weekend shifts are Friday Evening and Night shifts and all Saturday shifts
+WEEKEND_SLOT_MASK = slot_mask(
+    (day, time) for day, time in SLOT_KEYS
+    if (day == "Friday" and time in ["Evening", "Night"]) or day == "Saturday"
+)
+DAY_SLOT_MASKS = {day: slot_mask((day, time) for time in VALID_SHIFT_TIMES) for day in VALID_DAYS}
+
 class Shift:
+    __slots__ = ('shift_day', 'shift_time', 'slot', '_needed', 'assigned_people', 'group', '_is_staffed')
+
     def __new__(cls, shift_day: DayType, shift_time: ShiftTimeType, group: 'ShiftGroup', needed: int = 0):
-        # First check if shift exists in group
-        existing_shift = group.get_shift(shift_day, shift_time)
-        if existing_shift:
-            return existing_shift  # Return existing instance
+        # First check the group's registry, which is indexed by slot id
+        slot = SLOT_IDS.get((shift_day, shift_time))
+        if slot is not None:
+            existing_shift = group.get_shift_by_slot(slot)
+            if existing_shift is not None:
+                return existing_shift  # Return existing instance
 
         return super().__new__(cls)
 
     def __init__(self, shift_day: DayType, shift_time: ShiftTimeType, group: 'ShiftGroup', needed: int = 0):
         # Only initialize if this is a new instance
-        if not hasattr(self, 'shift_day'):  # Check if already initialized
+        if not hasattr(self, 'slot'):  # Check if already initialized
             # Validate using the values from Literal types
             if shift_day not in VALID_DAYS:
                 raise ValueError(
@@ -43,13 +67,27 @@ class Shift:
             # Initialize new shift
             self.shift_day = shift_day
             self.shift_time = shift_time
-            self.needed = needed
+            self.slot = SLOT_IDS[(shift_day, shift_time)]
+            self._needed = needed
             self.assigned_people: List['Person'] = []
             self.group = group
-            self.is_staffed = False
+            self._is_staffed = False
             # Add shift to group
             group.add_shift(self)
 
+    @classmethod
+    def _create_unchecked(cls, group: 'ShiftGroup', slot: int, needed: int) -> 'Shift':
+        """Create and register a shift from already validated values, skipping __new__ and __init__"""
+        shift = object.__new__(cls)
+        shift.shift_day, shift.shift_time = SLOT_KEYS[slot]
+        shift.slot = slot
+        shift._needed = needed
+        shift.assigned_people = []
+        shift.group = group
+        shift._is_staffed = False
+        group.add_shift(shift)
+        return shift
+
     # Class method to create all possible shifts
     @classmethod
     def create_all_shifts(cls, group: 'ShiftGroup') -> List['Shift']:
@@ -76,26 +114,26 @@ class Shift:
     @property
     def previous_day(self) -> Optional[str]:
         """Get the previous day in the week sequence"""
-        day_index = VALID_DAYS.index(self.shift_day)
+        day_index = self.slot // SLOTS_PER_DAY
         return VALID_DAYS[day_index - 1] if day_index > 0 else None
 
     @property
     def next_day(self) -> Optional[str]:
         """Get the next day in the week sequence"""
-        day_index = VALID_DAYS.index(self.shift_day)
+        day_index = self.slot // SLOTS_PER_DAY
         return VALID_DAYS[day_index + 1] if day_index < len(VALID_DAYS) - 1 else None
 
     @property
     def previous_shift(self) -> Optional[str]:
         """Get the previous shift in the day sequence"""
-        shift_index = VALID_SHIFT_TIMES.index(self.shift_time)
+        shift_index = self.slot % SLOTS_PER_DAY
         return VALID_SHIFT_TIMES[shift_index - 1] if shift_index > 0 else None
 
     @property
     def next_shift(self) -> Optional[str]:
         """Get the next shift in the day sequence"""
-        shift_index = VALID_SHIFT_TIMES.index(self.shift_time)
-        return VALID_SHIFT_TIMES[shift_index + 1] if shift_index < len(VALID_SHIFT_TIMES) - 1 else None
+        shift_index = self.slot % SLOTS_PER_DAY
+        return VALID_SHIFT_TIMES[shift_index + 1] if shift_index < SLOTS_PER_DAY - 1 else None
 
     @property
     def is_weekend_shift(self) -> bool:
@@ -104,8 +142,7 @@ class Shift:
         - Friday Evening and Night shifts
         - All Saturday shifts
         """
-        return (self.shift_day == "Friday" and self.shift_time in ["Evening", "Night"]) or \
-               (self.shift_day == "Saturday")
+        return bool(WEEKEND_SLOT_MASK >> self.slot & 1)
 
     @property
     def is_morning(self) -> bool:
@@ -129,32 +166,50 @@ class Shift:
     
     @property
     def shift_type(self) -> str:
-        """Get the type of the shift and validate that shift type exists in the SHIFT_TYPES list"""
-        shift_type = None
-        if self.is_night:
-            shift_type = "night"
-        elif self.is_weekend_shift:
-            shift_type = "weekend"
-        else:
-            shift_type = "regular"
-        
-        if shift_type not in VALID_SHIFT_TYPES:
-            raise ValueError(f"Shift type \"{shift_type}\" is not a valid shift type")
-        
-        return shift_type
+        """Get the type of the shift (looked up by slot id, validated when the table is built)"""
+        return SLOT_SHIFT_TYPES[self.slot]
+
+    @property
+    def constraint_score_types(self) -> tuple:
+        """Get the constraint score types this shift counts towards
+        Weekend nights count towards both the night and the weekend scores"""
+        return SLOT_SCORE_TYPES[self.slot]
+
+    @property
+    def needed(self) -> int:
+        return self._needed
+
+    @needed.setter
+    def needed(self, value: int) -> None:
+        """Set the number of people needed and let the group rebuild its demand totals"""
+        self._needed = value
+        if self.group is not None:
+            self.group.eligibility.mark_demand_dirty()
+
+    @property
+    def is_staffed(self) -> bool:
+        return self._is_staffed
+
+    @is_staffed.setter
+    def is_staffed(self, value: bool) -> None:
+        """Set the staffing state and let the group update its eligibility counts"""
+        if value == self._is_staffed:
+            return
+        self._is_staffed = value
+        if self.group is not None:
+            self.group.eligibility.shift_staffing_changed(self)
 
     def __eq__(self, other: 'Shift') -> bool:
         """Defines how two shifts are compared for equality
-        Two shifts are equal if they have the same day and time"""
+        Two shifts are equal if they have the same day and time (i.e. the same slot)"""
         if not isinstance(other, Shift):
             return NotImplemented
-        return (self.shift_day == other.shift_day and 
-                self.shift_time == other.shift_time)
+        return self.slot == other.slot
 
     def __hash__(self) -> int:
         """Makes Shift objects hashable (needed for sets)
-        Two shifts that are equal will have the same hash"""
-        return hash((self.shift_day, self.shift_time))
+        The slot id is unique per (day, time), so equal shifts have the same hash"""
+        return self.slot
 
     def __str__(self) -> str:
         """Defines how a shift is converted to string
@@ -163,36 +218,66 @@ class Shift:
 
     def __lt__(self, other: 'Shift') -> bool:
         """Defines how shifts are ordered (less than comparison)
-        Orders shifts chronologically through the week"""
-        
-        # First compare days using their position in VALID_DAYS
-        day_index_self = VALID_DAYS.index(self.shift_day)
-        day_index_other = VALID_DAYS.index(other.shift_day)
-        
-        if day_index_self != day_index_other:
-            return day_index_self < day_index_other
-        
-        # If same day, compare shift times using their position in VALID_SHIFT_TIMES
-        return VALID_SHIFT_TIMES.index(self.shift_time) < VALID_SHIFT_TIMES.index(other.shift_time)
+        Orders shifts chronologically through the week, which is the slot order"""
+        return self.slot < other.slot
 
     def assign_person(self, person: 'Person') -> None:
         """Assign a person to this shift"""
+        self.group.eligibility.mark_dirty(person)
         if person not in self.assigned_people:
             self.assigned_people.append(person)
+            person.assigned_mask |= 1 << self.slot
             self.is_staffed = True if len(self.assigned_people) >= self.needed else False
     def unassign_person(self, person: 'Person') -> None:
         """Remove a person from this shift"""
+        self.group.eligibility.mark_dirty(person)
         if person in self.assigned_people:
-            self.assigned_people.remove(person) 
+            self.assigned_people.remove(person)
+            person.assigned_mask &= ~(1 << self.slot)
             self.is_staffed = True if len(self.assigned_people) >= self.needed else False
 
     def copy_with_group(self) -> 'Shift':
-        """Create a copy of this shift, optionally with a new group"""
+        """Get this shift's instance in its group
+        Shifts are interned per (day, time), so this is normally the shift itself.
+        A shift missing from the group's registry is re-created without re-validation."""
         group = self.group
-        new_shift = Shift(self.shift_day, self.shift_time, group, self.needed)
+        new_shift = group.get_shift_by_slot(self.slot)
+        if new_shift is self:
+            return self
+        if new_shift is None:
+            new_shift = Shift._create_unchecked(group, self.slot, self.needed)
         new_shift.is_staffed = self.is_staffed
         new_shift.assigned_people = self.assigned_people.copy()
         return new_shift
     
     def __repr__(self):
-        return f"{self.shift_day} {self.shift_time}"
\ No newline at end of file
+        return f"{self.shift_day} {self.shift_time}"
+
+
+def _slot_shift_type(slot: int) -> str:
+    """Night shifts are 'night', other weekend shifts are 'weekend', everything else is 'regular'"""
+    if SLOT_KEYS[slot][1] == "Night":
+        shift_type = "night"
+    elif WEEKEND_SLOT_MASK >> slot & 1:
+        shift_type = "weekend"
+    else:
+        shift_type = "regular"
+
+    if shift_type not in VALID_SHIFT_TYPES:
+        raise ValueError(f"Shift type \"{shift_type}\" is not a valid shift type")
+    return shift_type
+
+def _slot_score_types(slot: int) -> tuple:
+    is_night = SLOT_KEYS[slot][1] == "Night"
+    is_weekend = bool(WEEKEND_SLOT_MASK >> slot & 1)
+    if is_night and is_weekend:
+        return ("night", "weekend")
+    if is_night:
+        return ("night",)
+    if is_weekend:
+        return ("weekend",)
+    return ("regular",)
+
+# Per slot lookup tables for the shift type properties
+SLOT_SHIFT_TYPES = tuple(_slot_shift_type(slot) for slot in range(len(SLOT_KEYS)))
+SLOT_SCORE_TYPES = tuple(_slot_score_types(slot) for slot in range(len(SLOT_KEYS)))
@@ -1,35 +1,80 @@
 from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
-from app.scheduler.shift import Shift
-from app.scheduler.utils import debug_log
+from app.scheduler.shift import Shift, SLOT_KEYS, SLOT_IDS, DAY_SLOT_MASKS
+from app.scheduler.eligibility_tracker import EligibilityTracker
+from app.scheduler.constraint_pipeline import ConstraintPipeline
+from app.scheduler.flag_manager import FlagManager
+from app.scheduler.tracing import DEBUG, get_tracer
 
 if TYPE_CHECKING:
     from app.scheduler.person import Person
 
+ranking_trace = get_tracer('ranking')
+
 class ShiftGroup:
     """Manages a group of shifts and their assignments"""
     
     def __init__(self):
+        self.eligibility = EligibilityTracker(self)
+        self.constraints = ConstraintPipeline(self)
         self.shifts: List[Shift] = []
         self.people: List['Person'] = []
+
+    def compile_constraints(self, flag_manager: Optional[FlagManager] = None) -> ConstraintPipeline:
+        """Compile the constraints enabled in flag_manager (all of them if None) for the next solve,
+        including every person's static compatibility data"""
+        self.constraints = ConstraintPipeline(self, flag_manager)
+        self.constraints.compile_people(self.people)
+        self.eligibility.mark_all_dirty()
+        return self.constraints
+
+    @property
+    def shifts(self) -> List[Shift]:
+        return self._shifts
+
+    @shifts.setter
+    def shifts(self, shifts: List[Shift]) -> None:
+        """Replace the group's shifts, invalidating all cached eligibility counts"""
+        self._shifts = shifts
+        # Registry of interned shifts indexed by slot id
+        self._shifts_by_slot: List[Optional[Shift]] = [None] * len(SLOT_KEYS)
+        for shift in shifts:
+            if self._shifts_by_slot[shift.slot] is None:
+                self._shifts_by_slot[shift.slot] = shift
+        self.eligibility.mark_all_dirty()
+
+    @property
+    def people(self) -> List['Person']:
+        return self._people
+
+    @people.setter
+    def people(self, people: List['Person']) -> None:
+        """Replace the group's people, invalidating the eligible capacity totals"""
+        self._people = people
+        self.eligibility.mark_supply_dirty()
     
     def add_shift(self, shift: Shift) -> None:
         """Add a shift to the group"""
-        if shift not in self.shifts:
+        if self._shifts_by_slot[shift.slot] is None:
             self.shifts.append(shift)
+            self._shifts_by_slot[shift.slot] = shift
             shift.group = self  # Set back-reference to this group
+            self.eligibility.mark_all_dirty()
 
     def add_person(self, person: 'Person') -> None:
         """Add a person to the group"""
         if person not in self.people:
             self.people.append(person)
             person.group = self  # Set back-reference to this group
+            self.eligibility.mark_supply_dirty()
 
     def get_shift(self, day: str, time: str) -> Optional[Shift]:
         """Get a shift by day and time"""
-        for shift in self.shifts:
-            if shift.shift_day == day and shift.shift_time == time:
-                return shift
-        return None
+        slot = SLOT_IDS.get((day, time))
+        return self._shifts_by_slot[slot] if slot is not None else None
+
+    def get_shift_by_slot(self, slot: int) -> Optional[Shift]:
+        """Get a shift by slot id"""
+        return self._shifts_by_slot[slot]
     
     # The function receives a shift, and returns all the shifts from the ShiftGroup that have the same day  
     def get_all_same_day_shifts(self, tested_shift: Shift) -> List[Shift]:
@@ -41,8 +86,8 @@ class ShiftGroup:
 
     def is_person_assigned(self, person: 'Person', day: str, time: str) -> bool:
         """Check if a person is assigned to a specific day and time"""
-        shift = self.get_shift(day, time)
-        return shift is not None and person in shift.assigned_people 
+        slot = SLOT_IDS.get((day, time))
+        return slot is not None and bool(person.assigned_mask >> slot & 1)
     
 
     
@@ -87,44 +132,7 @@ class ShiftGroup:
     
     def count_shifts_in_day(self, person: 'Person', day: str) -> int:
         """Count how many shifts a person has on a given day"""
-        count = 0
-        for shift in self.get_all_shifts_from_day(day):
-            if person in shift.assigned_people:
-                count += 1
-        return count
-
-    def check_all_constraints(self, person: 'Person', shift: Shift, 
-                            allow_consecutive: bool, 
-                            allow_three_shifts: bool, 
-                            allow_night_noon: bool) -> Tuple[bool, str]:
-        """
-        Check all group-based constraints for a person and shift.
-        Returns (is_allowed, reason_if_not_allowed)
-        """
-        # Morning after night
-        if self.is_morning_after_night(person, shift):
-            return False, "Morning after night conflict"
-        
-        # Night and noon
-        if not allow_night_noon and self.is_noon_after_night(person, shift):
-            return False, "Night and noon conflict"
-
-        # Consecutive shifts
-        if not allow_consecutive and self.is_consecutive_shift(person, shift):
-            return False, "Consecutive shift not allowed"
-        
-        # Third shift
-        if self.is_third_shift(person, shift):
-            if not allow_three_shifts:
-                return False, "Third shift not allowed"
-            elif shift.is_evening or person.is_shift_assigned(Shift(shift.shift_day, "Evening", group=self)):
-                return False, "Third shift not allowed when evening shift is assigned"
-        
-        # Night after evening
-        if self.is_night_after_evening(person, shift):
-            return False, "Night after evening conflict"
-
-        return True, ""
+        return (person.assigned_mask & DAY_SLOT_MASKS[day]).bit_count()
 
     def rank_shifts(self, people: List['Person']) -> List[Shift]:
         """
@@ -133,10 +141,9 @@ class ShiftGroup:
              smaller ratio => more constrained => higher priority.
           2) Within that shift type, the per-shift constraint_score (lower => more constrained).
         """
-        # First ensure all people have their constraint scores calculated
+        # First ensure all people have up to date constraint scores (cheap for clean people)
         for person in people:
-            if not person.constraint_scores:  # If scores haven't been calculated yet
-                person.calculate_constraint_score(self)
+            person.calculate_constraint_score(self)
         
         # Compute dynamic ratios per shift type
         type_ratios = self.get_shift_type_ratios()
@@ -171,42 +178,31 @@ class ShiftGroup:
 
         sorted_rankings = sorted(rankings, key=sort_key)
 
-        print("\n=== Ranked Shifts ===")
-        for rank, (score, shift) in enumerate(sorted_rankings, 1):
-            print(f"Rank {rank}: {shift} | "
-                  f"Type: {shift.shift_type} (ratio={type_ratios.get(shift.shift_type, 'inf')}) | "
-                  f"Score={score}")
-        print("=====================\n")
+        if ranking_trace.debug:
+            ranking_trace.event(DEBUG, 'ranked_shifts', shifts=[
+                (rank, str(shift), shift.shift_type, type_ratios.get(shift.shift_type, 'inf'), score)
+                for rank, (score, shift) in enumerate(sorted_rankings, 1)
+            ])
 
         return [shift for _, shift in sorted_rankings] 
     
     def get_remaining_shift_types(self) -> List[str]:
-        unstaffed_shifts = [s for s in self.shifts if not s.is_staffed]
-        return list(set([shift.shift_type for shift in unstaffed_shifts]))
-
-    def get_shift_type_ratios(self) -> Dict[str, float]:
-        # Get unstaffed shifts
-        unstaffed_shifts = [s for s in self.shifts if not s.is_staffed]
+        return list(self.eligibility.get_needed_by_type())
 
-        # Create a set of keys that represent remaining shift types
-        remaining_shift_types = self.get_remaining_shift_types()
-        
+    def get_needed_by_type(self) -> Dict[str, int]:
+        """Get the number of people still needed per remaining shift type"""
+        return self.eligibility.get_needed_by_type()
 
+    def get_shift_type_ratios(self) -> Dict[str, float]:
         # Create a dict where the keys are shift types and the values are the type's constraint score calculated by: 
         # (sum of all eligible remaining capacity for this shift type) / (total needed for this shift type)
+        # Both totals are maintained incrementally by the eligibility tracker
         shift_type_ratios = {}
-        for shift_type in remaining_shift_types:
-            total_needed = sum(shift.needed for shift in unstaffed_shifts if shift.shift_type == shift_type)
+        for shift_type, total_needed in self.get_needed_by_type().items():
             eligible_capacity = self.get_eligible_capacity_by_type(shift_type)
             shift_type_ratios[shift_type] = eligible_capacity / total_needed
         
         return shift_type_ratios
 
     def get_eligible_capacity_by_type(self, shift_type: str) -> float:
-        eligible_capacity = 0
-        unstaffed_shifts = [s for s in self.shifts if not s.is_staffed]
-        for shift in unstaffed_shifts:
-            if shift.shift_type == shift_type:
-                eligible_capacity += sum(p.get_capacity_by_type(shift_type) for p in self.people if p.is_eligible_for_shift(shift))
-        return eligible_capacity
-
+        return self.eligibility.get_eligible_capacity(shift_type)
@@ -1,109 +1,128 @@
 import os
 import sys
 import time
+import cProfile
+import pstats
+from math import comb
 from typing import List, Tuple
-
-# Add project root to Python path
-project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.append(project_root)
-
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import threading
-from itertools import combinations
 from app.scheduler.person import Person
-from app.scheduler.utils import debug_log
 from app.scheduler.constants import DAYS, SHIFTS
-from app.google_sheets.import_sheet_data import (
-    get_fresh_data
-)
 from app.scheduler.shift import Shift, VALID_DAYS
 from app.scheduler.shift_group import ShiftGroup
 from app.scheduler.combo_manager import ComboManager
+from app.scheduler.flag_manager import FlagManager
+from app.scheduler.preferences import PreferenceModel
+from app.scheduler.tracing import DEBUG, INFO, get_tracer
+from app.scheduler.metrics import REGISTRY, SolveStats, format_profile
+from app.scheduler import search_recorder
+from app.scheduler.search_recorder import SearchRecorder
+from app.scheduler.progress import ProgressReporter
+from app.scheduler import tracing
 
-debug_mode = True
-def debug_log(message):
-    if debug_mode:
-        print(message)
+search_trace = get_tracer('search')
+validation_trace = get_tracer('validation')
+solver_trace = get_tracer('solver')
 
 
-def validate_eligibility_for_remaining_shifts(remaining_shifts, shift_group):
-    shift_types = shift_group.get_remaining_shift_types()
-    for shift_type in shift_types:
-        needed_capacity = sum(shift.needed for shift in remaining_shifts if shift.shift_type == shift_type)
+def validate_eligibility_for_remaining_shifts(shift_group):
+    # Needed and eligible capacity per shift type are running totals kept by the group
+    for shift_type, needed_capacity in shift_group.get_needed_by_type().items():
         eligible_capacity = shift_group.get_eligible_capacity_by_type(shift_type)
         if eligible_capacity < needed_capacity:
-            print(f"Validation failed: {shift_type} needs {needed_capacity} people, "
-                    f"but only {eligible_capacity} are available.")
+            if validation_trace.debug:
+                validation_trace.event(DEBUG, 'failed', shift_type=shift_type,
+                                       needed=needed_capacity, eligible=eligible_capacity)
             return False
-    print("Validation passed: All shifts have enough eligible people.")
     return True
 
 def backtrack_assign(remaining_shifts: List[Shift], shift_group: ShiftGroup,
                     max_depth: int = 10000, depth: int = 0, 
                     cancel_event: threading.Event = None,
-                    combinations_checked: list = None) -> Tuple[bool, str]:
+                    combinations_checked: list = None,
+                    combo_manager: ComboManager = None,
+                    stats: SolveStats = None,
+                    recorder: SearchRecorder = None,
+                    progress: ProgressReporter = None) -> Tuple[bool, str]:
     """
     Assign people to shifts using backtracking to ensure all constraints are satisfied.
+    If a recorder is given, every node, tried combination and outcome is streamed to it.
+    If a progress reporter is given, it samples the search as it goes.
     Returns: (bool, str) - (success, reason for failure if any)
     """
     # Initialize combinations counter if this is the first call
     if combinations_checked is None:
         combinations_checked = [0]
 
+    # A single ComboManager and SolveStats for the whole search
+    if combo_manager is None:
+        combo_manager = ComboManager()
+    if stats is None:
+        stats = SolveStats()
+    stats.nodes += 1
+
     # Check for cancellation at the start of each recursive call
     if cancel_event and cancel_event.is_set():
+        stats.prunes['cancelled'] += 1
+        if recorder is not None:
+            recorder.outcome(depth, search_recorder.NO_SLOT, search_recorder.CANCELLED)
         return False, "Algorithm cancelled"
 
+    if progress is not None:
+        progress.on_node(depth, shift_group, stats)
+
     if not remaining_shifts:
+        if recorder is not None:
+            recorder.outcome(depth, search_recorder.NO_SLOT, search_recorder.SOLVED)
         return True, "success"
 
     # Create copies of shifts for this branch
     original_shifts = [shift.copy_with_group() for shift in remaining_shifts]
     
     current_shift = remaining_shifts[0]
-    debug_log(f"\nDepth {depth}: Trying to assign {current_shift}")
     
     # Get eligible people for this shift
+    phase_start = time.perf_counter_ns()
     eligible_people = [p for p in shift_group.people if p.is_eligible_for_shift(current_shift)]
-    print(f"\n=== {current_shift}: Trying to assign {current_shift.needed} people ===")
-    print(f"Eligible people: {[p.name for p in eligible_people]}")
+    if search_trace.debug:
+        search_trace.event(DEBUG, 'node', depth=depth, shift=current_shift, needed=current_shift.needed,
+                           eligible=[p.name for p in eligible_people])
+    if recorder is not None:
+        recorder.node(depth, current_shift.slot, len(eligible_people),
+                      comb(len(eligible_people), current_shift.needed))
 
     # If not enough people are available, backtrack
     if len(eligible_people) < current_shift.needed:
-        debug_log(f"BACKTRACK: Not enough eligible people ({len(eligible_people)} < {current_shift.needed})")
+        stats.end_phase('eligibility', phase_start)
+        stats.prunes['not_enough_eligible'] += 1
+        if search_trace.debug:
+            search_trace.event(DEBUG, 'not_enough_eligible', depth=depth, shift=current_shift)
+        if recorder is not None:
+            recorder.outcome(depth, current_shift.slot, search_recorder.NOT_ENOUGH_ELIGIBLE)
         return False, f"Not enough eligible people for {current_shift}"
 
-    # Generate all combinations
-    all_combos = [list(combo) for combo in combinations(eligible_people, current_shift.needed)]
-    debug_log(f"Generated {len(all_combos)} combinations")
-
     # Compute constraint scores for each eligible person
     for person in eligible_people:
         person.calculate_constraint_score(current_shift.group)
+    stats.end_phase('eligibility', phase_start)
 
-    # Get sorted combinations from ComboManager
-    combo_manager = ComboManager()
-    sorted_combos = combo_manager.sort_combinations(all_combos, current_shift, shift_group)
-
-    tested_combos = []
-    remaining_combos = [[p.name for p in combo] for combo in sorted_combos]
-    
-    # Introduce a flag to check if any solution was found at this depth
-    is_any_valid = False
+    # Generate and sort all combinations (scored in bulk as index arrays) with ComboManager.
+    # Combinations are consumed lazily, so the ones after a success are never built.
+    sorted_combos = combo_manager.iter_sorted_combinations(
+        eligible_people, current_shift.needed, current_shift, shift_group
+    )
+    stats.combos_generated += comb(len(eligible_people), current_shift.needed)
 
     # Try all combinations of eligible people for this shift
-    for combo in sorted_combos:
+    for combo_index, combo in enumerate(sorted_combos):
         # Increment the combinations counter
         combinations_checked[0] += 1
-        
-        debug_log(f"================================================")
-        debug_log(f"{len(remaining_combos)} Remaining combos: {remaining_combos}")
-        debug_log(f"{len(tested_combos)} Tested combos: {tested_combos}")
-        debug_log(f"Trying combination: {[p.name for p in combo]} for {current_shift}")
-        debug_log(f"================================================")
-
-        tested_combos.append([p.name for p in combo])
-        remaining_combos.remove([p.name for p in combo])
+        stats.combos_tried += 1
+        if search_trace.debug:
+            search_trace.event(DEBUG, 'combo', depth=depth, shift=current_shift, combo=[p.name for p in combo])
+        if recorder is not None:
+            recorder.combo(depth, current_shift.slot, combo_index)
         
         # Make the assignment
         for p in combo:
@@ -111,31 +130,44 @@ def backtrack_assign(remaining_shifts: List[Shift], shift_group: ShiftGroup,
             
         remaining_shifts.pop(0)
         current_shift.is_staffed = True
-        debug_log(f"Removing {current_shift} from remaining shifts")
-        debug_log(f"  Remaining shifts: {remaining_shifts}")
         
+        phase_start = time.perf_counter_ns()
         ranked_shifts = [shift.copy_with_group() for shift in shift_group.rank_shifts(shift_group.people)]
+        phase_start = stats.end_phase('rank_shifts', phase_start)
+        is_valid = validate_eligibility_for_remaining_shifts(shift_group)
+        stats.end_phase('validate', phase_start)
         
-        if validate_eligibility_for_remaining_shifts(ranked_shifts, shift_group):
+        if is_valid:
             result, reason = backtrack_assign(
                 ranked_shifts, shift_group, max_depth=max_depth, 
                 depth=depth + 1, cancel_event=cancel_event,
-                combinations_checked=combinations_checked
+                combinations_checked=combinations_checked,
+                combo_manager=combo_manager,
+                stats=stats,
+                recorder=recorder,
+                progress=progress
             )
             
             if result:
-                is_any_valid = True
                 return True, "success"
             
             # Undo the assignment before returning False
             else:
+                stats.add_backtrack(depth)
+                if recorder is not None:
+                    recorder.outcome(depth, current_shift.slot, search_recorder.CHILD_FAILED)
                 for person in combo:
                     person.unassign_from_shift(current_shift)
                     current_shift.is_staffed = False
                 remaining_shifts = [shift.copy_with_group() for shift in original_shifts]
             
         else:
-            debug_log(f"Next iteration check failed: Undoing assignment for {current_shift}")
+            stats.prunes['validation_failed'] += 1
+            stats.add_backtrack(depth)
+            if search_trace.debug:
+                search_trace.event(DEBUG, 'validation_failed', depth=depth, shift=current_shift)
+            if recorder is not None:
+                recorder.outcome(depth, current_shift.slot, search_recorder.VALIDATION_FAILED)
 
             # Undo the assignment (backtrack)
             for person in combo:
@@ -144,32 +176,23 @@ def backtrack_assign(remaining_shifts: List[Shift], shift_group: ShiftGroup,
 
             remaining_shifts = [shift.copy_with_group() for shift in original_shifts]
             current_shift = remaining_shifts[0]
-
-        debug_log(f"State after undoing {current_shift}:")
-        debug_log(f"  Remaining shifts: {remaining_shifts}")
-        debug_log(f"  People's shift counts: {[(p.name, p.shift_counts) for p in shift_group.people]}")
-        debug_log(f"  People's night counts: {[(p.name, p.night_counts) for p in shift_group.people]}")
-        
-    # If no valid combination was found for the current shift
-    if not is_any_valid:
-        debug_log(f"No valid combination found for {current_shift}. Backtracking...")
-        debug_log("=============================================================================")
         
-        # NEW: If this is the top-level shift, stop immediately instead of trying the next shift
-        if depth == 0:
-            debug_log("No valid combination for the top-level shift - returning immediately.")
-            return False, "no_valid_combination_for_first_shift"
-
-        debug_log(f"Undoing assignment for {current_shift}: {[p.name for p in combo]}")
-        debug_log(f"Current depth: {depth}")
-        debug_log("=============================================================================")
-        debug_log(f"Remaining shifts after all combinations of {current_shift} failed: {remaining_shifts}")
-        return False, "no_valid_combination"
-
+    # No valid combination was found for the current shift
+    if search_trace.debug:
+        search_trace.event(DEBUG, 'exhausted', depth=depth, shift=current_shift)
+    if recorder is not None:
+        recorder.outcome(depth, current_shift.slot, search_recorder.EXHAUSTED)
 
+    # If this is the top-level shift, stop immediately instead of trying the next shift
+    if depth == 0:
+        return False, "no_valid_combination_for_first_shift"
+    return False, "no_valid_combination"
 
 
-def run_shift_algorithm(shift_group=None, timeout=None):
+def run_shift_algorithm(shift_group=None, timeout=None, flag_manager: FlagManager = None,
+                        preference_model: PreferenceModel = None, stats: SolveStats = None,
+                        profile: bool = False, record_path: str = None,
+                        cancel_event: threading.Event = None, progress: ProgressReporter = None):
     """
     Run the algorithm with timeout
     
@@ -177,6 +200,13 @@ def run_shift_algorithm(shift_group=None, timeout=None):
         shift_group: ShiftGroup object containing all shifts
         people: List of Person objects
         timeout: Maximum time to run algorithm
+        flag_manager: Constraints to enforce during this solve (all of them if None)
+        preference_model: Team preferences for ordering combinations (TARGET_PAIRS if None)
+        stats: Collects the counters and phase times of this solve (e.g. to return a phase breakdown)
+        profile: Run the solve under cProfile and keep the result in stats.profile
+        record_path: Record the search tree to this file (see app.scheduler.search_replay)
+        cancel_event: Setting it stops the solve early (it is also set when the solve times out)
+        progress: Receives samples of the search (see app.scheduler.progress)
         
     Returns:
         Tuple of (success, assignments, reason, shift_counts, people)
@@ -184,42 +214,94 @@ def run_shift_algorithm(shift_group=None, timeout=None):
     # Add timing at the start
     start_time = time.time()
     
-    cancel_event = threading.Event()
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    timed_out = threading.Event()
     
+    # Counters of this solve, merged into the metrics registry once it ends
+    if stats is None:
+        stats = SolveStats()
+
     def algorithm_worker(shift_group):
-        # If no data passed, get fresh data from import_sheet_data
-        if shift_group is None:
-            # Keep the same order as our return value
-            shift_group = get_fresh_data()
-        
-        # Sort shifts based on constraint level
-        remaining_shifts = shift_group.rank_shifts(shift_group.people)
-        
-        # Initialize combinations counter
-        combinations_checked = [0]
-        
-        # Run the backtracking assignment
-        max_depth = 10000
-        success, reason = backtrack_assign(
-            remaining_shifts, 
-            shift_group,
-            max_depth=max_depth,
-            cancel_event=cancel_event,
-            combinations_checked=combinations_checked
-        )
-        
-        # Keep consistent return order throughout the function
-        return success, reason, shift_group, combinations_checked[0]
+        outcome = 'error'
+        # cProfile only sees the thread it is enabled in, so it is enabled here
+        profiler = cProfile.Profile() if profile else None
+        if profiler is not None:
+            profiler.enable()
+        recorder = None
+        try:
+            # If no data passed, get fresh data from import_sheet_data
+            if shift_group is None:
+                # Imported here so that the solver does not load the Sheets client unless it is used
+                from app.google_sheets.import_sheet_data import get_fresh_data
+                shift_group = get_fresh_data(stats=stats)
+
+            # Compile the enabled constraints and the preferences once for this solve
+            phase_start = time.perf_counter_ns()
+            shift_group.compile_constraints(flag_manager)
+            combo_manager = ComboManager(preference_model)
+            combo_manager.compile_preferences(shift_group.people)
+            combo_manager.stats = stats
+            phase_start = stats.end_phase('compile', phase_start)
+            
+            # Sort shifts based on constraint level
+            remaining_shifts = shift_group.rank_shifts(shift_group.people)
+            phase_start = stats.end_phase('rank_shifts', phase_start)
+            
+            # Initialize combinations counter
+            combinations_checked = [0]
+
+            if record_path:
+                recorder = SearchRecorder(record_path)
+            
+            # Run the backtracking assignment
+            max_depth = 10000
+            success, reason = backtrack_assign(
+                remaining_shifts, 
+                shift_group,
+                max_depth=max_depth,
+                cancel_event=cancel_event,
+                combinations_checked=combinations_checked,
+                combo_manager=combo_manager,
+                stats=stats,
+                recorder=recorder,
+                progress=progress
+            )
+            stats.end_phase('search', phase_start)
+
+            # The search is cancelled when the caller timed out or cancelled it
+            if success:
+                outcome = 'success'
+            elif cancel_event.is_set():
+                outcome = 'timeout' if timed_out.is_set() else 'cancelled'
+                reason = "Algorithm cancelled"  # Not the failure the cancellation surfaced as
+            else:
+                outcome = 'infeasible'
+            
+            # Keep consistent return order throughout the function
+            return success, reason, shift_group, combinations_checked[0], combo_manager
+        finally:
+            if recorder is not None:
+                recorder.close()
+            if profiler is not None:
+                profiler.disable()
+                stats.profile = pstats.Stats(profiler)
+            stats.outcome = outcome
+            REGISTRY.record_solve(stats, outcome, time.time() - start_time)
 
     with ThreadPoolExecutor() as executor:
         future = executor.submit(algorithm_worker, shift_group)
         try:
-            success, reason, shift_group, total_combinations = future.result(timeout=timeout)
+            success, reason, shift_group, total_combinations, combo_manager = future.result(timeout=timeout)
             
             # Calculate execution time
             execution_time = time.time() - start_time
-            print(f"\nScheduling algorithm completed in {execution_time:.2f} seconds")
-            print(f"Total combinations checked: {total_combinations}")
+            if solver_trace.info:
+                solver_trace.event(INFO, 'completed', success=success, reason=reason,
+                                   seconds=round(execution_time, 3), combinations_checked=total_combinations)
+                for rule in shift_group.constraints.get_stats():
+                    solver_trace.event(INFO, 'constraint_stats', **rule)
+                solver_trace.event(INFO, 'combo_cache_stats', **combo_manager.order_cache.get_stats())
             
             if success:
                 # Create web interface dictionaries
@@ -238,17 +320,36 @@ def run_shift_algorithm(shift_group=None, timeout=None):
                 
                 return success, assignments, reason, shift_counts, shift_group.people
             else:
+                tracing.dump_buffer()
                 return False, None, reason, None, None
             
         except TimeoutError:
             execution_time = time.time() - start_time
-            print(f"\nAlgorithm timed out after {execution_time:.2f} seconds")
+            if solver_trace.info:
+                solver_trace.event(INFO, 'timed_out', seconds=round(execution_time, 3))
+            timed_out.set()
             cancel_event.set()  # Signal algorithm to stop
+            tracing.dump_buffer()
             return False, None, "Algorithm timed out", None, None
 
 
 if __name__ == '__main__':
-    success, assignments, reason, shift_counts, people = run_shift_algorithm()
+    # Run from the project root with: python -m app.scheduler.shifts_algo
+    # Report the solve summary on the command line unless SHIFTS_TRACE says otherwise
+    if not os.environ.get('SHIFTS_TRACE'):
+        tracing.configure({'solver': 'info'}, stream=sys.stdout)
+
+    # SHIFTS_PROFILE=phases prints the phase breakdown, SHIFTS_PROFILE=cprofile also the
+    # top cProfile entries; SHIFTS_PROFILE_DUMP=<file> saves the cProfile data for pstats/snakeviz
+    profile_mode = os.environ.get('SHIFTS_PROFILE', '').lower()
+    profile_dump = os.environ.get('SHIFTS_PROFILE_DUMP')
+    solve_stats = SolveStats()
+
+    # SHIFTS_RECORD=<file> records the search tree for python -m app.scheduler.search_replay <file>
+    success, assignments, reason, shift_counts, people = run_shift_algorithm(
+        stats=solve_stats, profile=profile_mode == 'cprofile' or bool(profile_dump),
+        record_path=os.environ.get('SHIFTS_RECORD')
+    )
     
     if success:
         print("\n=== Shifts Successfully Assigned ===")
@@ -265,4 +366,14 @@ if __name__ == '__main__':
             print(f"{person_name}: {count} shifts")
             
     else:
-        print(f"\nNo solution found: {reason}")
\ No newline at end of file
+        print(f"\nNo solution found: {reason}")
+
+    if profile_mode:
+        print("\n=== Phase Breakdown ===")
+        for phase, timing in solve_stats.get_phase_breakdown().items():
+            print(f"{phase}: {timing['ms']:.1f} ms ({timing['calls']} calls)")
+    if solve_stats.profile is not None:
+        if profile_mode == 'cprofile':
+            print(format_profile(solve_stats.profile))
+        if profile_dump:
+            solve_stats.profile.dump_stats(profile_dump)
\ No newline at end of file
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: solves are then only coalesced within a process
+    fcntl = None
+
+# Coalescing of concurrent identical solves, keyed by problem_key (app.scheduler.result_cache).
+#
+# Within a process, the first caller of a key runs the solve and the others wait
+# for its result. Across processes, the caller that runs the solve holds an
+# exclusive lock on <lock_dir>/<key>.lock; another process's caller waits for the
+# lock and then checks the shared result cache (recheck) before solving itself.
+# The lock is released by the OS if its process dies, so it never goes stale.
+#
+# The holder removes the lock file before unlocking it, so the directory only
+# holds the files of solves in flight (plus, at most, one per solve whose process
+# died). A waiter that then gets the lock of a removed file opens the path again.
+
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'shared', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.shared = False
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, lock_dir: Optional[str] = None, poll_interval: float = POLL_INTERVAL):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def run(self, key: str, func: Callable[[], Tuple[object, bool]],
+            recheck: Optional[Callable[[], object]] = None,
+            cancel_event: Optional[threading.Event] = None,
+            on_wait: Optional[Callable[[], None]] = None) -> Tuple[object, bool]:
+        """
+        Run func, or wait for the run of the same key already in flight. func returns
+        (result, shared); a result that is not shared (e.g. a cancelled solve) makes the
+        waiting callers run it again themselves. recheck returns the result another
+        process stored while this one waited for its lock, or None.
+
+        Returns (result, whether it came from another caller), or (None, False) if
+        cancel_event was set while waiting.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.leaders += 1
+                else:
+                    self.followers += 1
+
+            if leader:
+                try:
+                    call.result, call.shared = self._run_locked(key, func, recheck, cancel_event, on_wait)
+                    return call.result, False
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+
+            if on_wait:
+                on_wait()
+            if not self._wait(call.done, cancel_event):
+                return None, False
+            if call.error is not None:
+                raise call.error
+            if call.shared:
+                return call.result, True
+            # Not usable by the others: try again, possibly as the one running it
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leaders': self.leaders, 'followers': self.followers}
+
+    def _run_locked(self, key, func, recheck, cancel_event, on_wait) -> Tuple[object, bool]:
+        if self.lock_dir is None:
+            return func()
+        with self._process_lock(key, cancel_event, on_wait) as waited:
+            if waited is None:
+                return None, False
+            if waited and recheck is not None:
+                result = recheck()
+                if result is not None:
+                    return result, True
+            return func()
+
+    @contextmanager
+    def _process_lock(self, key: str, cancel_event, on_wait) -> Iterator[Optional[bool]]:
+        """Holds the key's lock file; yields whether another process had it first, or None if cancelled"""
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = os.path.join(self.lock_dir, f"{key}.lock")
+        waited = False
+        while True:
+            with open(path, 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    if not waited and on_wait:
+                        on_wait()
+                    waited = True
+                    if cancel_event is not None and cancel_event.is_set():
+                        yield None
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+
+                if not _is_current(lock_file, path):
+                    # Locked after its holder removed it: that holder's solve ended, so try the path again
+                    waited = True
+                    continue
+                try:
+                    yield waited
+                finally:
+                    # Removed while still locked, so nobody can lock this file and take it as current
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                return
+
+    def _wait(self, done: threading.Event, cancel_event: Optional[threading.Event]) -> bool:
+        """Wait for done; False if cancel_event was set first"""
+        if cancel_event is None:
+            done.wait()
+            return True
+        while not done.wait(self.poll_interval):
+            if cancel_event.is_set():
+                return False
+        return True
+
+
+def _is_current(lock_file, path: str) -> bool:
+    """Whether the open lock file is still the one at path"""
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(lock_file.fileno())
+    return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+def _default_lock_dir() -> Optional[str]:
+    # Coalescing across workers needs the shared (SQLite) result cache to hand over the result
+    if os.environ.get('SOLVE_LOCK_DIR'):
+        return os.environ['SOLVE_LOCK_DIR']
+    if os.environ.get('RESULT_CACHE_PATH'):
+        return os.environ['RESULT_CACHE_PATH'] + '.locks'
+    return None
+
+# SOLVE_LOCK_DIR (by default next to RESULT_CACHE_PATH) enables coalescing across workers
+SINGLE_FLIGHT = SingleFlight(lock_dir=_default_lock_dir())
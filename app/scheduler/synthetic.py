@@ -0,0 +1,109 @@
+import random
+from typing import Dict, Optional, Sequence
+from app.scheduler.person import Person
+from app.scheduler.shift import Shift, SLOT_KEYS, SLOT_IDS, WEEKEND_SLOT_MASK
+from app.scheduler.shift_group import ShiftGroup
+
+# Seeded generator of realistic scheduling instances, so the solver can be
+# tested and benchmarked without the Google Sheets. The same arguments always
+# produce the same ShiftGroup.
+
+# Relative staffing weight of each shift, by (day, time). "Last Saturday" belongs
+# to the previous week and is never staffed, as in the Needed Shifts sheet.
+def _profile(weight):
+    return {key: (0.0 if key[0] == "Last Saturday" else weight(*key)) for key in SLOT_KEYS}
+
+NEEDS_PROFILES: Dict[str, Dict[tuple, float]] = {
+    'flat': _profile(lambda day, time: 1.0),
+    # Busy days with a thin night crew, like the real sheet
+    'day_heavy': _profile(lambda day, time: 0.5 if time == "Night" else 1.5 if time in ("Morning", "Noon") else 1.0),
+    'weekend_heavy': _profile(
+        lambda day, time: 2.0 if WEEKEND_SLOT_MASK >> SLOT_IDS[(day, time)] & 1 else 1.0
+    ),
+}
+
+# Probability that a person has each of the boolean flags set
+DEFAULT_FLAG_PROBABILITIES = {
+    'double_shift': 0.5,
+    'are_three_shifts_possible': 0.3,
+    'night_and_noon_possible': 0.5,
+}
+
+
+def generate_shift_group(seed: int,
+                         people: int = 12,
+                         blocked_density: float = 0.2,
+                         needs_profile: str = 'flat',
+                         flag_probabilities: Optional[Dict[str, float]] = None,
+                         tightness: float = 0.6,
+                         max_shifts: Sequence[int] = (5, 6, 7),
+                         max_nights: Sequence[int] = (1, 2, 2),
+                         max_weekend_shifts: Sequence[int] = (1, 2)) -> ShiftGroup:
+    """
+    Generate a ShiftGroup of random people and shift needs.
+
+    Args:
+        seed: Seed of the random generator
+        people: Number of people
+        blocked_density: Probability that a person blocks any given shift
+        needs_profile: How the needed people are spread over the week (see NEEDS_PROFILES)
+        flag_probabilities: Probability of each boolean Person flag (DEFAULT_FLAG_PROBABILITIES if None)
+        tightness: Total needed people as a fraction of everyone's total max_shifts
+        max_shifts, max_nights, max_weekend_shifts: Values each person's limits are drawn from
+
+    Returns:
+        ShiftGroup with its people and shifts (only shifts that need someone)
+    """
+    if needs_profile not in NEEDS_PROFILES:
+        raise ValueError(f"Unknown needs profile: {needs_profile}")
+    if not 0 <= blocked_density <= 1:
+        raise ValueError(f"blocked_density must be between 0 and 1, got {blocked_density}")
+    if tightness <= 0:
+        raise ValueError(f"tightness must be positive, got {tightness}")
+    flag_probabilities = {**DEFAULT_FLAG_PROBABILITIES, **(flag_probabilities or {})}
+
+    rnd = random.Random(seed)
+    shift_group = ShiftGroup()
+
+    # People first, since the needs are derived from their total capacity
+    weights = NEEDS_PROFILES[needs_profile]
+    staffed_slots = [slot for slot, key in enumerate(SLOT_KEYS) if weights[key] > 0]
+    generated = []
+    for i in range(people):
+        blocked_mask = 0
+        for slot in staffed_slots:
+            if rnd.random() < blocked_density:
+                blocked_mask |= 1 << slot
+        generated.append(Person(
+            name=f"Person {i + 1}",
+            blocked_shifts=blocked_mask,
+            double_shift=rnd.random() < flag_probabilities['double_shift'],
+            max_shifts=rnd.choice(max_shifts),
+            max_nights=rnd.choice(max_nights),
+            are_three_shifts_possible=rnd.random() < flag_probabilities['are_three_shifts_possible'],
+            night_and_noon_possible=rnd.random() < flag_probabilities['night_and_noon_possible'],
+            max_weekend_shifts=rnd.choice(max_weekend_shifts),
+        ))
+
+    # Spread the total need over the shifts by weight: whole parts first, then
+    # the remaining units drawn in proportion to the weights
+    total_needed = round(tightness * sum(person.max_shifts for person in generated))
+    total_weight = sum(weights[SLOT_KEYS[slot]] for slot in staffed_slots)
+    needed = {}
+    for slot in staffed_slots:
+        needed[slot] = min(int(total_needed * weights[SLOT_KEYS[slot]] / total_weight), people)
+    remaining = total_needed - sum(needed.values())
+    while remaining > 0:
+        open_slots = [slot for slot in staffed_slots if needed[slot] < people]
+        if not open_slots:
+            break
+        slot = rnd.choices(open_slots, weights=[weights[SLOT_KEYS[slot]] for slot in open_slots])[0]
+        needed[slot] += 1
+        remaining -= 1
+
+    for slot in staffed_slots:
+        if needed[slot] > 0:
+            Shift(*SLOT_KEYS[slot], group=shift_group, needed=needed[slot])
+    for person in generated:
+        shift_group.add_person(person)
+    return shift_group
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, TextIO, Tuple
+
+# Structured tracing for the scheduler, off by default.
+#
+# Every subsystem has its own Tracer with a level. Call sites check the level
+# flag before building an event, so a disabled tracer costs one attribute
+# lookup and nothing is formatted or collected:
+#
+#     if trace.debug:
+#         trace.event(DEBUG, 'combo', shift=shift, combo=[p.name for p in combo])
+#
+# Events are (time, subsystem, level, name, fields) tuples. They are written to
+# a stream, and/or kept in a bounded ring buffer that can be dumped when a solve
+# fails. Configure with configure() or the environment:
+#
+#     SHIFTS_TRACE="search=debug,solver=info"   levels per subsystem ("all=debug" for everything)
+#     SHIFTS_TRACE_BUFFER=5000                  keep the last 5000 events in memory instead of printing them
+
+OFF, INFO, DEBUG = 0, 1, 2
+LEVELS = {'off': OFF, 'info': INFO, 'debug': DEBUG}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+SUBSYSTEMS = ('solver', 'search', 'ranking', 'validation')
+
+TraceEvent = Tuple[float, str, int, str, Dict]
+
+
+class Tracer:
+    """Tracer of a single subsystem. The info/debug flags are what call sites check"""
+    __slots__ = ('subsystem', 'level', 'info', 'debug')
+
+    def __init__(self, subsystem: str):
+        self.subsystem = subsystem
+        self.set_level(OFF)
+
+    def set_level(self, level: int) -> None:
+        self.level = level
+        self.info = level >= INFO
+        self.debug = level >= DEBUG
+
+    def event(self, level: int, name: str, /, **fields) -> None:
+        """Record an event. Callers are expected to check the level flag first"""
+        if level > self.level:
+            return
+        record = (time.perf_counter(), self.subsystem, level, name, fields)
+        if _buffer is not None:
+            _buffer.append(record)
+        if _stream is not None:
+            _stream.write(format_event(record) + "\n")
+
+
+_tracers: Dict[str, Tracer] = {subsystem: Tracer(subsystem) for subsystem in SUBSYSTEMS}
+_buffer: Optional[Deque[TraceEvent]] = None
+_stream: Optional[TextIO] = None
+
+
+def get_tracer(subsystem: str) -> Tracer:
+    """The tracer of a subsystem. The same object is reconfigured in place, so it can be kept in a module global"""
+    if subsystem not in _tracers:
+        raise ValueError(f"Unknown trace subsystem: {subsystem}")
+    return _tracers[subsystem]
+
+def configure(levels: Optional[Dict[str, str]] = None,
+              buffer_size: int = 0,
+              stream: Optional[TextIO] = None) -> None:
+    """
+    Set the level of each subsystem ("off", "info" or "debug"; "all" sets every subsystem),
+    the size of the ring buffer (0 for none) and the stream events are written to (None for none).
+    Subsystems not listed are turned off.
+    """
+    global _buffer, _stream
+    resolved = dict.fromkeys(SUBSYSTEMS, OFF)
+    for subsystem, level_name in (levels or {}).items():
+        if level_name not in LEVELS:
+            raise ValueError(f"Unknown trace level: {level_name}")
+        if subsystem == 'all':
+            resolved = dict.fromkeys(SUBSYSTEMS, LEVELS[level_name])
+        elif subsystem in resolved:
+            resolved[subsystem] = LEVELS[level_name]
+        else:
+            raise ValueError(f"Unknown trace subsystem: {subsystem}")
+
+    for subsystem, level in resolved.items():
+        _tracers[subsystem].set_level(level)
+    _buffer = deque(maxlen=buffer_size) if buffer_size > 0 else None
+    _stream = stream
+
+def configure_from_env() -> None:
+    """Configure tracing from SHIFTS_TRACE and SHIFTS_TRACE_BUFFER (see the module comment)"""
+    spec = os.environ.get('SHIFTS_TRACE', '').strip()
+    if not spec:
+        configure()
+        return
+    levels = dict(item.strip().split('=', 1) for item in spec.split(',') if item.strip())
+    buffer_size = int(os.environ.get('SHIFTS_TRACE_BUFFER', 0))
+    configure(levels, buffer_size=buffer_size, stream=None if buffer_size else sys.stderr)
+
+def format_event(record: TraceEvent) -> str:
+    timestamp, subsystem, level, name, fields = record
+    details = " ".join(f"{key}={value}" for key, value in fields.items())
+    return f"{timestamp:.6f} {LEVEL_NAMES[level].upper()} [{subsystem}] {name} {details}".rstrip()
+
+def dump_buffer(stream: Optional[TextIO] = None) -> int:
+    """Write out and clear the ring buffer (to stderr by default). Returns the number of events written"""
+    if not _buffer:
+        return 0
+    stream = stream or sys.stderr
+    count = len(_buffer)
+    for record in list(_buffer):
+        stream.write(format_event(record) + "\n")
+    _buffer.clear()
+    return count
+
+
+configure_from_env()
@@ -0,0 +1,80 @@
+"""
+Cold start import check, based on python -X importtime.
+
+Imports a module (wsgi by default) in a fresh interpreter, reports the slowest
+imports and fails if the total is over the limit or if any of the heavy
+dependencies that should only load on first use was imported.
+
+    python -m benchmarks.import_time [--module wsgi] [--top 15] [--max-seconds 0.5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded when a schedule is generated, never by a starting worker
+LAZY_MODULES = ('pandas', 'numpy', 'gspread', 'oauth2client', 'app.scheduler.shifts_algo')
+MAX_SECONDS = 0.5
+
+
+def measure_imports(module: str = 'wsgi') -> Dict[str, Dict[str, float]]:
+    """Self and cumulative import time in seconds of every module imported by module"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = {'self': int(self_us) / 1e6, 'cumulative': int(cumulative_us) / 1e6}
+    return timings
+
+def check_imports(module: str = 'wsgi', max_seconds: float = MAX_SECONDS, top: int = 15) -> Dict:
+    timings = measure_imports(module)
+    total = timings[module]['cumulative']
+    eager = [name for name in LAZY_MODULES if name in timings]
+
+    failures = []
+    if total > max_seconds:
+        failures.append(f"importing {module} took {total:.3f}s, limit {max_seconds}s")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+
+    slowest = sorted(timings.items(), key=lambda item: item[1]['cumulative'], reverse=True)[:top]
+    return {
+        'module': module,
+        'seconds': round(total, 4),
+        'slowest': [{'module': name, **{key: round(value, 4) for key, value in timing.items()}}
+                    for name, timing in slowest],
+        'failures': failures,
+    }
+
+def format_report(report: Dict) -> List[str]:
+    status = "FAIL" if report['failures'] else "ok"
+    lines = [f"import {report['module']:<14} {status:<4} {report['seconds']:>8.3f}s"]
+    for entry in report['slowest']:
+        lines.append(f"    {entry['cumulative'] * 1000:>8.1f} ms  {entry['module']}")
+    lines.extend(f"    {failure}" for failure in report['failures'])
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the cold start import time")
+    parser.add_argument('--module', default='wsgi', help="Module a worker starts from")
+    parser.add_argument('--top', type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS)
+    args = parser.parse_args(argv)
+
+    report = check_imports(args.module, args.max_seconds, args.top)
+    print("\n".join(format_report(report)))
+    return 1 if report['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
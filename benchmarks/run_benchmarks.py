@@ -0,0 +1,170 @@
+"""
+Offline solver benchmarks over synthetic instances (app.scheduler.synthetic).
+
+Every scenario is solved with run_shift_algorithm and checked against its
+thresholds (solve time, search nodes, peak traced memory). The hot helpers
+(is_eligible_for_shift, rank_shifts, sort_combinations) are timed on the same
+instance, and the cold start imports are checked (benchmarks.import_time).
+Exits with status 1 if any threshold is exceeded.
+
+    python -m benchmarks.run_benchmarks [--scenario NAME ...] [--repeat N] [--json FILE] [--skip-imports]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from itertools import combinations
+from typing import Callable, Dict, List, Optional
+from app.scheduler.combo_manager import ComboManager
+from app.scheduler.metrics import SolveStats
+from app.scheduler.shifts_algo import run_shift_algorithm
+from app.scheduler.synthetic import generate_shift_group
+from benchmarks import import_time
+
+# Generator arguments, the expected outcome and the regression thresholds of each scenario.
+# Node counts are deterministic; time and memory limits leave room for slower machines.
+SCENARIOS: Dict[str, Dict] = {
+    'small_flat': {
+        'instance': dict(seed=1, people=8, tightness=0.55),
+        'success': True,
+        'max_seconds': 0.5, 'max_nodes': 30, 'max_peak_mb': 4,
+    },
+    'medium_day_heavy': {
+        'instance': dict(seed=1, people=12, needs_profile='day_heavy', tightness=0.7),
+        'success': True,
+        'max_seconds': 0.5, 'max_nodes': 40, 'max_peak_mb': 4,
+    },
+    'large_flat': {
+        'instance': dict(seed=1, people=24, blocked_density=0.3, tightness=0.7),
+        'success': True,
+        'max_seconds': 1.0, 'max_nodes': 45, 'max_peak_mb': 24,
+    },
+    'dense_blocks': {
+        'instance': dict(seed=3, people=12, blocked_density=0.45, tightness=0.55),
+        'success': True,
+        'max_seconds': 0.5, 'max_nodes': 45, 'max_peak_mb': 4,
+    },
+    'rigid_flags': {
+        'instance': dict(seed=4, people=12, tightness=0.6, flag_probabilities={
+            'double_shift': 0, 'are_three_shifts_possible': 0, 'night_and_noon_possible': 0}),
+        'success': True,
+        'max_seconds': 0.5, 'max_nodes': 45, 'max_peak_mb': 4,
+    },
+    # Too much weekend work for the people available: a long search that has to fail
+    'weekend_infeasible': {
+        'instance': dict(seed=1, people=8, needs_profile='weekend_heavy', tightness=0.55),
+        'success': False,
+        'max_seconds': 6.0, 'max_nodes': 5000, 'max_peak_mb': 4,
+    },
+}
+
+SOLVE_TIMEOUT = 60
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """Best of repeat runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def benchmark_helpers(instance: Dict, repeat: int) -> Dict[str, float]:
+    """Milliseconds per call of the hot helpers, before any shift is assigned"""
+    shift_group = generate_shift_group(**instance)
+    shift_group.compile_constraints()
+    people, shifts = shift_group.people, shift_group.shifts
+    for person in people:
+        person.calculate_constraint_score(shift_group)
+
+    first_shift = shift_group.rank_shifts(people)[0]
+    eligible = [person for person in people if person.is_eligible_for_shift(first_shift)]
+    combos = list(combinations(eligible, first_shift.needed))
+    combo_manager = ComboManager()
+
+    return {
+        'is_eligible_for_shift_all_ms': time_call(
+            lambda: [person.is_eligible_for_shift(shift) for shift in shifts for person in people], repeat),
+        'rank_shifts_ms': time_call(lambda: shift_group.rank_shifts(people), repeat),
+        'sort_combinations_ms': time_call(
+            lambda: combo_manager.sort_combinations(combos, first_shift, shift_group), repeat) if combos else 0.0,
+    }
+
+def run_scenario(name: str, repeat: int = 3) -> Dict:
+    """Solve a scenario (best time of repeat solves) and check it against its thresholds"""
+    scenario = SCENARIOS[name]
+    instance = scenario['instance']
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        stats = SolveStats()
+        start = time.perf_counter()
+        success, _, reason, _, _ = run_shift_algorithm(generate_shift_group(**instance), timeout=SOLVE_TIMEOUT, stats=stats)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    # Memory is measured in a separate solve, since tracing allocations slows it down
+    tracemalloc.start()
+    try:
+        run_shift_algorithm(generate_shift_group(**instance), timeout=SOLVE_TIMEOUT)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+    failures = []
+    if success != scenario['success']:
+        failures.append(f"expected success={scenario['success']}, got {success} ({reason})")
+    if seconds > scenario['max_seconds']:
+        failures.append(f"took {seconds:.3f}s, limit {scenario['max_seconds']}s")
+    if stats.nodes > scenario['max_nodes']:
+        failures.append(f"explored {stats.nodes} nodes, limit {scenario['max_nodes']}")
+    if peak_mb > scenario['max_peak_mb']:
+        failures.append(f"peak memory {peak_mb:.2f} MB, limit {scenario['max_peak_mb']} MB")
+
+    return {
+        'scenario': name,
+        'success': success,
+        'reason': reason,
+        'seconds': round(seconds, 4),
+        'nodes': stats.nodes,
+        'combos_tried': stats.combos_tried,
+        'peak_mb': round(peak_mb, 3),
+        'helpers': {key: round(ms, 4) for key, ms in benchmark_helpers(instance, repeat).items()},
+        'failures': failures,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the solver on synthetic instances")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run (all of them if not given); can be repeated")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per measurement (the best one is kept)")
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--skip-imports', action='store_true', help="Do not check the cold start imports")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(name, repeat=args.repeat)
+        results.append(result)
+        status = "FAIL" if result['failures'] else "ok"
+        print(f"{name:<20} {status:<4} {result['seconds']:>8.3f}s {result['nodes']:>7} nodes "
+              f"{result['peak_mb']:>7.2f} MB  " +
+              "  ".join(f"{key}={ms:.3f}" for key, ms in result['helpers'].items()))
+        for failure in result['failures']:
+            print(f"    {failure}")
+
+    if not args.skip_imports:
+        report = import_time.check_imports(top=5)
+        results.append(report)
+        print("\n".join(import_time.format_report(report)))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(result['failures'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,7 @@ from app.scheduler.shift import VALID_DAYS, VALID_SHIFT_TIMES
 from app.scheduler.shift_group import ShiftGroup
 from app.scheduler.shift import Shift
 from app.scheduler.combo_manager import ComboManager
+from app.scheduler.synthetic import generate_shift_group
 from itertools import combinations
 #Create a fixture for a sample shift constraints
 @pytest.fixture
@@ -28,6 +29,11 @@ def sample_shift_group_from_sheet():
         people_sheet_name="Test Data - People")
     return shift_group
 
+@pytest.fixture
+def synthetic_shift_group():
+    """A generated, solvable ShiftGroup of 12 people that does not need the Google Sheet"""
+    return generate_shift_group(seed=1, people=12, tightness=0.6)
+
 @pytest.fixture
 def complete_shift_group():
     """Creates a ShiftGroup containing all possible shifts"""
@@ -271,12 +271,6 @@ def test_combined_scoring(combo_manager, target_names_people_with_same_constrain
         p for p in people if p.name.startswith("NOT_TARGET_")
     ][:2]
     
-    # Set different constraint scores
-    for p in target_pair_combo:
-        p.constraints_score = 2.0  # Target pair but high constraints
-    for p in non_target_combo:
-        p.constraints_score = 1.0  # Better constraints but no target pair
-    
     combinations = [target_pair_combo, non_target_combo]
     sorted_combos = combo_manager.sort_combinations(combinations, current_shift=regular_shift)
     
@@ -302,12 +296,6 @@ def test_constraint_score_sorting_no_targets(combo_manager, target_names_people_
     first_combo = non_target_people[:2]
     second_combo = non_target_people[:2]  # Use same people, different scores
     
-    # Set different constraint scores
-    for p in first_combo:
-        p.constraints_score = 3.0  # Higher (better) scores
-    for p in second_combo:
-        p.constraints_score = 1.0  # Lower (worse) scores
-    
     combinations = [second_combo, first_combo]
     sorted_combos = combo_manager.sort_combinations(combinations, current_shift=regular_shift)
     
@@ -469,12 +457,6 @@ def test_preferences_disabled(combo_manager, target_names_people_with_same_const
         p for p in people if p.name.startswith("NOT_TARGET_")
     ][:2]
     
-    # Set different constraint scores
-    for p in target_pair_combo:
-        p.constraints_score = 2.0
-    for p in non_target_combo:
-        p.constraints_score = 1.0
-    
     # Disable both preferences
     combo_manager.preferences['preferred_people'] = False
     combo_manager.preferences['constraint_score'] = False
@@ -483,4 +465,106 @@ def test_preferences_disabled(combo_manager, target_names_people_with_same_const
     sorted_combos = combo_manager.sort_combinations(combinations, current_shift=regular_shift)
     
     # Should maintain original order when preferences are disabled
-    assert sorted_combos == combinations 
\ No newline at end of file
+    assert sorted_combos == combinations 
+
+def scalar_sort_key(combo_manager, combo, shift, group):
+    """The per-combo scores the batch scoring replaces, as a reference sort key"""
+    preferences = combo_manager.preferences
+    names_in_combo = {person.name for person in combo}
+    target_names_score = sum(
+        target['weight'] for target in combo_manager.target_names
+        if len(names_in_combo & target['pair']) == 2
+    ) if preferences['preferred_people'] else 0.0
+    double_shifts = sum(
+        1 for person in combo if person.double_shift and group.is_consecutive_shift(person, shift)
+    ) if preferences['double_shifts'] else 0
+    constraint_score = sum(
+        person.constraint_scores[shift.shift_type] for person in combo
+    ) if preferences['constraint_score'] else 0.0
+    return -target_names_score, -double_shifts, constraint_score
+
+def test_vectorised_sort_matches_scalar_key(combo_manager):
+    """Batch scoring must give exactly the order of sorting by the scalar per-combo scores"""
+    import random
+    from itertools import combinations
+
+    group = ShiftGroup()
+    for time in ["Morning", "Noon", "Evening"]:
+        Shift("Sunday", time, group=group, needed=2)
+    shift = group.get_shift("Sunday", "Noon")
+
+    rng = random.Random(7)
+    names = ["Avishay", "Shani Keynan", "Dubi Friger", "Itay", "Shai Katzil", "A", "B", "C"]
+    people = []
+    for name in names:
+        person = Person(name, {}, double_shift=rng.random() < 0.5, max_shifts=5, max_nights=2,
+                        are_three_shifts_possible=False, night_and_noon_possible=False)
+        person.constraint_scores = {t: rng.choice([0.5, 1.0, 1.5]) for t in ['regular', 'night', 'weekend']}
+        group.add_person(person)
+        people.append(person)
+    for person in people[::3]:
+        person.assign_to_shift(group.get_shift("Sunday", "Morning"))
+
+    for size in [1, 2, 3]:
+        combos = [list(combo) for combo in combinations(people, size)]
+        expected = sorted(combos, key=lambda combo: scalar_sort_key(combo_manager, combo, shift, group))
+        assert combo_manager.sort_combinations(combos, shift, group) == expected
+        assert list(combo_manager.iter_sorted_combinations(people, size, shift, group)) == expected
+
+def test_combo_order_cache_reuses_sorted_orders(combo_manager):
+    group = ShiftGroup()
+    shift = Shift("Monday", "Noon", group=group, needed=2)
+    for name in ["A", "B", "C", "D"]:
+        person = Person(name, {}, double_shift=False, max_shifts=5, max_nights=2,
+                        are_three_shifts_possible=False, night_and_noon_possible=False)
+        person.constraint_scores = {'regular': 1.0, 'night': 1.0, 'weekend': 1.0}
+        group.add_person(person)
+
+    first = list(combo_manager.iter_sorted_combinations(group.people, 2, shift, group))
+    second = list(combo_manager.iter_sorted_combinations(group.people, 2, shift, group))
+    assert first == second
+    assert combo_manager.order_cache.get_stats()['hits'] == 1
+
+    # A changed score is a different state and must be re-sorted
+    group.people[3].constraint_scores['regular'] = 0.1
+    third = list(combo_manager.iter_sorted_combinations(group.people, 2, shift, group))
+    assert third[0][1].name == "D"
+    assert combo_manager.order_cache.get_stats()['misses'] == 2
+
+    # People out of group order are sorted correctly but not cached
+    reversed_people = group.people[::-1]
+    combos = list(combo_manager.iter_sorted_combinations(reversed_people, 2, shift, group))
+    assert combos[0][0].name == "D"
+    assert combo_manager.order_cache.get_stats()['entries'] == 2
+
+def test_combo_order_cache_evicts_least_recently_used():
+    import numpy as np
+    from app.scheduler.combo_manager import ComboOrderCache
+
+    cache = ComboOrderCache(max_bytes=3 * 80)
+    for key in range(3):
+        cache.put(key, np.zeros(10, dtype=np.int64))
+    cache.get(0)
+    cache.put(3, np.zeros(10, dtype=np.int64))
+
+    assert cache.get(1) is None
+    assert cache.get(0) is not None
+    assert cache.get_stats()['evictions'] == 1
+
+def test_combo_phases_timed_once_per_call(combo_manager):
+    from app.scheduler.metrics import SolveStats
+
+    group = ShiftGroup()
+    shift = Shift("Monday", "Noon", group=group, needed=2)
+    for name in ["A", "B", "C"]:
+        person = Person(name, {}, double_shift=False, max_shifts=5, max_nights=2,
+                        are_three_shifts_possible=False, night_and_noon_possible=False)
+        person.constraint_scores = {'regular': 1.0, 'night': 1.0, 'weekend': 1.0}
+        group.add_person(person)
+    combo_manager.stats = SolveStats()
+
+    list(combo_manager.iter_sorted_combinations(group.people, 2, shift, group))
+    assert combo_manager.stats.phase_calls == {'combo_generation': 1, 'combo_sort': 1}
+
+    list(combo_manager.iter_sorted_combinations(group.people, 2, shift, group))  # A cache hit
+    assert combo_manager.stats.phase_calls == {'combo_generation': 1, 'combo_sort': 2}
@@ -0,0 +1,165 @@
+import pytest
+from app.scheduler.constraint_pipeline import ConstraintPipeline, ConstraintRule
+from app.scheduler.flag_manager import FlagManager
+from app.scheduler.person import Person
+from app.scheduler.shift_group import ShiftGroup
+
+
+@pytest.fixture
+def single_shift_person():
+    """A person who can't do consecutive shifts, three shift days or night + noon"""
+    return Person(
+        name="Single Shift Person",
+        blocked_shifts={("Monday", "Morning"): True},
+        double_shift=False,
+        max_shifts=10,
+        max_nights=2,
+        are_three_shifts_possible=False,
+        night_and_noon_possible=False
+    )
+
+def rule_names(pipeline):
+    return [rule.name for rule in pipeline.rules]
+
+def test_all_rules_compiled_without_flag_manager(complete_shift_group):
+    pipeline = ConstraintPipeline(complete_shift_group)
+    assert set(rule_names(pipeline)) == {
+        'weekend_limit', 'candidate_slots', 'max_shifts', 'max_nights', 'conflicts', 'three_shifts'
+    }
+
+def test_disabled_flags_are_not_compiled(complete_shift_group, single_shift_person):
+    flags = FlagManager()
+    flags.set_constraint('enforce_consecutive', False)
+    flags.set_constraint('enforce_weekend_limit', False)
+    pipeline = complete_shift_group.compile_constraints(flags)
+    pipeline.compile_person(single_shift_person)
+
+    assert 'weekend_limit' not in rule_names(pipeline)
+    assert 'three_shifts' in rule_names(pipeline)
+    # enforce_night_noon is disabled by default in FlagManager
+    assert single_shift_person.conflict_kinds == ('morning_after_night', 'night_after_evening')
+
+def test_disabled_constraint_allows_assignment(complete_shift_group, single_shift_person):
+    monday_noon = complete_shift_group.get_shift("Monday", "Noon")
+    monday_evening = complete_shift_group.get_shift("Monday", "Evening")
+    single_shift_person.assign_to_shift(monday_noon)
+    assert not single_shift_person.is_eligible_for_shift(monday_evening)
+
+    flags = FlagManager()
+    flags.set_constraint('enforce_consecutive', False)
+    complete_shift_group.compile_constraints(flags)
+    assert single_shift_person.is_eligible_for_shift(monday_evening)
+
+def test_rejection_reason_and_counters(complete_shift_group, single_shift_person):
+    pipeline = complete_shift_group.compile_constraints()
+    blocked_shift = complete_shift_group.get_shift("Monday", "Morning")
+    open_shift = complete_shift_group.get_shift("Tuesday", "Morning")
+
+    assert pipeline.check(single_shift_person, blocked_shift) == (False, "Shift is blocked")
+    assert pipeline.check(single_shift_person, open_shift) == (True, "")
+
+    stats = {rule['name']: rule for rule in pipeline.get_stats()}
+    assert stats['candidate_slots']['calls'] == 2
+    assert stats['candidate_slots']['rejects'] == 1
+    # Every rule ran for the eligible shift
+    assert all(rule['calls'] >= 1 for rule in stats.values())
+
+def test_reorder_puts_selective_rules_first(complete_shift_group, single_shift_person):
+    """A rule that rejects most evaluations should move to the front"""
+    pipeline = complete_shift_group.compile_constraints()
+    single_shift_person.blocked_shifts = {shift.key: True for shift in complete_shift_group.shifts}
+
+    for _ in range(ConstraintPipeline.REORDER_INTERVAL):
+        for shift in complete_shift_group.shifts[:4]:
+            pipeline.check(single_shift_person, shift)
+    pipeline.reorder()
+
+    assert pipeline.rules[0].name == 'candidate_slots'
+
+def test_counters_exact_across_reorder(complete_shift_group, single_shift_person):
+    """The evaluation that triggers a reorder is counted under the new order only"""
+    pipeline = complete_shift_group.compile_constraints()
+    passes = ConstraintRule('passes', lambda person, shift: None)
+    rejects = ConstraintRule('rejects', lambda person, shift: "Rejected")
+    passes.timed_ns, passes.timed_calls = 10**9, 1  # Expensive, so the reorder moves it last
+    pipeline.rules = [passes, rejects]
+    pipeline._set_order()
+    shift = complete_shift_group.get_shift("Tuesday", "Morning")
+
+    for _ in range(ConstraintPipeline.REORDER_INTERVAL):
+        pipeline.check(single_shift_person, shift)
+    assert rule_names(pipeline) == ['rejects', 'passes']
+    # Flushed by the reorder: everything before the evaluation that triggered it
+    assert (passes.calls, passes.rejects) == (ConstraintPipeline.REORDER_INTERVAL - 1, 0)
+    assert (rejects.calls, rejects.rejects) == (ConstraintPipeline.REORDER_INTERVAL - 1,) * 2
+
+    for _ in range(4):
+        pipeline.check(single_shift_person, shift)
+    stats = {rule['name']: (rule['calls'], rule['rejects']) for rule in pipeline.get_stats()}
+    assert stats == {
+        'rejects': (ConstraintPipeline.REORDER_INTERVAL + 4,) * 2,
+        'passes': (ConstraintPipeline.REORDER_INTERVAL - 1, 0),
+    }
+
+def test_candidate_mask_excludes_static_limits(complete_shift_group, single_shift_person):
+    single_shift_person.max_nights = 0
+    single_shift_person.max_weekend_shifts = 0
+    complete_shift_group.compile_constraints().compile_person(single_shift_person)
+
+    candidates = {
+        shift.key for shift in complete_shift_group.shifts
+        if single_shift_person.candidate_mask >> shift.slot & 1
+    }
+    assert ("Monday", "Morning") not in candidates
+    assert ("Tuesday", "Night") not in candidates
+    assert ("Friday", "Evening") not in candidates
+    assert ("Saturday", "Morning") not in candidates
+    assert ("Thursday", "Evening") in candidates
+    assert ("Friday", "Noon") in candidates
+
+def test_static_data_recompiled_after_change(complete_shift_group, single_shift_person):
+    pipeline = complete_shift_group.compile_constraints()
+    wednesday_noon = complete_shift_group.get_shift("Wednesday", "Noon")
+    assert pipeline.check(single_shift_person, wednesday_noon) == (True, "")
+
+    single_shift_person.blocked_shifts = {("Wednesday", "Noon"): True}
+    assert single_shift_person.compiled_for is None
+    assert pipeline.check(single_shift_person, wednesday_noon) == (False, "Shift is blocked")
+
+def test_only_static_fields_invalidate(complete_shift_group, single_shift_person):
+    pipeline = complete_shift_group.compile_constraints()
+    pipeline.check(single_shift_person, complete_shift_group.get_shift("Wednesday", "Noon"))
+    single_shift_person.shift_counts += 1
+    single_shift_person.assigned_mask |= 1
+    assert single_shift_person.compiled_for is pipeline
+
+    single_shift_person.max_nights = 0
+    assert single_shift_person.max_nights == 0
+    assert single_shift_person.compiled_for is None
+
+    # The limits the capacity checks read are compiled again too
+    single_shift_person.max_shifts = single_shift_person.shift_counts
+    wednesday_noon = complete_shift_group.get_shift("Wednesday", "Noon")
+    assert pipeline.check(single_shift_person, wednesday_noon) == (False, "Maximum shifts reached")
+
+def test_conflict_graph_matches_group_checks(complete_shift_group, single_shift_person):
+    """The precomputed conflict masks must agree with the group's slot-by-slot checks"""
+    group = complete_shift_group
+    single_shift_person.blocked_shifts = {}
+    group.add_person(single_shift_person)
+    group.compile_constraints()
+
+    for assigned in group.shifts:
+        single_shift_person.assign_to_shift(assigned)
+        for shift in group.shifts:
+            if shift is assigned:
+                continue
+            expected = (
+                group.is_morning_after_night(single_shift_person, shift)
+                or group.is_noon_after_night(single_shift_person, shift)
+                or group.is_consecutive_shift(single_shift_person, shift)
+                or group.is_night_after_evening(single_shift_person, shift)
+            )
+            conflicts = single_shift_person.assigned_mask & single_shift_person.conflict_masks[shift.slot]
+            assert bool(conflicts) == expected, (assigned.key, shift.key)
+        single_shift_person.unassign_from_shift(assigned)
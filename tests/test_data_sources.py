@@ -0,0 +1,66 @@
+import pytest
+from app.google_sheets import data_sources
+from app.google_sheets.data_sources import (
+    SheetDataSource, RecordingSource, ReplaySource, create_data_source, set_data_source, snapshot_path
+)
+from app.google_sheets.import_sheet_data import get_fresh_data
+from app.google_sheets.sheet_cache import SHEET_CACHE
+
+SHEETS = {
+    "Needed Shifts": [
+        {"Day": "Sunday", "Morning": 1, "Noon": 0, "Evening": 1, "Night": 0},
+        {"Day": "Monday", "Morning": 0, "Noon": 1, "Evening": 0, "Night": 0},
+    ],
+    "People 15/01": [
+        {"Name": "Alice", "Double Shifts?": "TRUE", "3 Shift Days?": "FALSE", "Night + Noon": "FALSE",
+         "Max Shifts": 3, "Max Nights": 1, "Sunday Morning": "FALSE", "Monday Noon": "TRUE"},
+        {"Name": "Bob", "Double Shifts?": "FALSE", "3 Shift Days?": "FALSE", "Night + Noon": "TRUE",
+         "Max Shifts": 2, "Max Nights": 0, "Sunday Morning": "TRUE", "Monday Noon": "TRUE"},
+    ],
+}
+
+
+class FakeSheets(SheetDataSource):
+    def __init__(self):
+        self.calls = 0
+
+    def get_records(self, sheet_name, tab_name):
+        self.calls += 1
+        return SHEETS[tab_name]
+
+
+@pytest.fixture(autouse=True)
+def reset_data_source():
+    yield
+    set_data_source(None)
+    SHEET_CACHE.clear()
+
+def test_record_then_replay(tmp_path):
+    fake = FakeSheets()
+    set_data_source(RecordingSource(fake, str(tmp_path)))
+    recorded = get_fresh_data(people_sheet_name="People 15/01")
+    assert fake.calls == 2
+    assert (tmp_path / "Shifts" / "People 15%2F01.json").exists()
+
+    set_data_source(ReplaySource(str(tmp_path)))
+    replayed = get_fresh_data(people_sheet_name="People 15/01")
+
+    assert [(s.shift_day, s.shift_time, s.needed) for s in replayed.shifts] == \
+           [(s.shift_day, s.shift_time, s.needed) for s in recorded.shifts]
+    assert [p.name for p in replayed.people] == ["Alice", "Bob"]
+    assert replayed.people[0].blocked_shifts == {("Sunday", "Morning"): True}
+    assert fake.calls == 2
+
+def test_replay_without_snapshot(tmp_path):
+    with pytest.raises(FileNotFoundError, match="SHEETS_SOURCE=record"):
+        ReplaySource(str(tmp_path)).get_records("Shifts", "Needed Shifts")
+
+def test_source_selected_by_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHEETS_SOURCE", "replay")
+    monkeypatch.setenv("SHEETS_SNAPSHOT_DIR", str(tmp_path))
+    source = data_sources.get_data_source()
+    assert isinstance(source, ReplaySource) and source.snapshot_dir == str(tmp_path)
+    assert snapshot_path(str(tmp_path), "Shifts", "Needed Shifts").endswith("Needed Shifts.json")
+
+    with pytest.raises(ValueError, match="Unknown sheets source"):
+        create_data_source("cloud")
@@ -0,0 +1,108 @@
+import pytest
+from app.scheduler.person import Person
+from app.scheduler.shift import Shift
+from app.scheduler.shift_group import ShiftGroup
+
+
+def make_person(name, **overrides):
+    args = {
+        'blocked_shifts': {},
+        'double_shift': False,
+        'max_shifts': 5,
+        'max_nights': 2,
+        'are_three_shifts_possible': False,
+        'night_and_noon_possible': False
+    }
+    args.update(overrides)
+    return Person(name, **args)
+
+def full_recount(person, group):
+    """Count eligible unstaffed shifts the slow way, per constraint score type"""
+    counts = {'regular': 0, 'night': 0, 'weekend': 0}
+    for shift in group.shifts:
+        if not shift.is_staffed and person.is_eligible_for_shift(shift):
+            for score_type in shift.constraint_score_types:
+                counts[score_type] += 1
+    return counts
+
+@pytest.fixture
+def small_group():
+    group = ShiftGroup()
+    for day, time in [("Sunday", "Morning"), ("Sunday", "Noon"), ("Sunday", "Night"),
+                      ("Monday", "Morning"), ("Friday", "Night"), ("Saturday", "Morning")]:
+        Shift(day, time, group=group, needed=1)
+    for name in ["A", "B", "C"]:
+        group.add_person(make_person(name))
+    return group
+
+def test_counts_follow_assignments(small_group):
+    """Cached counts must match a full recount after every assignment and unassignment"""
+    a, b, c = small_group.people
+    for person in small_group.people:
+        person.calculate_constraint_score(small_group)
+
+    sunday_night = small_group.get_shift("Sunday", "Night")
+    a.assign_to_shift(sunday_night)
+    for person in small_group.people:
+        assert small_group.eligibility.get_eligible_counts(person) == full_recount(person, small_group)
+
+    b.assign_to_shift(small_group.get_shift("Saturday", "Morning"))
+    a.unassign_from_shift(sunday_night)
+    for person in small_group.people:
+        assert small_group.eligibility.get_eligible_counts(person) == full_recount(person, small_group)
+
+def test_only_assigned_people_are_recounted(small_group):
+    """Staffing a shift adjusts clean people in place instead of recounting them"""
+    a, b, c = small_group.people
+    for person in small_group.people:
+        person.calculate_constraint_score(small_group)
+    counts_b = small_group.eligibility.get_eligible_counts(b)
+
+    a.assign_to_shift(small_group.get_shift("Sunday", "Morning"))
+
+    # Same dict object, adjusted by one regular shift
+    assert small_group.eligibility.get_eligible_counts(b) is counts_b
+    assert counts_b['regular'] == 2
+    assert b.calculate_constraint_score(small_group)['regular'] == 2 / 3
+
+def test_weekend_night_counts_for_both_scores(small_group):
+    person = small_group.people[0]
+    counts = small_group.eligibility.get_eligible_counts(person)
+    assert counts == {'regular': 3, 'night': 2, 'weekend': 2}
+
+def full_supply_and_demand(group):
+    """Recompute needed and eligible capacity per remaining shift type the slow way"""
+    needed, capacity = {}, {}
+    for shift in group.shifts:
+        if shift.is_staffed:
+            continue
+        shift_type = shift.shift_type
+        needed[shift_type] = needed.get(shift_type, 0) + shift.needed
+        capacity[shift_type] = capacity.get(shift_type, 0) + sum(
+            p.get_capacity_by_type(shift_type) for p in group.people if p.is_eligible_for_shift(shift)
+        )
+    return needed, capacity
+
+def test_supply_and_demand_totals_follow_assignments(small_group):
+    """Running per-type totals must match a full recount as the search assigns and backtracks"""
+    a, b, c = small_group.people
+
+    def assert_totals_match():
+        needed, capacity = full_supply_and_demand(small_group)
+        assert small_group.get_needed_by_type() == needed
+        for shift_type in needed:
+            assert small_group.get_eligible_capacity_by_type(shift_type) == capacity[shift_type]
+
+    assert_totals_match()
+    a.assign_to_shift(small_group.get_shift("Sunday", "Night"))
+    assert_totals_match()
+    b.assign_to_shift(small_group.get_shift("Friday", "Night"))
+    c.assign_to_shift(small_group.get_shift("Sunday", "Morning"))
+    assert_totals_match()
+    b.unassign_from_shift(small_group.get_shift("Friday", "Night"))
+    assert_totals_match()
+
+def test_demand_follows_needed_changes(small_group):
+    small_group.get_shift("Sunday", "Morning").needed = 3
+    assert small_group.get_needed_by_type()['regular'] == 5
+    assert set(small_group.get_remaining_shift_types()) == {'regular', 'night', 'weekend'}
@@ -0,0 +1,13 @@
+from benchmarks.import_time import LAZY_MODULES, check_imports, measure_imports
+
+
+def test_worker_starts_without_heavy_imports():
+    report = check_imports('wsgi', max_seconds=30)
+    assert report['failures'] == []
+    assert report['slowest'][0]['module'] == 'wsgi'
+
+def test_solver_imports_are_measured():
+    timings = measure_imports('app.scheduler.shifts_algo')
+    assert 'numpy' in timings
+    assert 'gspread' not in timings and 'pandas' not in timings
+    assert 'app.scheduler.shifts_algo' in LAZY_MODULES
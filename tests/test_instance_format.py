@@ -0,0 +1,79 @@
+import json
+import pytest
+from app.scheduler.instance_format import (
+    InstanceArchive, write_archive, instance_to_dict, instance_from_dict, main
+)
+from app.scheduler.preferences import PreferenceModel
+from app.scheduler.shifts_algo import run_shift_algorithm
+from app.scheduler.synthetic import generate_shift_group
+
+
+def describe(shift_group):
+    return (
+        [(shift.shift_day, shift.shift_time, shift.needed) for shift in shift_group.shifts],
+        [(p.name, p.blocked_mask, p.double_shift, p.max_shifts, p.max_nights,
+          p.are_three_shifts_possible, p.night_and_noon_possible, p.max_weekend_shifts)
+         for p in shift_group.people],
+    )
+
+@pytest.fixture
+def preferences():
+    return PreferenceModel.from_dict({
+        "pair_affinities": [{"pair": ["Person 1", "Person 2"], "weight": 10}],
+        "shift_preferences": [{"person": "Person 3", "shift": "Friday Night", "weight": -5}],
+        "fairness_weights": {"night": 0.5},
+    })
+
+def test_archive_round_trip(tmp_path, preferences):
+    path = str(tmp_path / "weeks.shia")
+    groups = [generate_shift_group(seed, people=10) for seed in range(3)]
+    write_archive(path, [("week 0", groups[0], preferences), ("week 1", groups[1], None), ("", groups[2], None)])
+
+    with InstanceArchive(path) as archive:
+        assert len(archive) == 3
+        assert [instance.label for instance in archive] == ["week 0", "week 1", ""]
+        for i, original in enumerate(groups):
+            loaded, model = archive.load(i)
+            assert describe(loaded) == describe(original)
+            assert loaded.constraints is not None
+        _, model = archive.load(0)
+        assert model.to_dict() == preferences.to_dict()
+        assert archive.load(1)[1] is None
+
+def test_loaded_instance_solves_like_the_original(tmp_path):
+    path = str(tmp_path / "week.shia")
+    write_archive(path, [("week", generate_shift_group(5, people=12), None)])
+    with InstanceArchive(path) as archive:
+        loaded, _ = archive.load(0)
+
+    expected = run_shift_algorithm(generate_shift_group(5, people=12), timeout=10)
+    assert run_shift_algorithm(loaded, timeout=10)[:4] == expected[:4]
+
+def test_unknown_preference_names_are_kept(tmp_path):
+    path = str(tmp_path / "week.shia")
+    model = PreferenceModel.from_target_pairs([{'pair': {"Someone", "Person 1"}, 'weight': 3}])
+    write_archive(path, [("week", generate_shift_group(1, people=4), model)])
+    with InstanceArchive(path) as archive:
+        instance = archive[0]
+        assert instance.names[-1] == "Someone"
+        loaded_model = archive.load(0)[1]
+    assert not loaded_model.strict
+    assert loaded_model.pair_affinities == model.pair_affinities
+
+def test_json_convert_and_info(tmp_path, preferences, capsys):
+    original = generate_shift_group(2, people=6)
+    json_path = tmp_path / "week.json"
+    json_path.write_text(json.dumps(instance_to_dict(original, preferences, label="week 2")))
+    label, shift_group, model = instance_from_dict(json.loads(json_path.read_text()))
+    assert label == "week 2" and describe(shift_group) == describe(original)
+
+    archive_path = str(tmp_path / "weeks.shia")
+    main(["convert", archive_path, str(json_path)])
+    main(["info", archive_path])
+    assert "0: week 2  people=6" in capsys.readouterr().out
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.shia"
+    path.write_bytes(b"not an archive")
+    with pytest.raises(ValueError, match="Not an instance archive"):
+        InstanceArchive(str(path))
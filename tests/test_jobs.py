@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+import pytest
+from app import create_app
+from app.jobs import JobManager, QueueFullError, CANCELLED, DONE, FAILED
+from app.routes import main
+from app.scheduler.metrics import REGISTRY
+from app.scheduler.shifts_algo import run_shift_algorithm
+from app.scheduler.synthetic import generate_shift_group
+
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.is_finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.is_finished
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, max_queued=1)
+    yield manager
+    manager.shutdown()
+
+def test_job_result(manager):
+    def run(job):
+        job.stage = 'solving'
+        job.stats.nodes = 3
+        return {'success': True}
+
+    job = manager.submit(run)
+    wait_until_finished(job)
+    assert manager.get(job.id) is job
+    assert job.to_dict()['status'] == DONE
+    assert job.to_dict()['result'] == {'success': True}
+    assert job.to_dict()['progress']['stage'] == 'solving'
+    assert job.to_dict()['progress']['nodes'] == 3
+
+def test_failed_job(manager):
+    def run(job):
+        raise RuntimeError("no sheet")
+
+    job = manager.submit(run)
+    wait_until_finished(job)
+    assert job.status == FAILED and job.error == "no sheet"
+
+def test_queue_is_bounded_and_queued_job_can_be_cancelled(manager):
+    release = threading.Event()
+    started = []
+
+    def run(job):
+        started.append(job.id)
+        release.wait(5)
+        return {}
+
+    running = manager.submit(run)
+    queued = manager.submit(run)
+    with pytest.raises(QueueFullError):
+        manager.submit(run)
+
+    assert manager.cancel(queued.id).status == CANCELLED
+    release.set()
+    wait_until_finished(running)
+    manager.shutdown()  # Waits for the cancelled job to be skipped
+    assert started == [running.id]
+    assert queued.status == CANCELLED
+
+def test_unknown_job(manager):
+    assert manager.get("missing") is None
+    assert manager.cancel("missing") is None
+
+def test_cancel_running_solve():
+    # A long search that fails, so only the cancellation can end it quickly
+    shift_group = generate_shift_group(seed=1, people=8, needs_profile='weekend_heavy', tightness=0.55)
+    cancel_event = threading.Event()
+    threading.Timer(0.05, cancel_event.set).start()
+    cancelled_before = REGISTRY.solves['cancelled']
+
+    success, _, reason, _, _ = run_shift_algorithm(shift_group, timeout=30, cancel_event=cancel_event)
+    assert not success
+    assert reason == "Algorithm cancelled"
+    assert REGISTRY.solves['cancelled'] == cancelled_before + 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    release = threading.Event()
+
+    def solve_schedule(data, stats, prefetcher=None, cancel_event=None, set_stage=None, progress=None):
+        set_stage('solving')
+        release.wait(5)
+        if cancel_event.is_set():
+            return {'success': False, 'reason': "Algorithm cancelled"}
+        return {'success': True, 'max_weekend': data['max_weekend']}
+
+    monkeypatch.setattr(main, 'solve_schedule', solve_schedule)
+    app = create_app()
+    yield app.test_client(), release
+    release.set()
+    app.extensions['job_manager'].shutdown()
+
+def poll(client, location):
+    deadline = time.monotonic() + 5
+    while True:
+        job = client.get(location).get_json()
+        if job['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+def test_job_endpoints(client):
+    client, release = client
+    response = client.post('/jobs', json={'max_weekend': 2})
+    assert response.status_code == 202
+    location = response.headers['Location']
+    assert location.endswith(f"/jobs/{response.get_json()['job_id']}")
+
+    release.set()
+    job = poll(client, location)
+    assert job['status'] == 'done'
+    assert job['result'] == {'success': True, 'max_weekend': 2}
+
+def test_cancel_endpoint(client):
+    client, release = client
+    location = client.post('/jobs', json={}).headers['Location']
+    assert client.delete(location).status_code == 200
+    release.set()
+    assert poll(client, location)['status'] == 'cancelled'
+
+    assert client.get('/jobs/missing').status_code == 404
+    assert client.delete('/jobs/missing').status_code == 404
+
+def test_job_events(client):
+    client, release = client
+    location = client.post('/jobs', json={'max_weekend': 1}).headers['Location']
+    release.set()
+
+    response = client.get(f"{location}/events")
+    assert response.mimetype == 'text/event-stream'
+    events = [
+        dict(line.split(': ', 1) for line in block.splitlines())
+        for block in response.get_data(as_text=True).strip().split('\n\n')
+    ]
+    assert [event['event'] for event in events] == ['stage', 'done']
+    assert json.loads(events[-1]['data'])['result'] == {'success': True, 'max_weekend': 1}
+
+    # Reconnecting after the end returns right away
+    assert client.get(f"{location}/events", headers={'Last-Event-ID': events[-1]['id']}).get_data() == b""
+
+def test_timed_out_job_is_done(monkeypatch):
+    # The solver sets the job's cancel_event when it times out; that is not a cancellation
+    class Prefetcher:
+        def get_shift_group(self, max_weekend):
+            return generate_shift_group(seed=1, people=8, needs_profile='weekend_heavy', tightness=0.55)
+
+    monkeypatch.setattr(main, 'TIMEOUT_SECONDS', 0.01)
+    app = create_app()
+    app.extensions['sheet_prefetcher'] = Prefetcher()
+    client = app.test_client()
+    try:
+        job = poll(client, client.post('/jobs', json={}).headers['Location'])
+    finally:
+        app.extensions['job_manager'].shutdown()
+
+    assert job['status'] == 'done'
+    assert job['result'] == {'success': False, 'reason': "Algorithm timed out"}
+
+def test_malformed_last_event_id(client):
+    client, release = client
+    location = client.post('/jobs', json={'max_weekend': 1}).headers['Location']
+    release.set()
+    response = client.get(f"{location}/events", headers={'Last-Event-ID': "not-a-number"})
+    assert response.status_code == 200
+    assert "event: done" in response.get_data(as_text=True)
@@ -0,0 +1,78 @@
+import pytest
+from app import create_app
+from app.scheduler.metrics import MetricsRegistry, SolveStats, REGISTRY, format_profile
+from app.scheduler.person import Person
+from app.scheduler.shift import Shift
+from app.scheduler.shift_group import ShiftGroup
+from app.scheduler.shifts_algo import run_shift_algorithm
+
+
+def test_solve_stats_merge_and_render():
+    registry = MetricsRegistry()
+    stats = SolveStats()
+    stats.nodes = 5
+    stats.add_backtrack(1)
+    stats.add_backtrack(1)
+    stats.prunes['validation_failed'] = 2
+    stats.combos_generated, stats.combos_tried = 10, 4
+    stats.phase_ns['search'] = 500_000_000
+
+    registry.record_solve(stats, 'infeasible', 0.2)
+    registry.record_solve(SolveStats(), 'success', 3.0)
+    text = registry.render_prometheus()
+
+    assert 'shifts_solver_solves_total{outcome="infeasible"} 1' in text
+    assert 'shifts_solver_nodes_total 5' in text
+    assert 'shifts_solver_backtracks_total{depth="1"} 2' in text
+    assert 'shifts_solver_prunes_total{reason="validation_failed"} 2' in text
+    assert 'shifts_solver_combos_generated_total 10' in text
+    assert 'shifts_solver_phase_seconds_total{phase="search"} 0.5' in text
+    assert 'shifts_solver_solve_duration_seconds_bucket{outcome="infeasible",le="0.1"} 0' in text
+    assert 'shifts_solver_solve_duration_seconds_bucket{outcome="infeasible",le="0.25"} 1' in text
+    assert 'shifts_solver_solve_duration_seconds_bucket{outcome="success",le="+Inf"} 1' in text
+    assert 'shifts_solver_solve_duration_seconds_count{outcome="success"} 1' in text
+
+def test_unknown_outcome_rejected():
+    with pytest.raises(ValueError, match="Unknown solve outcome"):
+        MetricsRegistry().record_solve(SolveStats(), 'maybe', 1.0)
+
+def test_solve_is_recorded():
+    group = ShiftGroup()
+    Shift("Sunday", "Morning", group=group, needed=1)
+    Shift("Sunday", "Evening", group=group, needed=1)
+    group.add_person(Person("A", {}, double_shift=False, max_shifts=5, max_nights=2,
+                            are_three_shifts_possible=False, night_and_noon_possible=False))
+    before_success = REGISTRY.solves['success']
+    before_tried = REGISTRY.combos_tried
+
+    success, *_ = run_shift_algorithm(group, timeout=5)
+
+    assert success
+    assert REGISTRY.solves['success'] == before_success + 1
+    assert REGISTRY.combos_tried == before_tried + 2
+    assert {'compile', 'rank_shifts', 'search'} <= set(REGISTRY.phase_seconds)
+
+def test_phase_breakdown_and_cprofile():
+    group = ShiftGroup()
+    for time in ["Morning", "Evening"]:
+        Shift("Monday", time, group=group, needed=1)
+    for name in ["A", "B"]:
+        group.add_person(Person(name, {}, double_shift=False, max_shifts=5, max_nights=2,
+                                are_three_shifts_possible=False, night_and_noon_possible=False))
+    stats = SolveStats()
+
+    success, *_ = run_shift_algorithm(group, timeout=5, stats=stats, profile=True)
+
+    assert success
+    phases = stats.get_phase_breakdown()
+    assert {'compile', 'rank_shifts', 'eligibility', 'validate', 'combo_generation', 'combo_sort', 'search'} <= set(phases)
+    assert phases['eligibility']['calls'] == 2
+    assert phases['search']['ms'] >= phases['validate']['ms']
+    assert 'backtrack_assign' in format_profile(stats.profile)
+
+def test_metrics_endpoint():
+    client = create_app().test_client()
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert '# TYPE shifts_solver_solve_duration_seconds histogram' in response.get_data(as_text=True)
@@ -270,4 +270,31 @@ def test_calculate_constraint_score(sample_person):
     sample_person.assign_to_shift(Shift("Tuesday", "Morning", group=group))
     scores = sample_person.calculate_constraint_score(group)
     assert scores['regular'] == float('inf')  # No more regular capacity
-   
\ No newline at end of file
+   
+def test_blocked_shifts_bitmask(sample_person):
+    """Blocked shifts are stored as a slot bitmask and read back as a dict"""
+    assert sample_person.blocked_mask.bit_count() == 8
+    assert sample_person.blocked_shifts[("Monday", "Noon")] is True
+    assert ("Monday", "Morning") not in sample_person.blocked_shifts
+
+    # A ready-made bitmask is accepted as is
+    copy = Person("Copy", blocked_shifts=sample_person.blocked_mask, double_shift=False,
+                  max_shifts=5, max_nights=2, are_three_shifts_possible=False,
+                  night_and_noon_possible=True)
+    assert copy.blocked_shifts == sample_person.blocked_shifts
+
+    with pytest.raises(ValueError, match="Invalid blocked shift"):
+        sample_person.blocked_shifts = {("Funday", "Morning"): True}
+
+def test_person_is_slotted(sample_person):
+    assert not hasattr(sample_person, '__dict__')
+    with pytest.raises(AttributeError):
+        sample_person.unknown_attribute = 1
+
+def test_assigned_mask_follows_assignments(sample_person, complete_shift_group):
+    shift = complete_shift_group.get_shift("Sunday", "Noon")
+    sample_person.assign_to_shift(shift)
+    assert sample_person.is_shift_assigned(shift)
+    assert complete_shift_group.count_shifts_in_day(sample_person, "Sunday") == 1
+    sample_person.unassign_from_shift(shift)
+    assert sample_person.assigned_mask == 0
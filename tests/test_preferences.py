@@ -0,0 +1,106 @@
+import json
+import pytest
+from app.scheduler.combo_manager import ComboManager
+from app.scheduler.person import Person
+from app.scheduler.preferences import PreferenceModel
+from app.scheduler.shift import Shift, SLOT_IDS
+from app.scheduler.shift_group import ShiftGroup
+
+
+@pytest.fixture
+def preference_group():
+    group = ShiftGroup()
+    Shift("Friday", "Night", group=group, needed=1)
+    Shift("Sunday", "Morning", group=group, needed=2)
+    for name in ["Dana", "Eli", "Gal"]:
+        person = Person(name, {}, double_shift=False, max_shifts=5, max_nights=2,
+                        are_three_shifts_possible=False, night_and_noon_possible=False)
+        person.constraint_scores = {'regular': 1.0, 'night': 1.0, 'weekend': 1.0}
+        group.add_person(person)
+    return group
+
+def test_from_dict_and_json_file(tmp_path):
+    data = {
+        "pair_affinities": [{"pair": ["Dana", "Eli"], "weight": 4}],
+        "shift_preferences": [{"person": "Gal", "shift": "friday night", "weight": "-2"}],
+        "fairness_weights": {"night": 0.5}
+    }
+    path = tmp_path / "preferences.json"
+    path.write_text(json.dumps(data))
+
+    for model in [PreferenceModel.from_dict(data), PreferenceModel.from_json(str(path))]:
+        assert model.pair_affinities == [("Dana", "Eli", 4.0)]
+        assert model.shift_preferences == [("Gal", ("Friday", "Night"), -2.0)]
+        assert model.fairness_weights == {'regular': 0.0, 'night': 0.5, 'weekend': 0.0}
+
+def test_from_sheet_records():
+    model = PreferenceModel.from_records([
+        {"Type": "Pair", "Person": "Dana", "Other": "Eli", "Weight": 3},
+        {"Type": "Shift", "Person": "Eli", "Other": "Sunday Morning", "Weight": 1},
+        {"Type": "Fairness", "Person": "", "Other": "Weekend", "Weight": 2},
+        {"Type": "", "Person": "", "Other": "", "Weight": ""},
+    ])
+    assert model.pair_affinities == [("Dana", "Eli", 3.0)]
+    assert model.shift_preferences == [("Eli", ("Sunday", "Morning"), 1.0)]
+    assert model.fairness_weights['weekend'] == 2.0
+
+@pytest.mark.parametrize("data, message", [
+    ({"pair_affinities": [{"pair": ["Dana"], "weight": 1}]}, "exactly two"),
+    ({"shift_preferences": [{"person": "Dana", "shift": "Funday Night", "weight": 1}]}, "Invalid shift name"),
+    ({"fairness_weights": {"late": 1}}, "Invalid fairness shift type"),
+    ({"pair_affinities": [{"pair": ["Dana", "Eli"], "weight": "a lot"}]}, "Invalid weight"),
+    ({"favourites": []}, "Unknown preference sections"),
+])
+def test_invalid_preferences_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        PreferenceModel.from_dict(data)
+
+def test_unknown_names_rejected_at_compile(preference_group):
+    model = PreferenceModel.from_dict({"pair_affinities": [{"pair": ["Dana", "Nobody"], "weight": 1}]})
+    with pytest.raises(ValueError, match="Unknown people in preferences: \\['Nobody'\\]"):
+        ComboManager(model).compile_preferences(preference_group.people)
+
+    # The legacy TARGET_PAIRS model refers to people that may not be in the sheet
+    ComboManager().compile_preferences(preference_group.people)
+
+def test_compiled_tables_are_index_based(preference_group):
+    dana, eli, gal = preference_group.people
+    model = PreferenceModel(
+        pair_affinities=[("Dana", "Gal", 5)],
+        shift_preferences=[("Eli", ("Friday", "Night"), 2)]
+    )
+    compiled = model.compile(preference_group.people)
+
+    assert compiled.pair_weights[0, 2] == compiled.pair_weights[2, 0] == 5
+    assert compiled.pair_weights.sum() == 10
+    assert compiled.shift_weights[1, SLOT_IDS[("Friday", "Night")]] == 2
+    assert compiled.index[id(gal)] == 2
+
+def test_preferences_change_combo_order(preference_group):
+    dana, eli, gal = preference_group.people
+    friday_night = preference_group.get_shift("Friday", "Night")
+    sunday_morning = preference_group.get_shift("Sunday", "Morning")
+
+    model = PreferenceModel(
+        pair_affinities=[("Eli", "Gal", 5)],
+        shift_preferences=[("Gal", ("Friday", "Night"), 1)]
+    )
+    combo_manager = ComboManager(model)
+    combo_manager.compile_preferences(preference_group.people)
+
+    combos = list(combo_manager.iter_sorted_combinations(preference_group.people, 1, friday_night, preference_group))
+    assert combos[0] == [gal]
+    combos = list(combo_manager.iter_sorted_combinations(preference_group.people, 2, sunday_morning, preference_group))
+    assert combos[0] == [eli, gal]
+
+def test_fairness_weight_prefers_people_with_fewer_nights(preference_group):
+    dana, eli, gal = preference_group.people
+    dana.night_counts = 1
+    dana.shift_counts = 1
+    friday_night = preference_group.get_shift("Friday", "Night")
+
+    combo_manager = ComboManager(PreferenceModel(fairness_weights={'night': 1.0}))
+    combo_manager.compile_preferences(preference_group.people)
+    combos = list(combo_manager.iter_sorted_combinations(preference_group.people, 1, friday_night, preference_group))
+
+    assert combos[-1] == [dana]
@@ -0,0 +1,109 @@
+import threading
+import time
+import pytest
+from app.google_sheets.data_sources import set_data_source
+from app.google_sheets.import_sheet_data import get_fresh_data
+from app.google_sheets.prefetcher import SheetPrefetcher
+from app.google_sheets.sheet_cache import SHEET_CACHE
+from tests.test_sheet_cache import VersionedSheets
+
+
+@pytest.fixture
+def sheets():
+    source = VersionedSheets()
+    set_data_source(source)
+    SHEET_CACHE.clear()
+    yield source
+    set_data_source(None)
+    SHEET_CACHE.clear()
+
+def make_prefetcher(**kwargs):
+    return SheetPrefetcher(people_tab="People 15/01", **kwargs)
+
+def test_nothing_before_the_first_load(sheets):
+    prefetcher = make_prefetcher()
+    assert prefetcher.get_shift_group() is None
+    assert sheets.calls == 0
+
+def test_prefetched_groups(sheets):
+    prefetcher = make_prefetcher()
+    assert prefetcher.refresh()
+    prefetcher._build_spares()
+    assert sheets.calls == 2
+
+    first = prefetcher.get_shift_group()  # The spare built in the background
+    second = prefetcher.get_shift_group()  # Built from the parsed data
+    assert first is not second and first.people[0] is not second.people[0]
+    assert [p.name for p in first.people] == ["Alice", "Bob"]
+    assert [(s.shift_day, s.shift_time, s.needed) for s in first.shifts] == \
+           [(s.shift_day, s.shift_time, s.needed) for s in second.shifts]
+    assert sheets.calls == 2
+
+def test_warms_the_sheet_cache(sheets):
+    make_prefetcher().refresh()
+    get_fresh_data(people_sheet_name="People 15/01")
+    assert sheets.calls == 2
+
+def test_read_again_only_when_revision_changes(sheets):
+    prefetcher = make_prefetcher()
+    prefetcher.refresh()
+    assert not prefetcher.refresh()
+    assert sheets.calls == 2
+
+    sheets.revision = "2"
+    assert prefetcher.refresh()
+    assert sheets.calls == 4
+    assert prefetcher.get_stats()['refreshes'] == 2
+
+def test_new_max_weekend_is_loaded(sheets):
+    prefetcher = make_prefetcher()
+    prefetcher.refresh()
+    assert prefetcher.get_shift_group(2) is None  # Unknown until the next refresh
+    assert prefetcher.refresh()
+    assert prefetcher.get_shift_group(2).people[0].max_weekend_shifts == 2
+
+def test_background_thread(sheets):
+    loaded = threading.Event()
+    prefetcher = make_prefetcher(interval=60)
+    original = prefetcher._build_spares
+
+    def build_spares():
+        original()
+        loaded.set()
+
+    prefetcher._build_spares = build_spares
+    prefetcher.start()
+    try:
+        assert loaded.wait(5)
+        assert prefetcher.get_shift_group() is not None
+
+        # Several requests while the thread is busy make a single refresh
+        sheets.revision = "2"
+        for _ in range(3):
+            prefetcher.refresh_now()
+        deadline = time.monotonic() + 5
+        while prefetcher.get_stats()['refreshes'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        prefetcher.stop(timeout=5)
+
+    assert prefetcher.get_stats()['refreshes'] == 2
+    assert sheets.calls == 4
+
+def test_errors_are_kept(sheets, monkeypatch):
+    def fail(sheet_name):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(sheets, 'get_revision', fail)
+    loaded = threading.Event()
+    prefetcher = make_prefetcher(interval=60)
+    prefetcher._build_spares = loaded.set
+    prefetcher.start()
+    try:
+        assert loaded.wait(5)
+    finally:
+        prefetcher.stop(timeout=5)
+
+    stats = prefetcher.get_stats()
+    assert stats['errors'] == 1 and stats['last_error'] == "offline"
+    assert prefetcher.get_shift_group() is None
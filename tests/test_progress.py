@@ -0,0 +1,47 @@
+import threading
+from app.scheduler.metrics import SolveStats
+from app.scheduler.progress import ProgressReporter
+from app.scheduler.shifts_algo import run_shift_algorithm
+from app.scheduler.synthetic import generate_shift_group
+
+
+def test_samples_are_throttled(synthetic_shift_group):
+    progress = ProgressReporter(interval=3600)
+    stats = SolveStats()
+    for depth in range(5):
+        stats.nodes += 1
+        progress.on_node(depth, synthetic_shift_group, stats)
+
+    events = progress.read()
+    assert [kind for _, kind, _ in events] == ['progress']  # Only the first node was sampled
+    assert events[0][2]['nodes'] == 1
+    assert events[0][2]['best_assignment'] == {}
+
+def test_buffer_drops_oldest():
+    progress = ProgressReporter(buffer_size=2)
+    for stage in ('a', 'b', 'c'):
+        progress.publish('stage', {'stage': stage})
+    assert [(sequence, data['stage']) for sequence, _, data in progress.read()] == [(2, 'b'), (3, 'c')]
+    assert progress.read(after=2)[0][0] == 3
+
+def test_close_wakes_readers():
+    progress = ProgressReporter()
+    threading.Timer(0.05, progress.close).start()
+    assert progress.read(timeout=5) == []
+    assert progress.closed
+
+def test_solver_reports_progress():
+    shift_group = generate_shift_group(seed=1, people=8, tightness=0.55)
+    progress = ProgressReporter(interval=0)
+    success, assignments, _, _, _ = run_shift_algorithm(shift_group, timeout=30, progress=progress)
+    assert success
+
+    samples = [data for _, kind, data in progress.read()]
+    assert samples and all(sample['shifts_total'] == len(shift_group.shifts) for sample in samples)
+    final = samples[-1]
+    assert final['max_depth'] == final['shifts_staffed'] == len(shift_group.shifts)
+    # The deepest partial assignment is the solution
+    assert final['best_assignment'] == {
+        day: {time: names for time, names in day_assignments.items() if names}
+        for day, day_assignments in assignments.items() if any(day_assignments.values())
+    }
@@ -0,0 +1,104 @@
+import pytest
+from app.routes import main
+from app.scheduler.flag_manager import FlagManager
+from app.scheduler.preferences import PreferenceModel
+from app.scheduler.metrics import SolveStats
+from app.scheduler.result_cache import RESULT_CACHE, ResultCache, problem_key
+from app.scheduler.synthetic import generate_shift_group
+
+
+def test_key_is_stable_and_covers_the_problem():
+    key = problem_key(generate_shift_group(seed=1))
+    assert key == problem_key(generate_shift_group(seed=1))
+    assert key != problem_key(generate_shift_group(seed=2))
+
+    shift_group = generate_shift_group(seed=1)
+    shift_group.people[0].max_shifts += 1
+    assert problem_key(shift_group) != key
+
+    shift_group = generate_shift_group(seed=1)
+    names = [person.name for person in shift_group.people]
+    assert problem_key(shift_group, PreferenceModel(pair_affinities=[(names[0], names[1], 2.0)])) != key
+
+    flag_manager = FlagManager()
+    assert problem_key(shift_group, flag_manager=flag_manager) != key
+    flag_manager.set_constraint('enforce_night_noon', True)
+    assert problem_key(shift_group, flag_manager=flag_manager) != problem_key(shift_group, flag_manager=FlagManager())
+
+    assert problem_key(shift_group, options={'max_depth': 10}) != key
+
+def test_lru():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', {'success': True})
+    cache.put('b', {'success': False})
+    assert cache.get('a') == {'success': True}  # Now the most recently used
+    cache.put('c', {'success': True})
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.get_stats() == {'entries': 2, 'hits': 3, 'disk_hits': 0, 'misses': 1}
+
+def test_results_are_copies():
+    cache = ResultCache()
+    cache.put('a', {'assignments': {'Sunday': {}}})
+    cache.get('a')['assignments']['Sunday']['Morning'] = ["Alice"]
+    assert cache.get('a') == {'assignments': {'Sunday': {}}}
+
+def test_disk_tier_is_shared(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    ResultCache(path=path).put('a', {'success': True})
+
+    other_worker = ResultCache(path=path)
+    assert other_worker.get('a') == {'success': True}
+    assert other_worker.get('a') == {'success': True}
+    assert other_worker.get_stats()['disk_hits'] == 1  # Then kept in memory
+
+    other_worker.clear()
+    assert ResultCache(path=path).get('a') is None
+
+def test_unusable_disk_tier(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "missing" / "results.sqlite"))
+    assert cache.path is None
+    cache.put('a', {'success': True})
+    assert cache.get('a') == {'success': True}
+
+
+class FakePrefetcher:
+    def __init__(self, **instance):
+        self.instance = instance
+
+    def get_shift_group(self, max_weekend):
+        return generate_shift_group(**self.instance)
+
+@pytest.fixture
+def result_cache():
+    RESULT_CACHE.clear()
+    yield RESULT_CACHE
+    RESULT_CACHE.clear()
+
+def solve(prefetcher, **data):
+    stats = SolveStats()
+    return main.solve_schedule(data, stats, prefetcher=prefetcher), stats
+
+def test_solutions_and_infeasibility_are_cached(result_cache):
+    for instance in (dict(seed=1, people=8, tightness=0.55),
+                     dict(seed=1, people=8, needs_profile='weekend_heavy', tightness=0.55)):
+        prefetcher = FakePrefetcher(**instance)
+        first, stats = solve(prefetcher)
+        assert stats.outcome in ('success', 'infeasible')
+        second, stats = solve(prefetcher)
+        assert stats.nodes == 0  # Not solved again
+        assert second == dict(first, cached=True)
+
+def test_timeouts_are_not_cached(result_cache, monkeypatch):
+    monkeypatch.setattr(main, 'TIMEOUT_SECONDS', 0.01)
+    prefetcher = FakePrefetcher(seed=1, people=8, needs_profile='weekend_heavy', tightness=0.55)
+    result, stats = solve(prefetcher)
+    assert result['reason'] == "Algorithm timed out"
+    assert result_cache.get_stats()['entries'] == 0
+
+def test_profiling_solves_again(result_cache):
+    prefetcher = FakePrefetcher(seed=1, people=8, tightness=0.55)
+    solve(prefetcher)
+    result, stats = solve(prefetcher, profile=True)
+    assert stats.nodes > 0 and 'profile' in result and 'cached' not in result
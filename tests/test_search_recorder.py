@@ -0,0 +1,78 @@
+import pytest
+from app.scheduler.person import Person
+from app.scheduler.shift import Shift, SLOT_IDS
+from app.scheduler.shift_group import ShiftGroup
+from app.scheduler.shifts_algo import run_shift_algorithm
+from app.scheduler.search_recorder import (
+    SearchRecorder, read_events, NODE, COMBO, OUTCOME, END, NO_SLOT,
+    SOLVED, CHILD_FAILED, EXHAUSTED
+)
+from app.scheduler.search_replay import build_tree, branching_by_depth, backtracking_by_shift, format_report
+
+
+def test_round_trip_and_truncation(tmp_path):
+    path = str(tmp_path / "search.bin")
+    with SearchRecorder(path, max_events=3) as recorder:
+        recorder.node(0, 5, 3, 3)
+        recorder.combo(0, 5, 0)
+        recorder.outcome(1, NO_SLOT, SOLVED)
+        recorder.outcome(0, 5, EXHAUSTED)  # Over max_events, dropped
+
+    events = list(read_events(path))
+    assert [event.kind for event in events] == [NODE, COMBO, OUTCOME, END]
+    assert events[0].slot == 5 and events[0].a == 3
+    assert events[-1].a == 1 and events[-1].b == 3
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a recording")
+    with pytest.raises(ValueError, match="Not a search recording"):
+        list(read_events(str(path)))
+
+def test_build_tree_and_branching(tmp_path):
+    path = str(tmp_path / "search.bin")
+    with SearchRecorder(path) as recorder:
+        recorder.node(0, 1, 2, 2)
+        recorder.combo(0, 1, 0)
+        recorder.node(1, 2, 1, 1)
+        recorder.combo(1, 2, 0)
+        recorder.outcome(1, 2, EXHAUSTED)
+        recorder.outcome(0, 1, CHILD_FAILED)
+        recorder.combo(0, 1, 1)
+        recorder.node(1, 2, 1, 1)
+        recorder.combo(1, 2, 0)
+        recorder.node(2, 3, 1, 1)
+        recorder.combo(2, 3, 0)
+        recorder.outcome(3, NO_SLOT, SOLVED)
+
+    tree = build_tree(read_events(path))
+    assert len(tree.roots) == 1 and len(tree.nodes) == 4
+    assert len(tree.roots[0].children) == 2
+    assert tree.leaf_outcomes == {SOLVED: 1}
+
+    branching = branching_by_depth(tree)
+    assert branching[0]['branching_factor'] == 2.0
+    assert branching[0]['combos_per_node'] == 2.0
+    assert branching[1]['branching_factor'] == 0.5
+
+    worst = backtracking_by_shift(tree)[0]
+    assert worst['backtracks'] == 1 and worst['nodes'] == 1
+
+def test_solver_records_search(tmp_path):
+    group = ShiftGroup()
+    Shift("Sunday", "Morning", group=group, needed=1)
+    Shift("Sunday", "Evening", group=group, needed=1)
+    for name in ["A", "B"]:
+        group.add_person(Person(name, {}, double_shift=False, max_shifts=5, max_nights=2,
+                                are_three_shifts_possible=False, night_and_noon_possible=False))
+    path = str(tmp_path / "search.bin")
+
+    success, *_ = run_shift_algorithm(group, timeout=5, record_path=path)
+
+    assert success
+    tree = build_tree(read_events(path))
+    assert tree.leaf_outcomes == {SOLVED: 1}
+    assert not tree.truncated
+    assert [node.depth for node in tree.nodes] == [0, 1]
+    assert {node.slot for node in tree.nodes} == {SLOT_IDS[("Sunday", "Morning")], SLOT_IDS[("Sunday", "Evening")]}
+    assert "Sunday" in format_report(tree)
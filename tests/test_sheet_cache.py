@@ -0,0 +1,80 @@
+import pytest
+from app.google_sheets.data_sources import set_data_source
+from app.google_sheets.import_sheet_data import get_fresh_data
+from app.google_sheets.sheet_cache import SHEET_CACHE
+from tests.test_data_sources import FakeSheets
+
+
+class VersionedSheets(FakeSheets):
+    def __init__(self):
+        super().__init__()
+        self.revision = "1"
+        self.revision_checks = 0
+
+    def get_revision(self, sheet_name):
+        self.revision_checks += 1
+        return self.revision
+
+
+@pytest.fixture
+def sheets():
+    source = VersionedSheets()
+    set_data_source(source)
+    SHEET_CACHE.clear()
+    yield source
+    set_data_source(None)
+    SHEET_CACHE.clear()
+
+def load():
+    return get_fresh_data(people_sheet_name="People 15/01")
+
+def test_cached_within_ttl(sheets, monkeypatch):
+    monkeypatch.setattr(SHEET_CACHE, 'ttl', 300)
+    first, second = load(), load()
+
+    assert sheets.calls == 2  # Both tabs read once
+    assert sheets.revision_checks == 1  # Only when the data was read
+    assert first is not second and first.people[0] is not second.people[0]
+    assert [p.name for p in second.people] == ["Alice", "Bob"]
+
+def test_new_group_every_call(sheets):
+    first = load()
+    first.people[0].max_shifts = 99
+    first.shifts[0].needed = 7
+    second = load()
+    assert second.people[0].max_shifts == 3
+    assert second.shifts[0].needed == 1
+
+def test_revision_checked_after_ttl(sheets, monkeypatch):
+    monkeypatch.setattr(SHEET_CACHE, 'ttl', 0)
+    load()
+    load()
+    assert sheets.calls == 2  # Same revision: not read again
+    assert SHEET_CACHE.get_stats()['revalidations'] == 1
+
+    sheets.revision = "2"
+    load()
+    assert sheets.calls == 4
+
+def test_revision_read_once_per_refresh(sheets, monkeypatch):
+    monkeypatch.setattr(SHEET_CACHE, 'ttl', 0)
+    load()
+    sheets.revision = "2"
+    load()
+    assert sheets.calls == 4
+    assert sheets.revision_checks == 2  # The check that found the change is reused for the new entry
+    load()
+    assert sheets.calls == 4  # Stored at the new revision
+
+def test_unknown_revision_is_read_again(sheets, monkeypatch):
+    monkeypatch.setattr(SHEET_CACHE, 'ttl', 0)
+    sheets.revision = None
+    load()
+    load()
+    assert sheets.calls == 4
+
+def test_key_includes_max_weekend(sheets):
+    assert load().people[0].max_weekend_shifts == 1
+    assert get_fresh_data(people_sheet_name="People 15/01", max_weekend=2).people[0].max_weekend_shifts == 2
+    assert get_fresh_data(people_sheet_name="People 15/01", use_cache=False) is not None
+    assert sheets.calls == 6
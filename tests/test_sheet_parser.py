@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from app.google_sheets.sheet_parser import parse_people_rows, parse_shift_need_rows
+from app.google_sheets.import_sheet_data import parse_people_data
+from app.scheduler.shift import SLOT_IDS
+from app.scheduler.shift_group import ShiftGroup
+
+PEOPLE_ROWS = [
+    ["Name", "Double Shifts?", "3 Shift Days?", "Night + Noon", "Max Shifts", "Max Nights", "Sunday Morning", "monday noon"],
+    ["Alice", "TRUE", "FALSE", " true ", 5, 2, "FALSE", "TRUE"],
+    ["Bob", "FALSE", "TRUE", "FALSE", "3", "", "TRUE", "false"],
+]
+NEEDS_ROWS = [
+    ["Day", "Morning", "Noon", "Evening", "Night"],
+    ["Sunday", 2, 0, "", 1],
+    ["Monday", "1", None, 3, 0],
+]
+
+def as_records(rows):
+    return [dict(zip(rows[0], row)) for row in rows[1:]]
+
+def test_people_from_rows_records_and_dataframe():
+    parsed = parse_people_rows(PEOPLE_ROWS, max_weekend=2)
+    assert parse_people_rows(as_records(PEOPLE_ROWS), max_weekend=2) == parsed
+    assert parse_people_rows(pd.DataFrame(as_records(PEOPLE_ROWS)), max_weekend=2) == parsed
+
+    alice, bob = parsed
+    assert alice['blocked_shifts'] == 1 << SLOT_IDS[("Sunday", "Morning")]
+    assert bob['blocked_shifts'] == 1 << SLOT_IDS[("Monday", "Noon")]
+    assert (alice['double_shift'], alice['are_three_shifts_possible'], alice['night_and_noon_possible']) == (True, False, True)
+    assert (bob['max_shifts'], bob['max_nights'], bob['max_weekend_shifts']) == (3, 0, 2)
+
+def test_short_rows_are_padded():
+    # Rows as the values API returns them, without their trailing empty cells
+    people = parse_people_rows(PEOPLE_ROWS[:1] + [["Carol", "TRUE", "FALSE", "FALSE", 4]])
+    assert people[0]['max_shifts'] == 4 and people[0]['max_nights'] == 0
+    assert people[0]['blocked_shifts'] == 0
+    assert parse_shift_need_rows(NEEDS_ROWS[:1] + [["Tuesday", 1]]) == [("Tuesday", "Morning", 1)]
+
+def test_people_data_builds_people():
+    people = parse_people_data(as_records(PEOPLE_ROWS), ShiftGroup())
+    assert [p.name for p in people] == ["Alice", "Bob"]
+    assert people[0].blocked_shifts == {("Sunday", "Morning"): True}
+
+def test_shift_needs():
+    expected = [("Sunday", "Morning", 2), ("Sunday", "Night", 1), ("Monday", "Morning", 1), ("Monday", "Evening", 3)]
+    assert parse_shift_need_rows(NEEDS_ROWS) == expected
+    assert parse_shift_need_rows(pd.DataFrame(as_records(NEEDS_ROWS))) == expected
+    assert parse_shift_need_rows([]) == []
+
+def test_missing_column():
+    with pytest.raises(ValueError, match="Missing column in people sheet: Max Nights"):
+        parse_people_rows([row[:5] for row in PEOPLE_ROWS])
+
+def test_request_path_does_not_import_pandas():
+    code = "import sys, app.google_sheets.import_sheet_data, app.routes.main; print('pandas' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
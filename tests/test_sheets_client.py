@@ -0,0 +1,78 @@
+import gspread
+import pytest
+from app.google_sheets import init_sheet_access
+from app.google_sheets.init_sheet_access import SheetsClient, rows_to_records
+
+
+class FakeCredentials:
+    access_token_expired = False
+
+
+class FakeSpreadsheet:
+    def __init__(self, client):
+        self.client = client
+
+    def values_batch_get(self, ranges):
+        self.client.requests.append(ranges)
+        if self.client.reject_next:
+            self.client.reject_next = False
+            response = type('Response', (), {'status_code': 401, 'json': lambda self: {'error': {'code': 401}},
+                                             'text': 'unauthorised'})()
+            raise gspread.exceptions.APIError(response)
+        return {'valueRanges': [
+            {'values': [["Day", "Morning", "Noon"], ["Sunday", "1", "2"], ["Monday", "3"]]},
+            {'values': [["Name", "Max Shifts"], ["Alice", "5"]]},
+        ]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.opened = []
+        self.requests = []
+        self.reject_next = False
+
+    def open(self, name):
+        self.opened.append(name)
+        return FakeSpreadsheet(self)
+
+
+@pytest.fixture
+def fake_gspread(monkeypatch):
+    clients = []
+
+    def authorize(credentials):
+        clients.append(FakeClient())
+        return clients[-1]
+
+    monkeypatch.setattr(init_sheet_access, 'get_credentials', FakeCredentials)
+    monkeypatch.setattr(gspread, 'authorize', authorize)
+    return clients
+
+def test_rows_to_records_like_get_all_records():
+    assert rows_to_records([]) == []
+    assert rows_to_records([["Day", "Morning", "Noon"], ["Monday", "3"]]) == [{"Day": "Monday", "Morning": 3, "Noon": ""}]
+
+def test_one_client_and_one_batched_request(fake_gspread):
+    client = SheetsClient()
+    first = client.fetch_tabs("Shifts", ["Needed Shifts", "Bob's People"])
+    client.fetch_tabs("Shifts", ["Needed Shifts", "Bob's People"])
+
+    assert len(fake_gspread) == 1
+    assert fake_gspread[0].opened == ["Shifts"]
+    assert fake_gspread[0].requests[0] == ["'Needed Shifts'", "'Bob''s People'"]
+    assert first["Needed Shifts"][1] == {"Day": "Monday", "Morning": 3, "Noon": ""}
+    assert first["Bob's People"] == [{"Name": "Alice", "Max Shifts": 5}]
+
+def test_reauthorises_when_token_expires(fake_gspread):
+    client = SheetsClient()
+    client.fetch_tabs("Shifts", ["Needed Shifts", "People"])
+    client._credentials.access_token_expired = True
+    client.fetch_tabs("Shifts", ["Needed Shifts", "People"])
+    assert len(fake_gspread) == 2
+
+def test_retries_once_when_unauthorised(fake_gspread):
+    client = SheetsClient()
+    client.open("Shifts").client.reject_next = True
+    tabs = client.fetch_tabs("Shifts", ["Needed Shifts", "People"])
+    assert len(fake_gspread) == 2
+    assert tabs["People"] == [{"Name": "Alice", "Max Shifts": 5}]
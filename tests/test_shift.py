@@ -204,3 +204,9 @@ def test_shift_assignments(complete_shift_group):
 
 
 
+def test_shift_slot_hashing(complete_shift_group):
+    """Shifts hash and order by their integer slot id"""
+    shift = Shift("Monday", "Noon", group=complete_shift_group)
+    assert hash(shift) == shift.slot == VALID_DAYS.index("Monday") * len(VALID_SHIFT_TIMES) + 1
+    assert not hasattr(shift, '__dict__')
+    assert sorted(complete_shift_group.shifts, reverse=True)[0] == Shift("Saturday", "Night", group=complete_shift_group)
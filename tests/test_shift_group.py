@@ -116,4 +116,40 @@ def test_rank_shifts(complete_shift_group):
     # Morning shifts should be ranked before night shifts because they have
     # a lower capacity/need ratio (more constrained)
     assert first_morning_idx < first_night_idx, \
-        "Shifts with lower capacity/need ratio should be ranked before shifts with higher ratio" 
\ No newline at end of file
+        "Shifts with lower capacity/need ratio should be ranked before shifts with higher ratio" 
+
+def test_shift_registry_interning():
+    """Shifts are interned per (day, time) in the group's slot registry"""
+    group = ShiftGroup()
+    shift = Shift("Monday", "Morning", group=group, needed=2)
+    assert Shift("Monday", "Morning", group=group) is shift
+    assert group.get_shift_by_slot(shift.slot) is shift
+    assert shift.copy_with_group() is shift
+
+    # Replacing the shift list rebuilds the registry
+    group.shifts = []
+    assert group.get_shift("Monday", "Morning") is None
+    copy = shift.copy_with_group()
+    assert copy is not shift and copy == shift and copy.needed == 2
+    assert group.get_shift("Monday", "Morning") is copy
+
+def test_third_shift_check_does_not_create_shifts():
+    """The evening check of the third shift rule must not add an Evening shift to the group"""
+    group = ShiftGroup()
+    for time in ["Morning", "Noon", "Night"]:
+        Shift("Monday", time, group=group, needed=1)
+    person = Person(
+        name="Test",
+        blocked_shifts={},
+        double_shift=True,
+        max_shifts=5,
+        max_nights=2,
+        are_three_shifts_possible=True,
+        night_and_noon_possible=True
+    )
+    person.assign_to_shift(group.get_shift("Monday", "Morning"))
+    person.assign_to_shift(group.get_shift("Monday", "Noon"))
+
+    assert person.is_eligible_for_shift(group.get_shift("Monday", "Night"))
+    assert group.get_shift("Monday", "Evening") is None
+    assert len(group.shifts) == 3
@@ -0,0 +1,176 @@
+import fcntl
+import threading
+import time
+import pytest
+from app.routes import main
+from app.scheduler import shifts_algo
+from app.scheduler.metrics import SolveStats
+from app.scheduler.result_cache import RESULT_CACHE
+from app.scheduler import single_flight
+from app.scheduler.single_flight import SingleFlight
+from app.scheduler.synthetic import generate_shift_group
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+def run_in_threads(count, target):
+    results = [None] * count
+
+    def run(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+class BlockingSolve:
+    def __init__(self, result=("result", True)):
+        self.result = result
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.result
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    solve = BlockingSolve()
+    threads, results = run_in_threads(4, lambda: flight.run('key', solve))
+    wait_for(lambda: flight.get_stats()['followers'] == 3)
+    solve.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert solve.calls == 1
+    assert sorted(results, key=lambda result: result[1]) == [("result", False)] + [("result", True)] * 3
+    assert flight.get_stats() == {'in_flight': 0, 'leaders': 1, 'followers': 3}
+
+def test_result_that_is_not_shared_is_run_again():
+    flight = SingleFlight()
+    solve = BlockingSolve(result=("cancelled", False))
+    threads, results = run_in_threads(2, lambda: flight.run('key', solve))
+    wait_for(lambda: flight.get_stats()['followers'] == 1)
+    solve.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert solve.calls == 2
+    assert results == [("cancelled", False)] * 2
+
+def test_error_reaches_the_waiting_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("no sheet")
+
+    errors = []
+
+    def run():
+        try:
+            flight.run('key', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads, _ = run_in_threads(2, run)
+    wait_for(lambda: flight.get_stats()['followers'] == 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["no sheet", "no sheet"]
+
+def test_cancelled_while_waiting():
+    flight = SingleFlight()
+    solve = BlockingSolve()
+    leader = threading.Thread(target=flight.run, args=('key', solve))
+    leader.start()
+    wait_for(lambda: flight.get_stats()['in_flight'] == 1)
+
+    cancel_event = threading.Event()
+    threading.Timer(0.05, cancel_event.set).start()
+    assert flight.run('key', solve, cancel_event=cancel_event) == (None, False)
+    solve.release.set()
+    leader.join(5)
+    assert solve.calls == 1
+
+def test_coalesced_across_processes(tmp_path):
+    # Each SingleFlight opens the lock file itself, like a separate worker process would
+    first_worker, second_worker = SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))
+    stored = {}
+    solve = BlockingSolve()
+
+    def solve_and_store():
+        stored['key'] = solve()[0]
+        return stored['key'], True
+
+    leader = threading.Thread(target=first_worker.run, args=('key', solve_and_store))
+    leader.start()
+    wait_for(lambda: solve.calls == 1)
+
+    waiting = []
+    threading.Timer(0.1, solve.release.set).start()
+    result = second_worker.run('key', solve, recheck=lambda: stored.get('key'), on_wait=lambda: waiting.append(True))
+    leader.join(5)
+
+    assert result == ("result", False)
+    assert solve.calls == 1 and waiting == [True]
+    assert list(tmp_path.iterdir()) == []  # Lock files are removed once released
+
+def test_lock_of_removed_file_is_not_taken(tmp_path):
+    # A waiter that opened the lock file before its holder removed it must not take that lock
+    flight = SingleFlight(str(tmp_path))
+    with flight._process_lock('key', None, None):
+        stale = open(tmp_path / "key.lock", 'a')
+    try:
+        fcntl.flock(stale, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert not single_flight._is_current(stale, str(tmp_path / "key.lock"))
+    finally:
+        stale.close()
+
+    with flight._process_lock('key', None, None) as waited:
+        assert waited is False
+        assert (tmp_path / "key.lock").exists()
+    assert not (tmp_path / "key.lock").exists()
+
+
+@pytest.fixture
+def blocking_solver(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def run_shift_algorithm(shift_group, timeout, preference_model, stats, profile, cancel_event, progress):
+        calls.append(shift_group)
+        release.wait(5)
+        stats.outcome = 'infeasible'
+        return False, None, "no_valid_combination_for_first_shift", None, None
+
+    monkeypatch.setattr(shifts_algo, 'run_shift_algorithm', run_shift_algorithm)
+    RESULT_CACHE.clear()
+    yield calls, release
+    release.set()
+    RESULT_CACHE.clear()
+
+class FakePrefetcher:
+    def get_shift_group(self, max_weekend):
+        return generate_shift_group(seed=1, people=8)
+
+def test_concurrent_requests_are_coalesced(blocking_solver):
+    calls, release = blocking_solver
+    stages = []
+    threads, results = run_in_threads(3, lambda: main.solve_schedule(
+        {}, SolveStats(), prefetcher=FakePrefetcher(), set_stage=stages.append))
+    wait_for(lambda: stages.count('waiting') == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(result.get('coalesced', False) for result in results) == [False, True, True]
+    assert all(result['reason'] == "no_valid_combination_for_first_shift" for result in results)
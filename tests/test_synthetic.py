@@ -0,0 +1,43 @@
+import pytest
+from app.scheduler.synthetic import generate_shift_group
+from app.scheduler.shifts_algo import run_shift_algorithm
+from benchmarks.run_benchmarks import SCENARIOS, run_scenario
+
+
+def describe(shift_group):
+    return (
+        [(shift.shift_day, shift.shift_time, shift.needed) for shift in shift_group.shifts],
+        [(p.name, p.blocked_mask, p.double_shift, p.max_shifts, p.max_nights, p.max_weekend_shifts)
+         for p in shift_group.people],
+    )
+
+def test_same_seed_same_instance():
+    assert describe(generate_shift_group(7, people=10)) == describe(generate_shift_group(7, people=10))
+    assert describe(generate_shift_group(7, people=10)) != describe(generate_shift_group(8, people=10))
+
+def test_parameters_are_respected():
+    shift_group = generate_shift_group(3, people=10, blocked_density=0, tightness=0.5,
+                                       max_shifts=(6,), flag_probabilities={'double_shift': 1})
+    assert len(shift_group.people) == 10
+    assert all(p.blocked_mask == 0 and p.double_shift and p.max_shifts == 6 for p in shift_group.people)
+    assert sum(shift.needed for shift in shift_group.shifts) == 30
+    assert all(0 < shift.needed <= 10 for shift in shift_group.shifts)
+    assert all(shift.shift_day != "Last Saturday" for shift in shift_group.shifts)
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError, match="Unknown needs profile"):
+        generate_shift_group(1, needs_profile='nights')
+    with pytest.raises(ValueError, match="blocked_density"):
+        generate_shift_group(1, blocked_density=1.5)
+
+def test_synthetic_instance_solves(synthetic_shift_group):
+    success, assignments, reason, _, _ = run_shift_algorithm(synthetic_shift_group, timeout=10)
+    assert success, reason
+    for shift in synthetic_shift_group.shifts:
+        assert len(assignments[shift.shift_day][shift.shift_time]) == shift.needed
+
+def test_benchmark_scenario_within_thresholds():
+    result = run_scenario('small_flat', repeat=1)
+    assert result['failures'] == []
+    assert result['nodes'] <= SCENARIOS['small_flat']['max_nodes']
+    assert set(result['helpers']) == {'is_eligible_for_shift_all_ms', 'rank_shifts_ms', 'sort_combinations_ms'}
@@ -0,0 +1,55 @@
+import io
+import pytest
+from app.scheduler import tracing
+from app.scheduler.tracing import DEBUG, INFO, get_tracer
+from app.scheduler.shifts_algo import run_shift_algorithm
+
+
+@pytest.fixture(autouse=True)
+def reset_tracing():
+    yield
+    tracing.configure()
+
+def test_disabled_by_default():
+    tracing.configure()
+    search_trace = get_tracer('search')
+    assert not search_trace.info and not search_trace.debug
+    search_trace.event(DEBUG, 'node', depth=0)
+    assert tracing.dump_buffer() == 0
+
+def test_levels_per_subsystem():
+    stream = io.StringIO()
+    tracing.configure({'search': 'debug', 'solver': 'info'}, stream=stream)
+    assert get_tracer('search').debug
+    assert get_tracer('solver').info and not get_tracer('solver').debug
+    assert not get_tracer('ranking').info
+
+    get_tracer('solver').event(DEBUG, 'ignored')
+    get_tracer('solver').event(INFO, 'completed', seconds=1.5)
+    assert stream.getvalue().endswith("INFO [solver] completed seconds=1.5\n")
+    assert "ignored" not in stream.getvalue()
+
+def test_ring_buffer_keeps_latest_events():
+    tracing.configure({'all': 'debug'}, buffer_size=3)
+    for depth in range(5):
+        get_tracer('search').event(DEBUG, 'node', depth=depth)
+
+    stream = io.StringIO()
+    assert tracing.dump_buffer(stream) == 3
+    lines = stream.getvalue().splitlines()
+    assert [line.split()[-1] for line in lines] == ["depth=2", "depth=3", "depth=4"]
+    assert tracing.dump_buffer(stream) == 0
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError, match="Unknown trace level"):
+        tracing.configure({'search': 'verbose'})
+    with pytest.raises(ValueError, match="Unknown trace subsystem"):
+        tracing.configure({'planner': 'debug'})
+
+def test_buffer_dumped_when_solve_fails(complete_shift_group, capsys):
+    """A solve with no people fails at the first shift and dumps the traced search"""
+    tracing.configure({'search': 'debug'}, buffer_size=100)
+    success, _, reason, _, _ = run_shift_algorithm(complete_shift_group, timeout=5)
+
+    assert not success
+    assert "[search] node depth=0" in capsys.readouterr().err